@@ -7,10 +7,36 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'broker_project.settings')
 
-application = get_asgi_application()
+
+class ConcurrencyLimit:
+    """
+    Let at most `limit` HTTP requests into `app` at once; the others wait here,
+    on the event loop, without a thread or a database connection. Django runs
+    each request's database work in a thread of its own, so without this more
+    requests than the pool has connections would wait on the pool and fail
+    after DB_POOL_TIMEOUT.
+    """
+
+    def __init__(self, app, limit):
+        self.app = app
+        self.limit = limit
+        self._semaphore = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        async with self._semaphore:
+            return await self.app(scope, receive, send)
+
+
+application = ConcurrencyLimit(get_asgi_application(), min(settings.ASGI_CONCURRENCY, settings.DB_POOL_MAX_SIZE))
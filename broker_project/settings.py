@@ -47,7 +47,8 @@ INSTALLED_APPS = [
 # -------------------------
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",  # serve static files on Render
+    "brokerapp.middleware.RequestTimingMiddleware",  # only active with REQUEST_TIMING
+    "brokerapp.middleware.AsyncWhiteNoiseMiddleware",  # serve static files on Render (WhiteNoise, async-capable)
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -92,7 +93,8 @@ if DATABASE_URL:
         "default": dj_database_url.parse(
             DATABASE_URL,
             conn_max_age=600,
-            ssl_require=True
+            # sqlite URLs (local runs) have no sslmode option
+            ssl_require=not DATABASE_URL.startswith("sqlite")
         )
     }
 else:
@@ -120,6 +122,45 @@ else:
     #     }
     # }
 
+# -------------------------
+# Connection pooling (PostgreSQL, psycopg 3 + psycopg-pool)
+# -------------------------
+# Each gunicorn worker process keeps its own pool; a request thread borrows a
+# connection and returns it at the end of the request. Pool size follows the
+# server profile in gunicorn.conf.py: one connection per request a worker serves
+# at once, capped so that WEB_CONCURRENCY pools together stay under
+# DB_MAX_CONNECTIONS. gthread workers serve GUNICORN_THREADS requests at once.
+# Uvicorn workers (ASGI=1) have no such limit and give every request its own
+# thread for database work, so broker_project.asgi admits ASGI_CONCURRENCY
+# requests at a time (no more than the pool holds) and queues the rest.
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "2"))
+GUNICORN_THREADS = int(os.environ.get("GUNICORN_THREADS", "4"))
+ASGI = os.environ.get("ASGI", "0") == "1"
+ASGI_CONCURRENCY = int(os.environ.get("ASGI_CONCURRENCY", "8"))
+DB_POOL = os.environ.get("DB_POOL", "True").lower() in ("1", "true", "yes")
+DB_MAX_CONNECTIONS = int(os.environ.get("DB_MAX_CONNECTIONS", "20"))
+DB_POOL_MAX_SIZE = int(os.environ.get(
+    "DB_POOL_MAX_SIZE",
+    max(1, min(ASGI_CONCURRENCY if ASGI else GUNICORN_THREADS, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)),
+))
+DB_POOL_MIN_SIZE = min(int(os.environ.get("DB_POOL_MIN_SIZE", "1")), DB_POOL_MAX_SIZE)
+
+# Ping reused connections before handing them to a request.
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+if DB_POOL and DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    # Pooling replaces persistent connections (Django rejects both together).
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        # seconds a request waits for a free connection before erroring
+        "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        # close idle extras after 5 min, recycle every connection after 30 min
+        "max_idle": 300,
+        "max_lifetime": 1800,
+    }
+
 # -------------------------
 # Password validators
 # -------------------------
@@ -162,3 +203,96 @@ LOGOUT_REDIRECT_URL = "/login/"
 # App-specific defaults
 # -------------------------
 DEFAULT_ORG_NAME = os.environ.get("DEFAULT_ORG_NAME", "Rathi Trading Co.")
+
+# -------------------------
+# Background jobs (manage.py run_worker)
+# -------------------------
+# Finished PDF/XLSX files are written here; keep it on local disk of the box.
+JOB_RESULTS_DIR = Path(os.environ.get("JOB_RESULTS_DIR", BASE_DIR / "job_results"))
+# A RUNNING job whose worker has been silent this long is considered dead and re-claimed.
+JOB_LOCK_TIMEOUT = int(os.environ.get("JOB_LOCK_TIMEOUT", "900"))
+# Retry delay in seconds; doubles with every failed attempt.
+JOB_RETRY_BACKOFF = int(os.environ.get("JOB_RETRY_BACKOFF", "10"))
+# Idle worker sleep between polls (seconds).
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "2"))
+# Finished files can be downloaded for this long (seconds), then they are deleted.
+JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", str(24 * 3600)))
+# Finished / failed job rows are kept this long (seconds) for the exports list.
+JOB_HISTORY_TTL = int(os.environ.get("JOB_HISTORY_TTL", str(7 * 24 * 3600)))
+# How often run_worker runs the cleanup (seconds).
+JOB_CLEANUP_INTERVAL = int(os.environ.get("JOB_CLEANUP_INTERVAL", "3600"))
+
+# -------------------------
+# Rendered document cache (brokerapp.artifacts)
+# -------------------------
+# Identical PDF renders (same document, org, parameters and data version) are
+# served from here; least recently used files go once the size cap is reached.
+ARTIFACT_CACHE_DIR = Path(os.environ.get("ARTIFACT_CACHE_DIR", BASE_DIR / "artifact_cache"))
+ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get("ARTIFACT_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Processes used to render large batch invoice prints (brokerapp.invoices); 1 = in-process only.
+# Each web worker would spawn its own pool, so leave it at 1 there and raise it
+# only for the job worker (big batches go there with ?background=1).
+INVOICE_PRINT_WORKERS = int(os.environ.get("INVOICE_PRINT_WORKERS", "1"))
+
+# -------------------------
+# PDF fonts (brokerapp.pdffonts)
+# -------------------------
+# Unicode TTFs used by every PDF export, by style; relative names are looked up
+# in PDF_FONT_DIR. The bundled FiraGO covers Latin, Devanagari and the rupee sign.
+PDF_FONT_DIR = Path(os.environ.get("PDF_FONT_DIR", BASE_DIR / "brokerapp" / "fonts"))
+PDF_FONTS = {"": "FiraGO-Regular.ttf", "B": "FiraGO-Bold.ttf"}
+# Extra fonts for characters the fonts above lack, tried in order (comma
+# separated in the env). FiraGO has no Gujarati and no Gujarati font is
+# bundled: put one in PDF_FONT_DIR, e.g. Noto Sans Gujarati (SIL OFL,
+# fonts.google.com/noto/specimen/Noto+Sans+Gujarati), and set
+# PDF_FALLBACK_FONTS=NotoSansGujarati-Regular.ttf. Without one, Gujarati prints
+# as blank glyphs; a listed file that is missing is skipped with a warning.
+PDF_FALLBACK_FONTS = [f for f in os.environ.get("PDF_FALLBACK_FONTS", "").split(",") if f]
+# Shape Devanagari / Gujarati (vowel signs, conjuncts) with uharfbuzz; without
+# it, or with this off, such text is drawn unshaped.
+PDF_TEXT_SHAPING = os.environ.get("PDF_TEXT_SHAPING", "True").lower() in ("1", "true", "yes")
+
+# -------------------------
+# Organization resolution (brokerapp.middleware.SingleOrgMiddleware)
+# -------------------------
+# False: every request uses DEFAULT_ORG_NAME. True: resolve from session["org_id"]
+# or the orgs the user owns, falling back to the default org.
+MULTI_ORG = os.environ.get("MULTI_ORG", "False").lower() in ("1", "true", "yes")
+# Seconds an org lookup is reused per process before hitting the database again.
+ORG_CACHE_TTL = int(os.environ.get("ORG_CACHE_TTL", "300"))
+# Paths that never need an org (health checks) — no lookup at all.
+ORG_EXEMPT_PATHS = ["/healthz/"]
+
+# -------------------------
+# Request timings (brokerapp.middleware.RequestTimingMiddleware)
+# -------------------------
+# Server-Timing header (db / tpl / doc / total) on staff responses (all with DEBUG), and a log of slow requests.
+REQUEST_TIMING = os.environ.get("REQUEST_TIMING", "False").lower() in ("1", "true", "yes")
+# Requests at least this slow (ms) are written to SLOW_REQUEST_LOG with their repeated SQL.
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_LOG = Path(os.environ.get("SLOW_REQUEST_LOG", BASE_DIR / "logs" / "slow_requests.log"))
+SLOW_REQUEST_LOG_MAX_BYTES = int(os.environ.get("SLOW_REQUEST_LOG_MAX_MB", "10")) * 1024 * 1024
+SLOW_REQUEST_LOG_BACKUPS = int(os.environ.get("SLOW_REQUEST_LOG_BACKUPS", "5"))
+
+# -------------------------
+# Master-data choice cache (brokerapp.masterdata)
+# -------------------------
+# Seconds cached party/broker/item lists (and their version key) live in the cache.
+MASTERDATA_CACHE_TTL = int(os.environ.get("MASTERDATA_CACHE_TTL", "300"))
+
+# -------------------------
+# Cache backend (shared by all gunicorn workers on the box)
+# -------------------------
+# File-based so workers share entries without an external service.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("CACHE_DIR", str(BASE_DIR / "cache_data")),
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", "5000"))},
+    }
+}
+# Tag-invalidated report/statement/fragment caching (brokerapp.cachetags).
+# Entries are dropped by tag on writes; this is only the upper bound.
+CACHE_TAGS_TIMEOUT = int(os.environ.get("CACHE_TAGS_TIMEOUT", "3600"))
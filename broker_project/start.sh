@@ -2,14 +2,41 @@
 set -o errexit
 set -o pipefail
 
-echo "🔄 Checking database connection..."
-python manage.py migrate --check || echo "Database not initialized yet."
-
 echo "⌛ Waiting for database..."
-sleep 5
+python manage.py wait_for_db --timeout "${DB_WAIT_TIMEOUT:-60}"
+
+# migrate --check exits non-zero when there are unapplied migrations
+if python manage.py migrate --check > /dev/null 2>&1; then
+  echo "✅ Migrations already applied."
+else
+  echo "📦 Running Django migrations..."
+  python manage.py migrate --noinput
+fi
+
+echo "🏢 Ensuring default organization..."
+python manage.py ensure_default_org
+
+# Background job worker (PDF/XLSX exports) runs on the same box, restarted if it
+# exits. Set RUN_WORKER=0 where the platform runs it as its own process (the
+# Procfile's `worker`, whose `web` line does so).
+if [ "${RUN_WORKER:-1}" = "1" ]; then
+  echo "🧵 Starting background job worker..."
+  (
+    while true; do
+      python manage.py run_worker || true
+      echo "⚠️ Background job worker exited; restarting in 5s..."
+      sleep 5
+    done
+  ) &
+fi
 
-echo "📦 Running Django migrations..."
-python manage.py migrate --noinput
+# ASGI=1: uvicorn workers under gunicorn (async daily-page endpoints)
+if [ "${ASGI:-0}" = "1" ]; then
+  APP_MODULE="broker_project.asgi:application"
+else
+  APP_MODULE="broker_project.wsgi:application"
+fi
 
-echo "🚀 Starting Gunicorn server..."
-exec gunicorn broker_project.wsgi:application --log-file -
+echo "🚀 Starting Gunicorn server ($APP_MODULE)..."
+# worker class, threads, max-requests, preload: see gunicorn.conf.py
+exec gunicorn "$APP_MODULE" -c gunicorn.conf.py
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class BrokerappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'brokerapp'
+
+    def ready(self):
+        # connect Organization save/delete -> org cache invalidation
+        from . import orgs  # noqa: F401
+        # connect invoice / entry / master writes -> cache tag invalidation
+        from . import cachetags  # noqa: F401
+        # connect invoice / entry / master writes -> global search documents
+        from . import globalsearch  # noqa: F401
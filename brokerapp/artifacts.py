@@ -0,0 +1,170 @@
+# brokerapp/artifacts.py
+"""
+Rendered documents (PDF / XLSX) kept on local disk and reused.
+
+A document is stored under a hash of (document type, org, parameters, data
+fingerprint). The fingerprint is the current cachetags version of every tag
+the document is built from, so any write that invalidates those tags (the
+write views, and the model signals in cachetags) produces a new key and the
+old file is simply never asked for again. The key doubles as the ETag.
+
+- A hit is served from the file with FileResponse; the render callback (and
+  with it fpdf) is never touched. A matching If-None-Match gets a 304.
+- A file's mtime is its last use. When the directory grows past
+  ARTIFACT_CACHE_MAX_BYTES the least recently used files are deleted. The
+  size is checked after a store, at most once per EVICT_INTERVAL per
+  process, since it means listing the whole directory.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from . import cachetags, timing
+
+logger = logging.getLogger(__name__)
+
+# eviction trims the cache to this share of ARTIFACT_CACHE_MAX_BYTES, so it
+# does not run again on the very next store
+EVICT_TO = 0.8
+
+# seconds between size checks after stores, per process
+EVICT_INTERVAL = 60
+
+# part of every key: bump when the layout or fonts of the documents change, so
+# files rendered by the previous code are not served again
+RENDER_VERSION = 2
+
+# temporary files older than this are left over from a killed render
+STALE_TMP_SECONDS = 3600
+
+# time.monotonic() of this process's last size check after a store
+_last_evict = None
+
+
+def cache_dir():
+    path = Path(settings.ARTIFACT_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def artifact_key(kind, org, params, tags):
+    """Hex digest naming the document `kind` of `org` for `params` at the tags' current versions."""
+    raw = json.dumps(
+        [RENDER_VERSION, kind, getattr(org, "pk", org), params, list(tags), cachetags.tag_versions(tags)],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _path(key, suffix):
+    return cache_dir() / key[:2] / f"{key}{suffix}"
+
+
+def get_or_render(kind, org, params, tags, suffix, render):
+    """
+    (key, path) of the cached document, calling `render(fileobj)` to write it
+    on a miss. The file is written under a temporary name and renamed, so a
+    concurrent reader never sees half a document.
+    """
+    tags = list(tags)
+    key = artifact_key(kind, org, params, tags)
+    path = _path(key, suffix)
+    try:
+        os.utime(path)  # hit: mark as recently used
+        return key, path
+    except FileNotFoundError:
+        pass
+
+    path.parent.mkdir(exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh, timing.span("doc"):
+            render(fh)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    _evict_now_and_then()
+    return key, path
+
+
+def serve(request, kind, org, params, tags, filename, content_type, render, inline=False):
+    """
+    Response for a cached document (see get_or_render), with the key as ETag.
+    GET / HEAD requests whose If-None-Match matches get 304 Not Modified.
+    """
+    suffix = Path(filename).suffix
+    key, path = get_or_render(kind, org, params, tags, suffix, render)
+    etag = f'"{key}"'
+
+    if request.method in ("GET", "HEAD"):
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+    response = FileResponse(open(path, "rb"), as_attachment=not inline, filename=filename,
+                            content_type=content_type)
+    response["ETag"] = etag
+    # the documents hold account data: browsers may keep them but must revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def copier(path):
+    """Job payload (see brokerapp.jobs) that copies the cached document at `path` into the result file."""
+    def write(fh):
+        with open(path, "rb") as src:
+            shutil.copyfileobj(src, fh)
+    return write
+
+
+def _evict_now_and_then():
+    global _last_evict
+    now = time.monotonic()
+    if _last_evict is not None and now - _last_evict < EVICT_INTERVAL:
+        return
+    _last_evict = now
+    evict()
+
+
+def evict(max_bytes=None):
+    """Delete least recently used documents until the cache fits; returns how many were deleted."""
+    max_bytes = settings.ARTIFACT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    now = time.time()
+    files = []
+    total = 0
+    for path in cache_dir().glob("*/*"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        total += st.st_size
+        if path.suffix == ".tmp":
+            if now - st.st_mtime < STALE_TMP_SECONDS:
+                continue  # a render in progress
+            files.append((0, st.st_size, path))  # left by a killed render: goes first
+        else:
+            files.append((st.st_mtime, st.st_size, path))
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    limit = max_bytes * EVICT_TO
+    for _, size, path in sorted(files):
+        if total <= limit:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    if removed:
+        logger.info("Artifact cache: evicted %s file(s), %s bytes left", removed, total)
+    return removed
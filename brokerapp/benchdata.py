@@ -0,0 +1,217 @@
+# brokerapp/benchdata.py
+"""
+Deterministic benchmark data: one organization with parties, brokers,
+items, sale / purchase invoices with their lines, and daily pages of jama /
+naame entries.
+
+The same name, scale and seed always give the same rows (names, dates,
+amounts), so timings taken at different commits compare like with like.
+Rows are written with bulk_create, which skips model signals and save();
+seed() therefore fills the masters' search keys itself and afterwards
+rebuilds what the signals would have kept current: the daily balances, the
+global search documents and the cache versions.
+
+Master primary keys are their names and are unique across organizations, so
+every name starts with the org's `code`.
+"""
+import random
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import transaction
+
+from . import cachetags, daybook, globalsearch
+from .models import (
+    Broker, DailyPage, HeadItem, HeadParty, JamaEntry, NaameEntry, Organization, PurchaseDetails, PurchaseMaster,
+    SaleDetails, SaleMaster, normalize_search_key,
+)
+
+BATCH_SIZE = 1000
+
+# last day of the generated data; fixed so that the rows do not depend on when they are seeded
+END_DATE = date(2025, 3, 31)
+
+CITIES = ("Ahmedabad", "Rajkot", "Surat", "Indore", "Jaipur", "Kota", "Nagpur", "Raipur")
+STATE = "Gujarat"
+
+
+class Scale(NamedTuple):
+    parties: int
+    brokers: int
+    items: int
+    sales: int
+    purchases: int
+    lines: int          # lines per invoice (1 to this many)
+    days: int
+    entries: int        # jama + naame entries per daily page
+
+
+SCALES = {
+    "small": Scale(parties=20, brokers=5, items=10, sales=200, purchases=100, lines=3, days=30, entries=4),
+    "medium": Scale(parties=200, brokers=20, items=40, sales=2000, purchases=1000, lines=4, days=180, entries=8),
+    "large": Scale(parties=1000, brokers=50, items=100, sales=20000, purchases=10000, lines=5, days=365,
+                   entries=16),
+}
+
+
+class Fixture(NamedTuple):
+    """The seeded org and sample keys for requests against it."""
+    org: Organization
+    scale: Scale
+    start: date
+    end: date
+    party: str          # the party / broker with the most invoices
+    broker: str
+    item: str
+    sale: int           # an invoice number of each kind (None if there are none)
+    purchase: int
+    lotno: str
+
+
+def _money(rng, low, high):
+    """A random amount in [low, high] rupees, in paise."""
+    return Decimal(rng.randint(low * 100, high * 100)).scaleb(-2)
+
+
+def _masters(org, code, scale, rng):
+    parties = [
+        HeadParty(partyname=f"{code} Party {i:05}", org=org, city=rng.choice(CITIES), state=STATE,
+                  mobile=f"9{rng.randint(0, 999999999):09}", openingdebit=_money(rng, 0, 50000),
+                  openingcredit=Decimal("0"))
+        for i in range(1, scale.parties + 1)
+    ]
+    brokers = [Broker(brokername=f"{code} Broker {i:04}", org=org, mobileno=f"8{rng.randint(0, 999999999):09}")
+               for i in range(1, scale.brokers + 1)]
+    items = [HeadItem(item_name=f"{code} Item {i:04}", org=org) for i in range(1, scale.items + 1)]
+    for model, rows in ((HeadParty, parties), (Broker, brokers), (HeadItem, items)):
+        for row in rows:
+            row.search_key = normalize_search_key(row.pk)
+        model.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return [p.pk for p in parties], [b.pk for b in brokers], [i.pk for i in items]
+
+
+def _invoices(master_model, line_model, fk, org, count, days, masters, scale, rng, with_sale_fields):
+    """
+    `count` invoices of `master_model` with 1..scale.lines lines each,
+    numbered in date order; returns the lot numbers.
+    """
+    parties, brokers, items = masters
+    invdates = sorted(rng.choice(days) for _ in range(count))
+    lots = []
+    for start in range(0, count, BATCH_SIZE):
+        invoices, lines = [], []
+        for invdate in invdates[start:start + BATCH_SIZE]:
+            rows = []
+            for _ in range(rng.randint(1, scale.lines)):
+                qty = _money(rng, 10, 500)
+                rate = _money(rng, 1500, 3500)
+                bora = Decimal(rng.randint(10, 400))
+                row = {
+                    "item_id": rng.choice(items), "bora": bora, "qty": qty, "rate": rate,
+                    "amount": (qty * rate).quantize(Decimal("0.01")),
+                    "partywt": qty, "millwt": qty - _money(rng, 0, 2), "lotno": f"L{rng.randint(1, 9999):04}",
+                }
+                row["diffwt"] = row["partywt"] - row["millwt"]
+                if with_sale_fields:
+                    row["bn"] = Decimal(rng.randint(0, int(bora)))
+                    row["bo"] = bora - row["bn"]
+                    row["tbwt"] = (bora * Decimal("0.65")).quantize(Decimal("0.01"))
+                    row["frkwt"] = _money(rng, 0, 50)
+                rows.append(row)
+            lots += [r["lotno"] for r in rows]
+            totalamt = sum(r["amount"] for r in rows)
+            batavpercent = Decimal(rng.randint(0, 300)).scaleb(-2)
+            dr = Decimal(rng.randint(0, 200)).scaleb(-2)
+            batavamt = (totalamt * batavpercent / 100).quantize(Decimal("0.01"))
+            dramt = (totalamt * dr / 100).quantize(Decimal("0.01"))
+            qi = _money(rng, 0, 500)
+            other = _money(rng, 0, 300)
+            total = totalamt - batavamt - dramt - qi + other
+            advance = _money(rng, 0, 2000) if rng.random() < 0.2 else Decimal("0")
+            invoices.append(master_model(
+                org=org, invdate=invdate, awakno=str(rng.randint(1, 99999)),
+                party_id=rng.choice(parties), broker_id=rng.choice(brokers),
+                vehicleno=f"GJ-{rng.randint(1, 38):02}-{rng.choice('ABCDEFGHJK')}{rng.choice('TUVWXYZ')}-"
+                          f"{rng.randint(1, 9999):04}",
+                totalamt=totalamt, batavpercent=batavpercent, batavamt=batavamt, dr=dr, dramt=dramt,
+                qi=qi, other=other, total=total, advance=advance, netamt=total - advance,
+            ))
+            lines.append(rows)
+        master_model.objects.bulk_create(invoices)
+        line_model.objects.bulk_create(
+            [line_model(**{fk: inv}, **row) for inv, rows in zip(invoices, lines) for row in rows],
+            batch_size=BATCH_SIZE,
+        )
+    return lots
+
+
+def _daily_pages(org, days, masters, scale, rng):
+    parties, brokers, _ = masters
+    pages = DailyPage.objects.bulk_create([DailyPage(org=org, date=day) for day in days], batch_size=BATCH_SIZE)
+    jama, naame = [], []
+    for page in pages:
+        for _ in range(scale.entries):
+            model, rows = (JamaEntry, jama) if rng.random() < 0.5 else (NaameEntry, naame)
+            rows.append(model(
+                daily_page=page, party_id=rng.choice(parties),
+                broker_id=rng.choice(brokers) if rng.random() < 0.7 else None,
+                amount=_money(rng, 100, 250000), remark=rng.choice(("", "cash", "RTGS", "cheque", "NEFT")),
+            ))
+    JamaEntry.objects.bulk_create(jama, batch_size=BATCH_SIZE)
+    NaameEntry.objects.bulk_create(naame, batch_size=BATCH_SIZE)
+
+
+def delete(name):
+    """Delete the org called `name` and everything in it (entries first: they protect their parties)."""
+    org = Organization.objects.filter(name=name).first()
+    if org is None:
+        return False
+    with transaction.atomic():
+        for model in (JamaEntry, NaameEntry):
+            model.objects.filter(daily_page__org=org).delete()
+        org.delete()
+    return True
+
+
+def _busiest(org, field):
+    """The most frequent value of SaleMaster.`field` in `org` (None without sales)."""
+    counts = Counter(SaleMaster.objects.filter(org=org).order_by("pk").values_list(field, flat=True))
+    return counts.most_common(1)[0][0] if counts else None
+
+
+def seed(name, scale, seed=1, code=None, owner=None, end=END_DATE):
+    """
+    Create org `name` holding `scale` (a Scale) worth of rows drawn from
+    random.Random(`seed`); an existing org of that name is replaced.
+    Returns the Fixture.
+    """
+    rng = random.Random(seed)
+    code = code or name
+    days = [end - timedelta(days=n) for n in range(scale.days - 1, -1, -1)]
+    delete(name)
+    with transaction.atomic():
+        org = Organization.objects.create(name=name, owner=owner)
+        masters = _masters(org, code, scale, rng)
+        lots = []
+        if all(masters):
+            lots = _invoices(SaleMaster, SaleDetails, "salemaster", org, scale.sales, days, masters, scale, rng,
+                             True)
+            _invoices(PurchaseMaster, PurchaseDetails, "purchasemaster", org, scale.purchases, days, masters,
+                      scale, rng, False)
+            _daily_pages(org, days, masters, scale, rng)
+        daybook.rebuild_balances(org)
+        globalsearch.rebuild(org)
+    parties, brokers, items = masters
+    # a re-seed gives the masters the same names: their statements cached from the last seed must go
+    cachetags.invalidate_for(org, "sales", "purchases", "daily", "masters", parties=parties, brokers=brokers)
+    return Fixture(
+        org=org, scale=scale, start=days[0], end=days[-1],
+        party=_busiest(org, "party_id") or (parties[0] if parties else None),
+        broker=_busiest(org, "broker_id") or (brokers[0] if brokers else None),
+        item=items[0] if items else None,
+        sale=SaleMaster.objects.filter(org=org).values_list("pk", flat=True).first(),
+        purchase=PurchaseMaster.objects.filter(org=org).values_list("pk", flat=True).first(),
+        lotno=lots[0] if lots else None,
+    )
@@ -0,0 +1,210 @@
+# brokerapp/benchmark.py
+"""
+Request timings of every page in brokerapp/urls.py against seeded data
+(brokerapp.benchdata), for `manage.py run_bench`.
+
+Each target is one request — a page, a report with its filters, an export
+format or an account action — sent through the Django test client as a
+logged-in user of the benchmark org, so the whole stack (middleware, views,
+templates, caches, document renders) is measured. The first request is
+reported on its own ("first": caches cold for this data) and the median of
+the repeats after it ("warm"). Streaming responses are read to the end.
+
+URL names that are neither a target nor in SKIPPED are listed in the report
+as unmeasured, so a new page shows up there until it is given a target.
+"""
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+
+from . import timing
+from .urls import urlpatterns
+
+# URL names deliberately not timed: writes, auth and pages that need a job
+SKIPPED = {
+    "login", "logout", "password_change", "password_change_done", "switch_org",
+    "party_create", "party_delete", "broker_create", "broker_delete", "item_create",
+    "save_sale", "update_sale", "delete_sale", "save_purchase", "update_purchase", "delete_purchase",
+    "daily_page_jama_add", "daily_page_naame_add", "daily_page_jama_delete", "daily_page_naame_delete",
+    "job_detail", "job_status", "job_download",
+}
+
+# account views: (URL name, POST field of the selected party / broker, its first action)
+ACCOUNT_VIEWS = (
+    ("all_party_balance", None, "balance"),
+    ("all_broker_balance", None, "balance"),
+    ("party_statement", "party", "statement"),
+    ("broker_statement", "broker", "statement"),
+)
+
+
+class Target(NamedTuple):
+    name: str           # URL name
+    label: str          # unique within a run: name plus the variant
+    method: str
+    path: str
+    data: dict
+
+
+def _get(name, label=None, args=(), **params):
+    return Target(name, label or name, "GET", reverse(name, args=args), params)
+
+
+def _post(name, label, **data):
+    return Target(name, label, "POST", reverse(name), data)
+
+
+def targets(fx):
+    """The requests timed against fixture `fx` (a benchdata.Fixture)."""
+    dates = {"start_date": f"{fx.start:%Y-%m-%d}", "end_date": f"{fx.end:%Y-%m-%d}"}
+    day = {"date": f"{fx.end:%Y-%m-%d}"}
+    found = []
+    found += [
+        _get("dashboard"), _get("global_search", q=fx.party),
+        _get("party"), _get("party_edit", args=[fx.party]), _get("broker"), _get("broker_edit", args=[fx.broker]),
+        _get("item"), _get("masterdata"), _get("typeahead", args=["party"], q=fx.party[:6]),
+        _get("healthz"), _get("cache_stats"), _get("db_pool_stats"), _get("job_list"),
+    ]
+    for kind, invno in (("sale", fx.sale), ("purchase", fx.purchase)):
+        found += [_get(f"{kind}_form_new")]
+        if invno is not None:
+            found += [_get(f"{kind}_form_update", args=[invno])]
+    found += [
+        _get("saledata"), _get("saledata", "saledata?filtered", party=fx.party, **dates),
+        _get("saledata", "saledata?export=csv", export="csv"),
+        _get("purchasedata"), _get("purchasedata", "purchasedata?export=csv", export="csv"),
+        _get("sale_search", lotno=fx.lotno), _get("sale_search", "sale_search?party", party=fx.party[-5:]),
+        _get("purchase_search", party=fx.party[-5:]),
+    ]
+    for name in ("sale_report", "bardana_report", "purchase_report"):
+        for report_type in ("date", "party", "broker"):
+            found.append(_get(name, f"{name}?{report_type}", report_type=report_type, **dates))
+        found.append(_get(name, f"{name}?export=csv", export="csv", **dates))
+    found += [
+        _get("sale_report_pdf", **dates),
+        _get("sale_invoices_pdf", **day),
+        _get("daily_page", **day), _get("daily_page_show", **day),
+        _get("daily_page_pdf", **day), _get("daily_page_pdf", "daily_page_pdf?range", **dates),
+        _get("day_book", **dates),
+    ]
+    selected = {"party": fx.party, "broker": fx.broker}
+    for name, key, show in ACCOUNT_VIEWS:
+        found.append(_get(name))
+        data = {key: selected[key]} if key else {}
+        for action in (show, "print", "export_excel", "pdf"):
+            found.append(_post(name, f"{name}:{action}", action=action, **data))
+    return found
+
+
+def unmeasured(measured):
+    """Names in brokerapp/urls.py with no target in `measured` and not in SKIPPED."""
+    names = {p.name for p in urlpatterns if p.name}
+    return sorted(names - SKIPPED - {t.name for t in measured})
+
+
+def _send(client, target):
+    """(status, bytes, queries, ms) of one request."""
+    with timing.recording() as recorder:
+        started = time.perf_counter()
+        if target.method == "POST":
+            response = client.post(target.path, target.data)
+        else:
+            response = client.get(target.path, target.data)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        elapsed = (time.perf_counter() - started) * 1000
+    return response.status_code, size, recorder.queries, elapsed
+
+
+def measure(client, target, repeat):
+    """Result row of `target`: its first request, then the median of `repeat` more."""
+    status, size, queries, first_ms = _send(client, target)
+    warm = [_send(client, target) for _ in range(repeat)]
+    times = [w[3] for w in warm] or [first_ms]
+    return {
+        "label": target.label, "url": target.name, "method": target.method, "path": target.path,
+        "status": status, "bytes": size, "queries": queries,
+        "warm_queries": warm[-1][2] if warm else queries,
+        "first_ms": round(first_ms, 2), "median_ms": round(statistics.median(times), 2),
+        "min_ms": round(min(times), 2),
+    }
+
+
+def run(client, fx, repeat, only=None):
+    """Result rows of every target against `fx` (`only`: URL names to limit the run to)."""
+    timing.install()
+    chosen = [t for t in targets(fx) if not only or t.name in only]
+    return [measure(client, t, repeat) for t in chosen]
+
+
+# ---------- report ----------
+
+def _commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                             capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def report(scales, repeat, missing):
+    """The JSON-serializable report of a run; `scales` maps scale name -> {"counts", "seed_s", "results"}."""
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "repeat": repeat,
+        "scales": scales,
+        "unmeasured": missing,
+    }
+
+
+def _change(now, before):
+    if not before:
+        return ""
+    return f"{(now - before) / before * 100:+.0f}%"
+
+
+def markdown(data, baseline=None):
+    """`data` (a report) as markdown tables, one per scale, with the median change from `baseline`."""
+    lines = [
+        "# Request benchmark",
+        "",
+        f"Commit `{data['commit'] or '?'}`, {data['generated']}, {data['database']}, "
+        f"Python {data['python']}, Django {data['django']}, median of {data['repeat']} warm requests.",
+    ]
+    if baseline is not None:
+        lines.append(f"Change is against commit `{baseline.get('commit') or '?'}` ({baseline.get('generated')}).")
+    for scale, run_ in data["scales"].items():
+        before = {r["label"]: r for r in (baseline or {}).get("scales", {}).get(scale, {}).get("results", [])}
+        counts = ", ".join(f"{v} {k}" for k, v in run_["counts"].items())
+        lines += ["", f"## {scale}", "", counts, ""]
+        header = "| request | status | queries | first ms | median ms | KB |"
+        rule = "|---|---:|---:|---:|---:|---:|"
+        if baseline is not None:
+            header += " change |"
+            rule += "---:|"
+        lines += [header, rule]
+        for r in run_["results"]:
+            row = (f"| {r['method']} {r['label']} | {r['status']} | {r['queries']} | {r['first_ms']:.1f} | "
+                   f"{r['median_ms']:.1f} | {r['bytes'] / 1024:.1f} |")
+            if baseline is not None:
+                old = before.get(r["label"])
+                row += f" {_change(r['median_ms'], old['median_ms']) if old else 'new'} |"
+            lines.append(row)
+    if data["unmeasured"]:
+        lines += ["", "Not measured: " + ", ".join(data["unmeasured"])]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,299 @@
+# brokerapp/cachetags.py
+"""
+Tag-versioned caching for report / statement data and template fragments.
+
+Every cached value is stored under a key that includes the current version of
+each of its tags (``org:1:sales``, ``party:ABC`` ...). ``invalidate(...)`` /
+``invalidate_for(...)`` bump those versions once the write's transaction
+commits, so every entry built from the old data simply stops being found.
+Nothing has to be deleted and it works the same across processes sharing the
+cache backend.
+Saving or deleting an invoice, daily entry or master record (views, admin,
+shell) does this through the model signals at the bottom; only writes that
+skip signals (bulk_create, queryset.update) call invalidate_for themselves.
+
+Only data and markup without per-user state are cached — never whole
+responses (the pages carry CSRF tokens).
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import partial, wraps
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    Broker, DailyPage, HeadItem, HeadParty, JamaEntry, NaameEntry, PurchaseMaster, SaleMaster,
+)
+
+_VERSION_PREFIX = "cachetag:v:"
+_VALUE_PREFIX = "cachetag:val:"
+_STATS_PREFIX = "cachetag:stats:"
+_STATS_INDEX = "cachetag:stats:tags"
+
+# hit/miss counts are kept per process and added to the shared cache in batches
+STATS_FLUSH_EVERY = 50
+
+# org id used in tags when a query is not scoped to a single org
+ALL_ORGS = "*"
+
+# longest name kept readable in a party / broker tag; longer ones are hashed
+MAX_TAG_NAME = 80
+
+_missing = object()
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+# ---------- tag names ----------
+
+def _pk(obj):
+    return getattr(obj, "pk", obj)
+
+
+def org_tags(org, *areas):
+    """
+    Tags for org-wide data areas ("sales", "purchases", "daily", "masters").
+    Data computed across all orgs (org=None) is tagged with ALL_ORGS.
+    """
+    org_id = _pk(org) if org is not None else ALL_ORGS
+    return [f"org:{org_id}:{area}" for area in areas]
+
+
+def _name(obj):
+    # party / broker keys are their names: spaces and non-ASCII letters are not valid in
+    # memcached keys, so they are %-quoted, and very long names are hashed
+    name = quote(str(_pk(obj)), safe="")
+    if len(name) > MAX_TAG_NAME:
+        return "sha1-" + hashlib.sha1(name.encode()).hexdigest()
+    return name
+
+
+def party_tag(party):
+    return f"party:{_name(party)}"
+
+
+def broker_tag(broker):
+    return f"broker:{_name(broker)}"
+
+
+# ---------- versions ----------
+
+def _fresh_version():
+    # clock based, so a version key that was evicted never comes back with an old value
+    return int(time.time() * 1000)
+
+
+def tag_versions(tags):
+    """Current version of each tag, in order (one cache round trip when all exist)."""
+    keys = [_VERSION_PREFIX + t for t in tags]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _fresh_version(), None)
+            version = cache.get(key, 0)
+        versions.append(version)
+    return versions
+
+
+def _bump(tags):
+    for tag in tags:
+        key = _VERSION_PREFIX + tag
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+
+
+def invalidate(*tags, using="default"):
+    """
+    Make every entry cached under any of `tags` stale when the current
+    transaction commits (at once outside a transaction). Bumping earlier would
+    let a request that still sees the old rows cache them under the new version.
+    """
+    transaction.on_commit(partial(_bump, set(tags)), using=using)
+
+
+def invalidate_for(org, *areas, parties=(), brokers=(), using="default"):
+    """
+    Invalidate after a write: the org's data areas (and their all-orgs
+    counterparts) plus the statements of the given parties / brokers.
+    """
+    tags = org_tags(org, *areas) + org_tags(None, *areas)
+    tags += [party_tag(p) for p in parties if p]
+    tags += [broker_tag(b) for b in brokers if b]
+    invalidate(*tags, using=using)
+
+
+# ---------- stats ----------
+
+def _record(tags, outcome):
+    with _stats_lock:
+        for tag in tags:
+            _stats[(tag, outcome)] += 1
+        pending = sum(_stats.values())
+    if pending >= STATS_FLUSH_EVERY:
+        flush_stats()
+
+
+def flush_stats():
+    """Add this process's pending hit/miss counts to the shared cache."""
+    with _stats_lock:
+        pending = dict(_stats)
+        _stats.clear()
+    if not pending:
+        return
+    tags = {tag for tag, _ in pending}
+    known = cache.get(_STATS_INDEX) or set()
+    if not tags <= known:
+        cache.set(_STATS_INDEX, known | tags, None)
+    for (tag, outcome), count in pending.items():
+        key = f"{_STATS_PREFIX}{tag}:{outcome}"
+        if not cache.add(key, count, None):
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                cache.set(key, count, None)
+
+
+def stats():
+    """{tag: {"hits": n, "misses": n}} summed over all processes."""
+    flush_stats()
+    tags = sorted(cache.get(_STATS_INDEX) or ())
+    keys = [f"{_STATS_PREFIX}{t}:{o}" for t in tags for o in ("hit", "miss")]
+    counts = cache.get_many(keys)
+    return {
+        t: {
+            "hits": counts.get(f"{_STATS_PREFIX}{t}:hit", 0),
+            "misses": counts.get(f"{_STATS_PREFIX}{t}:miss", 0),
+        }
+        for t in tags
+    }
+
+
+# ---------- caching ----------
+
+def _key_part(value):
+    if isinstance(value, models.Model):
+        return (value._meta.label_lower, value.pk)
+    return value
+
+
+def make_key(name, parts, tags):
+    raw = repr((tuple(_key_part(p) for p in parts), tuple(tags), tuple(tag_versions(tags))))
+    return f"{_VALUE_PREFIX}{name}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def get_or_set(name, parts, tags, loader, timeout=None):
+    """
+    Return the value cached for (name, parts) under the current tag versions,
+    computing it with `loader()` on a miss. A None result is not stored.
+    """
+    tags = list(tags)
+    key = make_key(name, parts, tags)
+    value = cache.get(key, _missing)
+    if value is not _missing:
+        _record(tags, "hit")
+        return value
+    _record(tags, "miss")
+    value = loader()
+    if value is not None:
+        cache.set(key, value, settings.CACHE_TAGS_TIMEOUT if timeout is None else timeout)
+    return value
+
+
+def cached(name, tags, key=None, timeout=None):
+    """
+    Decorator for functions / methods returning picklable data.
+
+    `tags(*args, **kwargs)` returns the tag list for a call; `key(*args, **kwargs)`
+    returns what the result depends on (default: all arguments, model instances
+    reduced to their pk — pass `key` for methods, `self` has no stable repr).
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            parts = key(*args, **kwargs) if key else args + tuple(sorted(kwargs.items()))
+            return get_or_set(name, parts, tags(*args, **kwargs), lambda: func(*args, **kwargs), timeout)
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+# ---------- model signals ----------
+# These are the only invalidation for invoice, daily entry and master writes.
+# Invoice lines (Sale/PurchaseDetails) are always saved together with their
+# invoice, whose own save covers them.
+
+_OLD_HEADS = "_cachetags_old_heads"
+
+
+@receiver(pre_save, sender=SaleMaster)
+@receiver(pre_save, sender=PurchaseMaster)
+@receiver(pre_save, sender=JamaEntry)
+@receiver(pre_save, sender=NaameEntry)
+def _remember_heads(sender, instance, using, raw=False, **kwargs):
+    # an edit can move the row to another party / broker: both statements change
+    old = None
+    if instance.pk is not None and not raw:
+        old = sender.objects.using(using).filter(pk=instance.pk).values_list("party_id", "broker_id").first()
+    setattr(instance, _OLD_HEADS, old)
+
+
+def _heads(instance):
+    """([party ids], [broker ids]) a saved / deleted row touches: its current and previous ones."""
+    parties, brokers = [instance.party_id], [instance.broker_id]
+    old = instance.__dict__.pop(_OLD_HEADS, None)
+    if old:
+        parties.append(old[0])
+        brokers.append(old[1])
+    return parties, brokers
+
+
+@receiver(post_save, sender=SaleMaster)
+@receiver(post_delete, sender=SaleMaster)
+@receiver(post_save, sender=PurchaseMaster)
+@receiver(post_delete, sender=PurchaseMaster)
+def _invoice_changed(sender, instance, using, **kwargs):
+    area = "sales" if sender is SaleMaster else "purchases"
+    parties, brokers = _heads(instance)
+    invalidate_for(instance.org_id, area, parties=parties, brokers=brokers, using=using)
+
+
+@receiver(post_save, sender=JamaEntry)
+@receiver(post_delete, sender=JamaEntry)
+@receiver(post_save, sender=NaameEntry)
+@receiver(post_delete, sender=NaameEntry)
+def _daily_entry_changed(sender, instance, using, **kwargs):
+    if sender.daily_page.is_cached(instance):
+        org_id = instance.daily_page.org_id
+    else:
+        org_id = DailyPage.objects.using(using).filter(pk=instance.daily_page_id) \
+            .values_list("org_id", flat=True).first()
+    parties, brokers = _heads(instance)
+    invalidate_for(org_id, "daily", parties=parties, brokers=brokers, using=using)
+
+
+@receiver(post_save, sender=HeadParty)
+@receiver(post_delete, sender=HeadParty)
+@receiver(post_save, sender=Broker)
+@receiver(post_delete, sender=Broker)
+@receiver(post_save, sender=HeadItem)
+@receiver(post_delete, sender=HeadItem)
+def _master_changed(sender, instance, using, signal, **kwargs):
+    # a delete cascades to invoices / invoice lines; the lines send no signals
+    areas = ("masters", "sales", "purchases") if signal is post_delete else ("masters",)
+    invalidate_for(
+        instance.org_id, *areas,
+        parties=[instance.pk] if sender is HeadParty else (),
+        brokers=[instance.pk] if sender is Broker else (),
+        using=using,
+    )
@@ -0,0 +1,167 @@
+# brokerapp/daybook.py
+"""
+Day book: the daily pages (jama / naame) of a date range, day after day,
+and the running cash position stored on every DailyPage.
+
+Balances: each page keeps its opening balance (the previous page's closing),
+its jama / naame totals and its closing balance (opening + jama - naame).
+Adding or deleting an entry goes through apply_entry(), which moves that
+page's totals and closing plus the balances of every later page of the org
+in one UPDATE, so a backdated entry costs one statement however many days
+follow it. Changes are serialized per org (lock_balances). Entries edited
+outside the daily page views (admin, shell) are put right with
+`manage.py rebuild_daily_balances`.
+
+load() reads every entry of a range in one query — jama and naame rows
+UNIONed and ordered by (date, side, entry_no), with the page's stored
+opening balance — and groups them in a single pass. Party and broker names
+are the foreign keys themselves (they are the masters' primary keys), so no
+join or per-row lookup is needed.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+from typing import NamedTuple
+
+from django.db.models import Case, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+
+from .models import DailyPage, JamaEntry, NaameEntry, Organization
+
+# longest range (in days) a day book covers
+MAX_DAYS = 366
+
+JAMA, NAAME = 0, 1
+
+# (entry_no, party, broker, amount, remark)
+ENTRY_FIELDS = ("entry_no", "party_id", "broker_id", "amount", "remark")
+
+BALANCE_FIELDS = ("opening_balance", "total_jama", "total_naame", "closing_balance")
+
+ZERO = Decimal("0")
+
+
+class Day(NamedTuple):
+    date: object
+    jama: list
+    naame: list
+    total_jama: Decimal
+    total_naame: Decimal
+    opening: Decimal        # difference brought forward
+    closing: Decimal        # opening + jama - naame, carried forward
+
+    @property
+    def difference(self):
+        return self.total_jama - self.total_naame
+
+    @property
+    def panels(self):
+        """(title, entries, total) per side, for templates."""
+        return (("Jama", self.jama, self.total_jama), ("Naame", self.naame, self.total_naame))
+
+
+# ---------- stored balances ----------
+
+def lock_balances(org):
+    """Serialize balance changes of `org` until the surrounding transaction ends."""
+    if org is not None:
+        Organization.objects.select_for_update().filter(pk=org.pk).exists()
+
+
+def balance_before(org, date):
+    """Closing balance of the last page of `org` before `date` (0 if none)."""
+    closing = (DailyPage.objects.filter(org=org, date__lt=date)
+               .order_by("-date").values_list("closing_balance", flat=True).first())
+    return closing if closing is not None else ZERO
+
+
+def get_or_create_page(org, date):
+    """The DailyPage of `org` for `date`; a new one opens at the previous page's closing."""
+    page = DailyPage.objects.filter(org=org, date=date).first()
+    if page is None:
+        opening = balance_before(org, date)
+        page = DailyPage.objects.create(org=org, date=date, opening_balance=opening, closing_balance=opening)
+    return page
+
+
+def apply_entry(page, jama=ZERO, naame=ZERO):
+    """
+    Add `jama` / `naame` (negative for a deleted entry) to `page`'s totals and
+    move its closing balance and the opening and closing of every later page
+    by the difference — one UPDATE over the page and the days after it.
+    """
+    jama, naame = Decimal(jama), Decimal(naame)
+    diff = jama - naame
+
+    def amount(value):
+        return Value(value, output_field=DecimalField(max_digits=16, decimal_places=2))
+
+    def on_page(value, elsewhere=ZERO):
+        return Case(When(date=page.date, then=amount(value)), default=amount(elsewhere))
+
+    DailyPage.objects.filter(org_id=page.org_id, date__gte=page.date).update(
+        opening_balance=F("opening_balance") + on_page(ZERO, diff),
+        total_jama=F("total_jama") + on_page(jama),
+        total_naame=F("total_naame") + on_page(naame),
+        closing_balance=F("closing_balance") + amount(diff),
+    )
+
+
+def _page_total(model):
+    return Subquery(
+        model.objects.filter(daily_page=OuterRef("pk")).order_by()
+        .values("daily_page").annotate(t=Sum("amount")).values("t")
+    )
+
+
+def rebuild_balances(org):
+    """Recompute the stored balances of every page of `org` from its entries; returns the pages changed."""
+    pages = (DailyPage.objects.filter(org=org).order_by("date")
+             .annotate(j=_page_total(JamaEntry), n=_page_total(NaameEntry)))
+    changed = []
+    balance = ZERO
+    for page in pages:
+        stored = tuple(getattr(page, f) for f in BALANCE_FIELDS)
+        page.opening_balance = balance
+        page.total_jama = page.j or ZERO
+        page.total_naame = page.n or ZERO
+        balance = page.closing_balance = balance + page.total_jama - page.total_naame
+        if tuple(getattr(page, f) for f in BALANCE_FIELDS) != stored:
+            changed.append(page)
+    DailyPage.objects.bulk_update(changed, BALANCE_FIELDS, batch_size=500)
+    return len(changed)
+
+
+# ---------- day book ----------
+
+def _entries(model, side, org, **filters):
+    return (model.objects.filter(daily_page__org=org, **filters)
+            .annotate(side=Value(side, output_field=IntegerField()))
+            .values_list("daily_page__date", "side", "daily_page__opening_balance", *ENTRY_FIELDS)
+            .order_by())  # the union is ordered as a whole
+
+
+def load(org, start, end):
+    """The days of `org` from `start` to `end` that have entries, in date order."""
+    rows = (
+        _entries(JamaEntry, JAMA, org, daily_page__date__range=(start, end))
+        .union(_entries(NaameEntry, NAAME, org, daily_page__date__range=(start, end)), all=True)
+        .order_by("daily_page__date", "side", "entry_no")
+    )
+    days = []
+    for day, day_rows in groupby(rows, key=lambda r: r[0]):
+        sides = ([], [])
+        for row in day_rows:
+            opening = row[2]
+            sides[row[1]].append(row[3:])
+        total_jama = sum((e[3] for e in sides[JAMA]), ZERO)
+        total_naame = sum((e[3] for e in sides[NAAME]), ZERO)
+        days.append(Day(day, sides[JAMA], sides[NAAME], total_jama, total_naame,
+                        opening, opening + total_jama - total_naame))
+    return days
+
+
+def clamp_range(start, end):
+    """(start, end) ordered and cut to MAX_DAYS."""
+    if end < start:
+        start, end = end, start
+    return start, min(end, start + timedelta(days=MAX_DAYS - 1))
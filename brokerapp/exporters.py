@@ -0,0 +1,165 @@
+# brokerapp/exporters.py
+"""
+Exports that stream instead of building the file in memory.
+
+Rows come from any iterable (normally a generator over ``.iterator()``
+querysets).
+
+- XLSX: rows go straight into an openpyxl write-only worksheet, which spools
+  them to disk as they are appended; the views write the workbook into the
+  artifact cache (brokerapp.artifacts), which serves it with FileResponse.
+- CSV / TSV: rows are encoded in small batches and sent with
+  StreamingHttpResponse (optionally gzipped on the fly), so the first bytes
+  leave before the query has finished.
+
+Memory stays flat however many rows there are. openpyxl is imported when an
+export runs, not with this module.
+"""
+import csv
+import zlib
+from itertools import chain, islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# ?export=<format> -> (content type, csv delimiter)
+TABLE_FORMATS = {
+    "csv": ("text/csv", ","),
+    "tsv": ("text/tab-separated-values", "\t"),
+}
+
+# rows fetched per round trip by the report / listing exports
+EXPORT_CHUNK_SIZE = 2000
+
+# encoded rows are sent in pieces of about this size
+STREAM_BUFFER_BYTES = 64 * 1024
+
+# column widths are sized from the header and this many leading rows
+WIDTH_SAMPLE_ROWS = 500
+MAX_COLUMN_WIDTH = 60
+
+
+def column_widths(headers, rows):
+    """Width per column: longest value in `headers` / `rows` plus padding, capped."""
+    widths = [len(str(h)) for h in headers]
+    for row in rows:
+        for i, value in enumerate(row):
+            size = len(str(value)) if value is not None else 0
+            if i >= len(widths):
+                widths.append(size)
+            elif size > widths[i]:
+                widths[i] = size
+    return [min(w + 2, MAX_COLUMN_WIDTH) for w in widths]
+
+
+def write_xlsx(fileobj, headers, rows, title="Sheet", footer=None):
+    """
+    Write one worksheet to `fileobj`: `headers`, then every row of `rows`,
+    then the rows returned by `footer()` (called after `rows` is exhausted,
+    so it can report totals gathered while streaming).
+    """
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    rows = iter(rows)
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    # write-only sheets only take column widths before the first row
+    for i, width in enumerate(column_widths(headers, sample), start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+
+    ws.append(list(headers))
+    for row in chain(sample, rows):
+        ws.append(row)
+    for row in (footer() if footer else ()):
+        ws.append(row)
+    wb.save(fileobj)
+
+
+# ---------- CSV / TSV ----------
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def delimited_chunks(headers, rows, delimiter=","):
+    """Encode `headers` + `rows` as delimited UTF-8 text, yielded in ~STREAM_BUFFER_BYTES pieces."""
+    writer = csv.writer(_Echo(), delimiter=delimiter)
+    # BOM so Excel opens UTF-8 (Devanagari names etc.) correctly
+    buf = ["\ufeff" + writer.writerow(headers)]
+    size = 0
+    for row in rows:
+        line = writer.writerow(row)
+        buf.append(line)
+        size += len(line)
+        if size >= STREAM_BUFFER_BYTES:
+            yield "".join(buf).encode("utf-8")
+            buf, size = [], 0
+    yield "".join(buf).encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a byte stream on the fly; output is sent as soon as zlib emits it."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _async_chunks(chunks):
+    """
+    Serve a sync generator to an ASGI server one chunk at a time.
+
+    StreamingHttpResponse would otherwise list() a sync iterator before
+    sending anything under ASGI. thread_sensitive keeps every step on the
+    thread that owns the DB connection / open cursor.
+    """
+    step = sync_to_async(next, thread_sensitive=True)
+
+    async def stream():
+        while (chunk := await step(chunks, None)) is not None:
+            yield chunk
+
+    return stream()
+
+
+def requested_format(request):
+    """The table format asked for with ?export=csv|tsv, else None."""
+    fmt = (request.GET.get("export") or "").lower()
+    return fmt if fmt in TABLE_FORMATS else None
+
+
+def table_response(request, basename, headers, rows, fmt=None):
+    """
+    Streaming CSV / TSV attachment of `headers` + `rows`.
+
+    The format comes from `fmt` or ?export=; ?gzip=1 sends `<basename>.<fmt>.gz`
+    compressed on the fly.
+    """
+    fmt = fmt or requested_format(request) or "csv"
+    content_type, delimiter = TABLE_FORMATS[fmt]
+    filename = f"{basename}.{fmt}"
+
+    chunks = delimited_chunks(headers, rows, delimiter)
+    if request.GET.get("gzip") in ("1", "true", "yes"):
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        content_type = "application/gzip"
+    else:
+        content_type += "; charset=utf-8"
+
+    if isinstance(request, ASGIRequest):
+        chunks = _async_chunks(chunks)
+    resp = StreamingHttpResponse(chunks, content_type=content_type)
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
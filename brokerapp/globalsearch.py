@@ -0,0 +1,257 @@
+# brokerapp/globalsearch.py
+"""
+One search box over invoices, daily entries and master records.
+
+Every sale / purchase invoice (header fields, party, broker, and its lines'
+lot numbers and items), jama / naame entry and party / broker / item has one
+SearchDocument row holding its normalized text, a title and a date. A search
+is a single lookup on that table, scoped to the org:
+
+- SQLite: the FTS5 trigram index brokerapp_searchdocument_fts (migration
+  0023) answers words of 3+ characters; shorter words use LIKE.
+- PostgreSQL: LIKE on the text, served by its pg_trgm GIN index.
+
+Documents follow the data through the model signals below: a save / delete
+marks the record, and its document is rebuilt (or removed) once the
+transaction commits — once per record, however many lines were written.
+Rows that existed before the search are indexed by migration 0023; rows
+written without signals (bulk_create, queryset.update) are picked up by
+`manage.py rebuild_search_index`.
+"""
+import threading
+from collections import defaultdict
+from functools import partial
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from . import linesearch
+from .models import (
+    Broker, HeadItem, HeadParty, JamaEntry, NaameEntry, PurchaseDetails, PurchaseMaster, SaleDetails,
+    SaleMaster, SearchDocument,
+)
+
+FTS_TABLE = "brokerapp_searchdocument_fts"
+FTS_TRIGGERS = ("_ai", "_ad", "_au")
+
+MAX_RESULTS = 50
+MIN_QUERY_LENGTH = 2
+BATCH_SIZE = 500
+
+KIND_LABELS = dict(SearchDocument.KIND_CHOICES)
+
+
+class Hit(NamedTuple):
+    kind: str
+    label: str          # "Sale", "Jama", "Party" ...
+    title: str
+    date: object        # None for master records
+    url: str
+
+
+def normalize(*parts):
+    """Lower-cased, whitespace-collapsed text of the non-empty `parts`."""
+    return " ".join(" ".join(str(p).casefold().split()) for p in parts if p not in (None, ""))
+
+
+# ---------- documents ----------
+
+def _invoice_docs(kind, master_model, line_model, fk, pks, using):
+    lines = defaultdict(list)
+    for master_id, lotno, item_id in (line_model.objects.using(using)
+                                      .filter(**{f"{fk}__in": pks}).values_list(fk, "lotno", "item_id")):
+        lines[master_id] += [lotno, item_id]
+    label = KIND_LABELS[kind]
+    for inv in master_model.objects.using(using).filter(pk__in=pks):
+        yield SearchDocument(
+            org_id=inv.org_id, kind=kind, key=str(inv.pk), date=inv.invdate,
+            title=f"{label} #{inv.pk} — {inv.party_id}",
+            text=normalize(inv.pk, inv.awakno, inv.vehicleno, inv.remark, inv.party_id, inv.broker_id,
+                           *lines[inv.pk]),
+        )
+
+
+def _entry_docs(kind, model, pks, using):
+    label = KIND_LABELS[kind]
+    rows = model.objects.using(using).filter(pk__in=pks).values_list(
+        "entry_no", "daily_page__org_id", "daily_page__date", "party_id", "broker_id", "amount", "remark")
+    for entry_no, org_id, day, party, broker, amount, remark in rows:
+        yield SearchDocument(
+            org_id=org_id, kind=kind, key=str(entry_no), date=day,
+            title=f"{label} — {party} {amount}",
+            text=normalize(party, broker, amount, remark),
+        )
+
+
+def _party_docs(pks, using):
+    for p in HeadParty.objects.using(using).filter(pk__in=pks):
+        yield SearchDocument(
+            org_id=p.org_id, kind="party", key=p.pk, title=p.partyname,
+            text=normalize(p.partyname, p.city, p.state, p.mobile, p.otherno, p.add1, p.add2, p.remark),
+        )
+
+
+def _broker_docs(pks, using):
+    for b in Broker.objects.using(using).filter(pk__in=pks):
+        yield SearchDocument(org_id=b.org_id, kind="broker", key=b.pk, title=b.brokername,
+                             text=normalize(b.brokername, b.mobileno, b.remark))
+
+
+def _item_docs(pks, using):
+    for i in HeadItem.objects.using(using).filter(pk__in=pks):
+        yield SearchDocument(org_id=i.org_id, kind="item", key=i.pk, title=i.item_name, text=normalize(i.item_name))
+
+
+# kind -> (source model, org lookup on it, builder(pks, using) -> SearchDocuments)
+SOURCES = {
+    "sale": (SaleMaster, "org", partial(_invoice_docs, "sale", SaleMaster, SaleDetails, "salemaster")),
+    "purchase": (PurchaseMaster, "org", partial(_invoice_docs, "purchase", PurchaseMaster, PurchaseDetails,
+                                                "purchasemaster")),
+    "jama": (JamaEntry, "daily_page__org", partial(_entry_docs, "jama", JamaEntry)),
+    "naame": (NaameEntry, "daily_page__org", partial(_entry_docs, "naame", NaameEntry)),
+    "party": (HeadParty, "org", _party_docs),
+    "broker": (Broker, "org", _broker_docs),
+    "item": (HeadItem, "org", _item_docs),
+}
+
+
+def reindex(marks, using="default"):
+    """Rebuild the documents of the (kind, key) pairs in `marks`; records that no longer exist lose theirs."""
+    by_kind = defaultdict(set)
+    for kind, key in marks:
+        by_kind[kind].add(str(key))
+    docs, gone = [], Q()
+    for kind, keys in by_kind.items():
+        built = {d.key: d for d in SOURCES[kind][2](list(keys), using)}
+        docs += built.values()
+        missing = keys - built.keys()
+        if missing:
+            gone |= Q(kind=kind, key__in=missing)
+    with transaction.atomic(using=using):
+        if gone:
+            SearchDocument.objects.using(using).filter(gone).delete()
+        SearchDocument.objects.using(using).bulk_create(
+            docs, batch_size=BATCH_SIZE, update_conflicts=True,
+            unique_fields=["kind", "key"], update_fields=["org", "date", "title", "text"],
+        )
+
+
+def rebuild(org=None, using="default"):
+    """Rebuild every document (of `org`, or all); returns how many were written."""
+    written = 0
+    with transaction.atomic(using=using):
+        docs = SearchDocument.objects.using(using)
+        (docs.filter(org=org) if org is not None else docs).delete()
+        for kind, (model, org_lookup, build) in SOURCES.items():
+            pks = model.objects.using(using).order_by("pk")
+            if org is not None:
+                pks = pks.filter(**{org_lookup: org})
+            pks = list(pks.values_list("pk", flat=True))
+            for i in range(0, len(pks), BATCH_SIZE):
+                chunk = list(build(pks[i:i + BATCH_SIZE], using))
+                SearchDocument.objects.using(using).bulk_create(chunk)
+                written += len(chunk)
+    return written
+
+
+# ---------- keeping documents current ----------
+
+_local = threading.local()
+
+
+def _pending(using):
+    if not hasattr(_local, "pending"):
+        _local.pending = defaultdict(set)
+    return _local.pending[using]
+
+
+def _flush(using):
+    pending = _pending(using)
+    marks = set(pending)
+    pending.clear()
+    if marks:
+        reindex(marks, using)
+
+
+def mark(kind, key, using="default"):
+    """Rebuild the document of record (kind, key) when the current transaction commits."""
+    _pending(using).add((kind, str(key)))
+    # one callback per mark; the first to run flushes them all, the rest find nothing
+    transaction.on_commit(partial(_flush, using), using=using)
+
+
+_KINDS = {SaleMaster: "sale", PurchaseMaster: "purchase", JamaEntry: "jama", NaameEntry: "naame",
+          HeadParty: "party", Broker: "broker", HeadItem: "item"}
+
+
+@receiver(post_save, sender=SaleMaster)
+@receiver(post_delete, sender=SaleMaster)
+@receiver(post_save, sender=PurchaseMaster)
+@receiver(post_delete, sender=PurchaseMaster)
+@receiver(post_save, sender=JamaEntry)
+@receiver(post_delete, sender=JamaEntry)
+@receiver(post_save, sender=NaameEntry)
+@receiver(post_delete, sender=NaameEntry)
+@receiver(post_save, sender=HeadParty)
+@receiver(post_delete, sender=HeadParty)
+@receiver(post_save, sender=Broker)
+@receiver(post_delete, sender=Broker)
+@receiver(post_save, sender=HeadItem)
+@receiver(post_delete, sender=HeadItem)
+def _record_changed(sender, instance, using, **kwargs):
+    mark(_KINDS[sender], instance.pk, using)
+
+
+@receiver(post_save, sender=SaleDetails)
+@receiver(post_delete, sender=SaleDetails)
+def _sale_line_changed(sender, instance, using, **kwargs):
+    mark("sale", instance.salemaster_id, using)
+
+
+@receiver(post_save, sender=PurchaseDetails)
+@receiver(post_delete, sender=PurchaseDetails)
+def _purchase_line_changed(sender, instance, using, **kwargs):
+    mark("purchase", instance.purchasemaster_id, using)
+
+
+# ---------- search ----------
+
+def _url(kind, key, day):
+    if kind in ("sale", "purchase"):
+        return reverse(f"{kind}_form_update", args=[int(key)])
+    if kind in ("jama", "naame"):
+        return f"{reverse('daily_page')}?date={day:%Y-%m-%d}"
+    if kind == "item":
+        return reverse("item")
+    return reverse(f"{kind}_edit", args=[key])
+
+
+def search(org, q, limit=MAX_RESULTS, using="default"):
+    """Hits for `q` in `org`: every word must appear; exact key matches first, then newest."""
+    words = normalize(q).split()
+    if len(" ".join(words)) < MIN_QUERY_LENGTH:
+        return []
+    docs = SearchDocument.objects.using(using).filter(org=org)
+
+    use_fts = linesearch.fts_available(using, FTS_TABLE, FTS_TRIGGERS)
+    phrases = []
+    for word in words:
+        if use_fts and len(word) >= linesearch.FTS_MIN_LENGTH:
+            phrases.append('"%s"' % word.replace('"', '""'))
+        else:
+            docs = docs.filter(text__contains=word)
+    if phrases:
+        docs = docs.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [" AND ".join(phrases)]
+        ))
+
+    exact = Case(When(key__iexact=q.strip(), then=Value(0)), default=Value(1), output_field=IntegerField())
+    rows = (docs.annotate(exact=exact)
+            .order_by("exact", "-date", "kind", "title")
+            .values_list("kind", "key", "date", "title")[:limit])
+    return [Hit(kind, KIND_LABELS[kind], title, day, _url(kind, key, day)) for kind, key, day, title in rows]
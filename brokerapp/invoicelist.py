@@ -0,0 +1,74 @@
+# brokerapp/invoicelist.py
+"""
+Sale / purchase invoice lists: filters, sort orders and one page of rows.
+
+The lists read only the columns they show. Party and broker are shown by
+name, which is the foreign key value itself (the masters' primary key), so
+no join is made. Pages are keyset pages (brokerapp.keyset) over the sort
+order, which always ends in invno; with the (org, invno) / (org, invdate)
+indexes a page is an index range read whatever its depth.
+"""
+from django.utils.dateparse import parse_date
+
+from . import keyset
+# ?sort= value -> ordering (ends in the unique invno for keyset paging)
+SORTS = {
+    "-invno": ("-invno",),
+    "invno": ("invno",),
+    "-invdate": ("-invdate", "-invno"),
+    "invdate": ("invdate", "invno"),
+}
+DEFAULT_SORT = "-invno"
+
+LIST_FIELDS = ("invno", "invdate", "party", "broker", "vehicleno", "netamt")
+
+FILTER_PARAMS = ("start_date", "end_date", "party", "broker", "vehicle")
+
+
+def filter_params(params):
+    """The list filters present in `params` (GET), cleaned: {name: value}."""
+    filters = {}
+    for name in FILTER_PARAMS:
+        value = (params.get(name) or "").strip()
+        if name.endswith("_date"):
+            try:
+                value = parse_date(value) if value else None
+            except ValueError:
+                value = None
+        if value:
+            filters[name] = value
+    return filters
+
+
+def apply_filters(invoices, filters):
+    if "start_date" in filters:
+        invoices = invoices.filter(invdate__gte=filters["start_date"])
+    if "end_date" in filters:
+        invoices = invoices.filter(invdate__lte=filters["end_date"])
+    if "party" in filters:
+        invoices = invoices.filter(party_id=filters["party"])
+    if "broker" in filters:
+        invoices = invoices.filter(broker_id=filters["broker"])
+    if "vehicle" in filters:
+        invoices = invoices.filter(vehicleno__icontains=filters["vehicle"])
+    return invoices
+
+
+def sort_key(params):
+    sort = params.get("sort") or DEFAULT_SORT
+    return sort if sort in SORTS else DEFAULT_SORT
+
+
+def listing(model, org, params):
+    """(queryset, filters, sort) of the invoice list of `org` for the GET `params`."""
+    filters = filter_params(params)
+    sort = sort_key(params)
+    invoices = apply_filters(model.objects.filter(org=org), filters).order_by(*SORTS[sort])
+    return invoices, filters, sort
+
+
+def page_context(invoices, params):
+    """Template context of one page of the `invoices` listing: rows, pager and count."""
+    page = keyset.paginate(invoices.only(*LIST_FIELDS), params.get("after"), params.get("before"))
+    return {"page": page, "count": keyset.count(invoices)}
+
@@ -0,0 +1,206 @@
+# brokerapp/invoices.py
+"""
+Printable sale invoices (one or more A4 pages each), for batch printing.
+
+- load() reads the invoices and all their lines in two queries and turns them
+  into plain dicts, so rendering needs no database access.
+- write_pdf() renders them into one PDF. Big batches are split into chunks
+  rendered by worker processes (spawned, so nothing of the web worker's
+  threads / DB connections is inherited) and merged with pypdf. Without
+  pypdf, or for small batches, everything is rendered in this process.
+
+fpdf / num2words / pypdf are imported when used, not with this module.
+"""
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.db.models import Prefetch
+
+from . import pdftable
+
+# batches smaller than this are rendered in-process (spawning costs ~0.3 s)
+PARALLEL_MIN_INVOICES = 60
+# invoices per chunk handed to a worker process
+CHUNK_INVOICES = 40
+
+ITEM_COLUMNS = [
+    pdftable.Column("Item", 38),
+    pdftable.Column("Lot", 16, "C"),
+    pdftable.Column("Bora", 14, "R", pdftable.money),
+    pdftable.Column("TBWt", 16, "R", pdftable.money),
+    pdftable.Column("Qty", 16, "R", pdftable.money),
+    pdftable.Column("Rate", 16, "R", pdftable.money),
+    pdftable.Column("Amount", 24, "R", pdftable.money),
+    pdftable.Column("PWt", 16, "R", pdftable.money),
+    pdftable.Column("MWt", 16, "R", pdftable.money),
+    pdftable.Column("FrkWt", 18, "R", pdftable.money),
+]
+
+SUMMARY_COLUMNS = [
+    pdftable.Column(None, 50),
+    pdftable.Column(None, 30, "R", pdftable.money),
+]
+SUMMARY_WIDTH = sum(c.width for c in SUMMARY_COLUMNS)
+
+ITEM_FIELDS = ("item_id", "lotno", "bora", "tbwt", "qty", "rate", "amount", "partywt", "millwt", "frkwt")
+
+
+def load(sales):
+    """Plain-data invoices for the `sales` queryset (invoice order kept): two queries."""
+    from .models import SaleDetails  # not at import time: worker processes load this module without Django
+
+    lines = SaleDetails.objects.order_by("pk").only("salemaster", "item", *ITEM_FIELDS[1:])
+    sales = sales.select_related("org", "party", "broker").prefetch_related(Prefetch("details", queryset=lines))
+    invoices = []
+    for s in sales:
+        p = s.party
+        invoices.append({
+            "invno": s.invno,
+            "invdate": s.invdate,
+            "org": s.org.name if s.org else "",
+            "party": p.partyname,
+            "address": [line for line in (p.add1, p.add2, ", ".join(x for x in (p.city, p.state) if x)) if line],
+            "mobile": p.mobile,
+            "broker": s.broker.brokername if s.broker else "",
+            "vehicleno": s.vehicleno or "",
+            "awakno": s.awakno or "",
+            "remark": s.remark or "",
+            "totalamt": s.totalamt, "batavpercent": s.batavpercent, "batavamt": s.batavamt,
+            "dr": s.dr, "dramt": s.dramt, "qi": s.qi, "other": s.other,
+            "total": s.total, "advance": s.advance, "netamt": s.netamt,
+            "items": [tuple(getattr(d, f) for f in ITEM_FIELDS) for d in s.details.all()],
+        })
+    return invoices
+
+
+def _title(words):
+    return " ".join(w if w == "and" else w.capitalize() for w in words.replace(",", "").split())
+
+
+def amount_in_words(value):
+    """
+    'Rupees One Lakh Twenty Thousand and Fifty and Paise Seventy-five Only'
+    (Indian numbering). A negative amount (advance above the total) reads
+    'Minus Rupees ... Only'.
+    """
+    from num2words import num2words
+
+    value = Decimal(value or 0).quantize(Decimal("0.01"))
+    prefix = "Minus " if value < 0 else ""
+    value = abs(value)
+    rupees = int(value)
+    paise = int((value - rupees) * 100)
+    words = f"{prefix}Rupees {_title(num2words(rupees, lang='en_IN'))}"
+    if paise:
+        words += f" and Paise {_title(num2words(paise, lang='en_IN'))}"
+    return words + " Only"
+
+
+# ---------- rendering ----------
+
+def _label_value(pdf, x, label, value, width):
+    pdf.set_x(x)
+    pdf.set_font(pdftable.FONT, "B", 9)
+    pdf.cell(22, 5, label)
+    pdf.set_font(pdftable.FONT, "", 9)
+    pdf.cell(width - 22, 5, pdftable.clean_text(pdf, value), new_x="LMARGIN", new_y="NEXT")
+
+
+def _draw_invoice(pdf, inv):
+    left = pdf.l_margin
+    page_width = pdf.w - pdf.l_margin - pdf.r_margin
+
+    pdf.set_font(pdftable.FONT, "B", 15)
+    pdf.cell(0, 8, pdftable.clean_text(pdf, inv["org"]), new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.set_font(pdftable.FONT, "", 10)
+    pdf.cell(0, 5, "SALE INVOICE", new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.ln(3)
+
+    # party on the left, invoice facts on the right
+    top = pdf.y
+    half = page_width / 2
+    _label_value(pdf, left, "Party:", inv["party"], half)
+    for line in inv["address"]:
+        _label_value(pdf, left, "", line, half)
+    if inv["mobile"]:
+        _label_value(pdf, left, "Mobile:", inv["mobile"], half)
+    party_bottom = pdf.y
+
+    pdf.set_y(top)
+    for label, value in (("Inv No:", inv["invno"]), ("Date:", pdftable.dmy(inv["invdate"])),
+                         ("Broker:", inv["broker"]), ("Vehicle:", inv["vehicleno"]), ("Awak No:", inv["awakno"])):
+        _label_value(pdf, left + half, label, value, half)
+    pdf.set_y(max(party_bottom, pdf.y) + 3)
+
+    # items + totals
+    items = pdftable.Table(pdf, ITEM_COLUMNS, row_height=6, header_height=7)
+    items.header()
+    items.rows(inv["items"])
+    totals = [sum((row[i] or 0 for row in inv["items"]), Decimal("0")) for i in (2, 3, 4)]
+    items.row(("Total", "", totals[0], totals[1], totals[2], "", inv["totalamt"], "", "", ""), style="B")
+    pdf.ln(3)
+
+    # deductions, right-aligned under the table
+    summary = pdftable.Table(pdf, SUMMARY_COLUMNS, x=left + page_width - SUMMARY_WIDTH, row_height=6)
+    summary.ensure_room(6 * 8 + 20)
+    summary.rows([
+        ("Gross Amount", inv["totalamt"]),
+        (f"Batav ({pdftable.amount(inv['batavpercent'])}%)", inv["batavamt"]),
+        (f"Dalali ({pdftable.amount(inv['dr'])})", inv["dramt"]),
+        ("QI", inv["qi"]),
+        ("Other", inv["other"]),
+        ("Total", inv["total"]),
+        ("Advance", inv["advance"]),
+    ])
+    summary.row(("Net Amount", inv["netamt"]), style="B", fill=(235, 235, 235))
+    pdf.ln(3)
+
+    pdf.set_font(pdftable.FONT, "B", 9)
+    pdf.multi_cell(0, 5, pdftable.clean_text(pdf, amount_in_words(inv["netamt"])), new_x="LMARGIN", new_y="NEXT")
+    if inv["remark"]:
+        pdf.set_font(pdftable.FONT, "", 9)
+        pdf.multi_cell(0, 5, pdftable.clean_text(pdf, f"Remark: {inv['remark']}"), new_x="LMARGIN", new_y="NEXT")
+
+    # signatures
+    pdf.ln(14)
+    pdf.set_font(pdftable.FONT, "", 9)
+    pdf.cell(half, 5, "Receiver's Signature")
+    pdf.cell(half, 5, pdftable.clean_text(pdf, f"For {inv['org']}"), align="R", new_x="LMARGIN", new_y="NEXT")
+
+
+def render_chunk(invoices):
+    """PDF bytes with every invoice of `invoices` starting on a new page (runs in worker processes)."""
+    pdf = pdftable.document()
+    for i, inv in enumerate(invoices):
+        if i:
+            pdf.add_page()
+        _draw_invoice(pdf, inv)
+    return bytes(pdf.output())
+
+
+def _load_pdf_writer():
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        return None
+    return PdfWriter
+
+
+def write_pdf(invoices, fileobj, workers=1):
+    """Write `invoices` (see load()) to `fileobj` as one PDF, using up to `workers` processes."""
+    PdfWriter = _load_pdf_writer()
+    if workers <= 1 or PdfWriter is None or len(invoices) < PARALLEL_MIN_INVOICES:
+        fileobj.write(render_chunk(invoices))
+        return
+
+    chunks = [invoices[i:i + CHUNK_INVOICES] for i in range(0, len(invoices), CHUNK_INVOICES)]
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=ctx) as pool:
+        parts = list(pool.map(render_chunk, chunks))  # map keeps chunk order
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(io.BytesIO(part))
+    writer.write(fileobj)
@@ -0,0 +1,209 @@
+# brokerapp/jobs.py
+"""
+Small database-backed job queue (no external broker needed).
+
+- Views call ``enqueue()`` and hand the user a status URL.
+- ``manage.py run_worker`` loops over ``claim_next()`` / ``run_job()``.
+- A handler receives the Job and returns ``(filename, content_type, payload)``;
+  payload is the file's bytes, or a callable that writes them to the open
+  result file (so big exports stream to disk). Results land under
+  settings.JOB_RESULTS_DIR.
+- Results are kept for settings.JOB_RESULT_TTL seconds; ``cleanup()`` (run by
+  the worker every JOB_CLEANUP_INTERVAL, or ``manage.py cleanup_jobs``)
+  deletes expired files and old job rows.
+"""
+import logging
+import os
+import re
+import socket
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job.kind -> dotted path of handler(job). Imported lazily so the worker
+# only loads what it actually runs.
+JOB_HANDLERS = {
+    "sale_report_pdf": "brokerapp.views.exports.sale_report_pdf_job",
+    "daily_page_pdf": "brokerapp.views.exports.daily_page_pdf_job",
+    "view_export": "brokerapp.views.ops.view_export_job",
+}
+
+# never wait longer than this between retries
+MAX_BACKOFF = 3600
+
+# suffix of result files still being written
+PARTIAL_SUFFIX = ".part"
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def results_dir():
+    path = Path(settings.JOB_RESULTS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def result_path(job):
+    """Absolute path of a finished job's file (None if there is none)."""
+    if not job.result_file:
+        return None
+    return results_dir() / job.result_file
+
+
+def enqueue(kind, org=None, user=None, params=None, max_attempts=3):
+    """Queue a job; raises ValueError for an unknown kind."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if user is not None and not getattr(user, "is_authenticated", False):
+        user = None
+    return Job.objects.create(
+        org=org,
+        created_by=user,
+        kind=kind,
+        params=params or {},
+        max_attempts=max_attempts,
+    )
+
+
+def _claimable():
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    return (
+        Job.objects
+        .filter(Q(state=Job.QUEUED, run_after__lte=now) | Q(state=Job.RUNNING, locked_at__lt=stale))
+        .order_by("run_after", "id")
+    )
+
+
+def claim_next(worker_id=None):
+    """
+    Atomically move the next runnable job to RUNNING and return it (or None).
+
+    PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers never
+    block on each other. SQLite has no row locks: pick candidates and claim with
+    a conditional UPDATE — only the worker whose UPDATE matched a row wins.
+    """
+    worker_id = worker_id or default_worker_id()
+    now = timezone.now()
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = _claimable().select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.state = Job.RUNNING
+            job.locked_by = worker_id
+            job.locked_at = now
+            job.attempts += 1
+            job.save(update_fields=["state", "locked_by", "locked_at", "attempts"])
+            return job
+
+    candidates = _claimable().values_list("pk", "state", "locked_at", "attempts")[:10]
+    for pk, state, locked_at, attempts in candidates:
+        won = Job.objects.filter(pk=pk, state=state, locked_at=locked_at, attempts=attempts).update(
+            state=Job.RUNNING, locked_by=worker_id, locked_at=now, attempts=attempts + 1,
+        )
+        if won:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def retry_delay(attempts):
+    """Exponential backoff: JOB_RETRY_BACKOFF, x2, x4 ... capped at MAX_BACKOFF seconds."""
+    return min(settings.JOB_RETRY_BACKOFF * (2 ** max(attempts - 1, 0)), MAX_BACKOFF)
+
+
+def _safe_filename(name):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name)[:120] or "result"
+
+
+def run_job(job):
+    """Run a claimed job's handler and record the outcome. Never raises."""
+    try:
+        handler = import_string(JOB_HANDLERS[job.kind])
+        filename, content_type, payload = handler(job)
+
+        rel_name = f"job_{job.pk}_{_safe_filename(filename)}"
+        # written under a temporary name so a half-written file is never served
+        partial = results_dir() / f"{rel_name}{PARTIAL_SUFFIX}"
+        try:
+            with open(partial, "wb") as fh:
+                if callable(payload):
+                    payload(fh)
+                else:
+                    fh.write(payload)
+            os.replace(partial, results_dir() / rel_name)
+        finally:
+            partial.unlink(missing_ok=True)
+
+        job.result_file = rel_name
+        job.result_name = filename
+        job.content_type = content_type
+        job.state = Job.DONE
+        job.progress = 100
+        job.error = ""
+        job.finished_at = timezone.now()
+    except Exception:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.kind, job.attempts)
+        job.error = traceback.format_exc()[-4000:]
+        if job.attempts < job.max_attempts:
+            job.state = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+        else:
+            job.state = Job.FAILED
+            job.finished_at = timezone.now()
+
+    job.locked_by = ""
+    job.locked_at = None
+    job.save()
+    return job
+
+
+def cleanup(now=None):
+    """
+    Delete expired results and old jobs; returns (files_removed, jobs_deleted).
+
+    - DONE jobs finished more than JOB_RESULT_TTL ago lose their file (the row
+      stays, so the status page can say "expired").
+    - DONE / FAILED jobs finished more than JOB_HISTORY_TTL ago are deleted.
+    - Files in JOB_RESULTS_DIR that no job points at (a worker killed while
+      writing, a deleted job) are removed once older than JOB_RESULT_TTL.
+    """
+    now = now or timezone.now()
+    expired_before = now - timedelta(seconds=settings.JOB_RESULT_TTL)
+    directory = results_dir()
+    files_removed = 0
+
+    expired = Job.objects.filter(state=Job.DONE, finished_at__lt=expired_before).exclude(result_file="")
+    for rel_name in expired.values_list("result_file", flat=True):
+        path = directory / rel_name
+        if path.exists():
+            path.unlink()
+            files_removed += 1
+    expired.update(result_file="")
+
+    jobs_deleted, _ = Job.objects.filter(
+        state__in=[Job.DONE, Job.FAILED],
+        finished_at__lt=now - timedelta(seconds=settings.JOB_HISTORY_TTL),
+    ).delete()
+
+    referenced = set(Job.objects.exclude(result_file="").values_list("result_file", flat=True))
+    cutoff = expired_before.timestamp()
+    for path in directory.iterdir():
+        if path.is_file() and path.name not in referenced and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            files_removed += 1
+
+    return files_removed, jobs_deleted
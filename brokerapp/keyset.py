@@ -0,0 +1,173 @@
+# brokerapp/keyset.py
+"""
+Keyset (seek) pagination and cheap result counts for long lists.
+
+A page is asked for by a cursor: the ordering values of the row it starts
+after (?after=) or ends before (?before=). The next page is then "rows past
+these values" — a WHERE on the ordering columns plus LIMIT, with no OFFSET —
+so page 500 costs what page 1 does. The ordering must end in a unique field
+(pk) so that no row is skipped or repeated between pages.
+
+Counting every match of a broad search costs as much as reading it, so
+count() stops at COUNT_LIMIT; past it the total is the planner's estimate
+(PostgreSQL EXPLAIN), or just "more than COUNT_LIMIT" where there is none.
+"""
+import base64
+import binascii
+import json
+from typing import NamedTuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+
+PER_PAGE = 100
+COUNT_LIMIT = 1000
+
+
+class Page(NamedTuple):
+    rows: list
+    next_cursor: str      # ?after= for the next page, None on the last page
+    prev_cursor: str      # ?before= for the previous page, None on the first page
+
+
+class Count(NamedTuple):
+    value: int            # None when over the limit and nothing better is known
+    exact: bool
+    limit: int
+
+
+def encode(values):
+    raw = json.dumps(list(values), cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _convert(field, value):
+    if field is None or value is None:
+        return value
+    value = field.to_python(value)
+    # the validators include the column's integer range, so an id no row can
+    # have is rejected like any other tampered value
+    field.run_validators(value)
+    return value
+
+
+def decode(token, fields):
+    """
+    The values in cursor `token` converted by `fields` (one model field per
+    ordering key, None: taken as is), or None if it is not a valid cursor for
+    them — a tampered ?after= is ignored rather than failing the query.
+    """
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(values, list) or len(values) != len(fields):
+        return None
+    try:
+        return [_convert(f, v) for f, v in zip(fields, values)]
+    except (ValidationError, TypeError, ValueError):
+        return None
+
+
+def _keys(qs):
+    """[(field path, descending)] of the queryset's ordering."""
+    order_by = qs.query.order_by
+    if not order_by or not all(isinstance(f, str) for f in order_by):
+        raise ValueError("keyset pagination needs an explicit ordering by field names")
+    return [(f.lstrip("-"), f.startswith("-")) for f in order_by]
+
+
+def _fields(qs, keys):
+    """The field each key's value has: the model field at the end of its path, or the annotation's."""
+    fields = []
+    for path, _desc in keys:
+        if path in qs.query.annotations:
+            fields.append(qs.query.annotations[path].output_field)
+            continue
+        field, opts = None, qs.model._meta
+        for name in path.split("__"):
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+                break
+            if field.related_model is not None:
+                opts = field.related_model._meta
+        fields.append(field)
+    return fields
+
+
+def _value(row, path):
+    for attr in path.split("__"):
+        row = getattr(row, attr)
+    return row
+
+
+def _seek(keys, values, forward):
+    """Rows strictly after `values` in the order of `keys` (before them if not `forward`)."""
+    cond = Q()
+    for i, (field, desc) in enumerate(keys):
+        op = "lt" if desc == forward else "gt"
+        step = Q(**{f"{field}__{op}": values[i]})
+        for j in range(i):
+            step &= Q(**{keys[j][0]: values[j]})
+        cond |= step
+    return cond
+
+
+def paginate(qs, after=None, before=None, per_page=PER_PAGE):
+    """The Page of the ordered queryset `qs` after cursor `after` (or before `before`)."""
+    keys = _keys(qs)
+    fields = _fields(qs, keys)
+    after = decode(after, fields)
+    before = None if after else decode(before, fields)
+
+    if before is not None:
+        reverse = [("" if desc else "-") + field for field, desc in keys]
+        rows = list(qs.filter(_seek(keys, before, False)).order_by(*reverse)[:per_page + 1])
+        more_before = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_prev, has_next = more_before, True
+    else:
+        if after is not None:
+            qs = qs.filter(_seek(keys, after, True))
+        rows = list(qs[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after is not None
+
+    def cursor(row):
+        return encode(_value(row, field) for field, _ in keys)
+
+    return Page(
+        rows,
+        cursor(rows[-1]) if rows and has_next else None,
+        cursor(rows[0]) if rows and has_prev else None,
+    )
+
+
+def estimate(qs):
+    """The planner's row estimate for `qs` (PostgreSQL), or None."""
+    connection = connections[qs.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = qs.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count(qs, limit=COUNT_LIMIT):
+    """Count of `qs`: exact up to `limit` rows, estimated past it."""
+    n = qs.order_by()[:limit + 1].count()
+    if n <= limit:
+        return Count(n, True, limit)
+    guess = estimate(qs)
+    return Count(max(guess, n) if guess is not None else None, False, limit)
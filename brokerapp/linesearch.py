@@ -0,0 +1,140 @@
+# brokerapp/linesearch.py
+"""
+Sale / purchase line search (LotNo / FrkWt / party / invoice no), always
+within one org.
+
+- invno is matched exactly (the invoice's primary key; a number out of the
+  column's range matches nothing) and the sale frkwt
+  exactly or by range (saledetails_frkwt_idx): B-tree lookups everywhere.
+- LotNo and party are substring matches:
+  * SQLite: for sales, the FTS5 trigram table brokerapp_saledetails_fts
+    (migration 0021, kept in sync by triggers) answers terms of 3+ characters.
+  * PostgreSQL: icontains, served by the pg_trgm GIN indexes of 0021 / 0022.
+  Anything else (short terms, no FTS5, purchases on SQLite) is icontains.
+- Results are ranked per text term: exact match, then prefix, then substring;
+  then newest invoice date first, then newest line. The ordering ends in the
+  line's pk, so it can be paged with brokerapp.keyset.
+
+Party names are HeadParty's primary key, so <master>__party__partyname is
+read from the invoice's party_id without a join to the party table.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import PurchaseDetails, SaleDetails
+
+FTS_TABLE = "brokerapp_saledetails_fts"
+FTS_TRIGGERS = ("_ai", "_ad", "_au", "_master_au")
+# the trigram tokenizer cannot match shorter terms
+FTS_MIN_LENGTH = 3
+
+# kind -> (line model, invoice FK, FTS table or None, searchable by frkwt)
+SOURCES = {
+    "sale": (SaleDetails, "salemaster", FTS_TABLE, True),
+    "purchase": (PurchaseDetails, "purchasemaster", None, False),
+}
+
+# GET param -> (lookup path, "{master}" being the invoice FK; FTS column)
+TEXT_FIELDS = {
+    "lotno": ("lotno", "lotno"),
+    "partyname": ("{master}__party__partyname", "party"),
+}
+
+
+def ordering(kind):
+    """Newest first: invoice date, then line (the keyset pagination key)."""
+    master = SOURCES[kind][1]
+    return (f"-{master}__invdate", "-pk")
+
+# (database NAME, FTS table) -> whether the table and all its triggers exist
+_fts_ready = {}
+
+
+def fts_available(using="default", table=FTS_TABLE, triggers=FTS_TRIGGERS):
+    """True if `using` is SQLite with the FTS index `table` installed and in sync."""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    cache_key = (connection.settings_dict["NAME"], table)
+    if cache_key not in _fts_ready:
+        # a table rebuild by a later migration drops the triggers; then the
+        # index is stale and must not be used
+        wanted = {table} | {table + s for s in triggers}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name IN (%s)" % ", ".join(["%s"] * len(wanted)),
+                list(wanted),
+            )
+            _fts_ready[cache_key] = {row[0] for row in cursor.fetchall()} == wanted
+    return _fts_ready[cache_key]
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _invno(value, field, using):
+    """`value` as an invoice number, or None if it is not one `field`'s column can hold."""
+    if not value.isdigit():
+        return None
+    low, high = connections[using].ops.integer_field_range(field.get_internal_type())
+    number = int(value)
+    return number if low <= number <= high else None
+
+
+def _fts_phrase(column, term):
+    return '%s : "%s"' % (column, term.replace('"', '""'))
+
+
+def search(org, params, kind="sale", using="default"):
+    """Lines (SOURCES[kind]) of `org` matching the search `params`, ranked (see module doc)."""
+    model, master, fts_table, by_frkwt = SOURCES[kind]
+    qs = model.objects.using(using).filter(**{f"{master}__org": org})
+
+    invno = (params.get("invno") or "").strip()
+    if invno:
+        number = _invno(invno, model._meta.get_field(master).target_field, using)
+        qs = qs.filter(**{f"{master}_id": number}) if number is not None else qs.none()
+
+    if by_frkwt:
+        frkwt = _decimal(params.get("frkwt") or "")
+        if frkwt is not None:
+            qs = qs.filter(frkwt=frkwt)
+        else:
+            low, high = _decimal(params.get("frkwt_min") or ""), _decimal(params.get("frkwt_max") or "")
+            if low is not None:
+                qs = qs.filter(frkwt__gte=low)
+            if high is not None:
+                qs = qs.filter(frkwt__lte=high)
+
+    terms = [(field.format(master=master), column, (params.get(param) or "").strip())
+             for param, (field, column) in TEXT_FIELDS.items()]
+    terms = [t for t in terms if t[2]]
+    if not terms:
+        return qs.order_by(*ordering(kind))
+
+    use_fts = fts_table is not None and fts_available(using)
+    phrases = []
+    rank = Value(0)
+    for field, column, term in terms:
+        if use_fts and len(term) >= FTS_MIN_LENGTH:
+            phrases.append(_fts_phrase(column, term))
+        else:
+            qs = qs.filter(Q(**{f"{field}__icontains": term}))
+        rank = rank + Case(
+            When(Q(**{f"{field}__iexact": term}), then=Value(0)),
+            When(Q(**{f"{field}__istartswith": term}), then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        )
+    if phrases:
+        qs = qs.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s", [" AND ".join(phrases)]
+        ))
+    return qs.annotate(rank=rank).order_by("rank", *ordering(kind))
@@ -0,0 +1,131 @@
+# brokerapp/management/commands/bench_pdf.py
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from brokerapp import pdffonts, pdftable
+from brokerapp.views.accounts import STATEMENT_PDF_COLUMNS
+
+
+def _statement_rows(count):
+    day0 = date(2024, 4, 1)
+    bal = Decimal("0")
+    for i in range(count):
+        debit = Decimal(i % 997) * 13 + Decimal("0.55") if i % 3 else Decimal("0")
+        credit = Decimal("0") if i % 3 else Decimal(i % 89) * 101
+        bal += debit - credit
+        yield (i + 1, day0 + timedelta(days=i // 25), debit, credit,
+               f"Sale Inv#{i + 1} lot L{i % 40} vehicle GJ-01-XX-{i % 9999:04}", bal)
+
+
+def _render_table(rows):
+    pdf = pdftable.document("Party Statement - BENCH", "Generated on: benchmark")
+    table = pdftable.Table(pdf, STATEMENT_PDF_COLUMNS, header_height=8)
+    table.header()
+    table.rows(rows)
+    return pdf
+
+
+def _render_cells(rows):
+    """The previous approach: one fpdf cell() per value, header only on page 1."""
+    pdf = pdftable.document("Party Statement - BENCH", "Generated on: benchmark")
+    pdf.set_font(pdftable.FONT, "B", 9)
+    for col in STATEMENT_PDF_COLUMNS:
+        pdf.cell(col.width, 8, col.title, border=1, align="C")
+    pdf.ln(8)
+    pdf.set_font(pdftable.FONT, "", 9)
+    for values in rows:
+        for col, value in zip(STATEMENT_PDF_COLUMNS, values):
+            pdf.cell(col.width, 7, col.fmt(value)[:60], border=1, align=col.align)
+        pdf.ln(7)
+    return pdf
+
+
+def _fonts_add_font():
+    """Per-document font setup without the registry: fpdf parses every TTF again."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    for style, name in settings.PDF_FONTS.items():
+        pdf.add_font(pdftable.FONT, style, pdffonts._resolve(name))
+    return pdf
+
+
+def _fonts_registry():
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdffonts.install(pdf)
+    return pdf
+
+
+def _unicode_document():
+    """One statement page of Devanagari / Latin text, to show what embedding the used glyphs costs."""
+    pdf = pdftable.document("खाता विवरण - राम ट्रेडिंग कंपनी", "Generated on: benchmark")
+    table = pdftable.Table(pdf, STATEMENT_PDF_COLUMNS, header_height=8)
+    table.header()
+    table.rows((i, date(2024, 4, 1), Decimal(i * 100), Decimal(0), f"बिक्री बिल #{i} ₹ — गेहूं", Decimal(i))
+               for i in range(30))
+    return pdf
+
+
+class Command(BaseCommand):
+    help = "Render a synthetic account statement to PDF and report pages per second (--fonts: font setup cost)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Statement lines (default: 10000).")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per renderer; the best is reported.")
+        parser.add_argument("--baseline", action="store_true",
+                            help="Also time the per-cell fpdf rendering for comparison.")
+        parser.add_argument("--fonts", action="store_true",
+                            help="Time per-document font setup (add_font vs the font registry) instead.")
+
+    def _best(self, fn, repeat):
+        best = None
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - started
+            if best is None or elapsed < best[0]:
+                best = (elapsed, result)
+        return best
+
+    def _fonts(self, repeat):
+        started = time.perf_counter()
+        pdffonts.preload()
+        self.stdout.write(f"  registry: first load (once per process) {(time.perf_counter() - started) * 1000:.1f} ms")
+        for name, setup in (("add_font", _fonts_add_font), ("registry", _fonts_registry)):
+            elapsed, _ = self._best(setup, repeat)
+            self.stdout.write(f"{name:>10}: font setup {elapsed * 1000:.2f} ms per document")
+
+        elapsed, size = self._best(lambda: len(_unicode_document().output()), repeat)
+        font_bytes = sum(pdffonts._resolve(n).stat().st_size for n in settings.PDF_FONTS.values())
+        self.stdout.write(f"   unicode: 1-page document in {elapsed * 1000:.1f} ms, {size // 1024} KB "
+                          f"(font files: {font_bytes // 1024} KB)")
+
+    def handle(self, *args, **options):
+        if options["fonts"]:
+            self._fonts(options["repeat"])
+            return
+        rows = list(_statement_rows(options["rows"]))
+        renderers = [("pdftable", _render_table)]
+        if options["baseline"]:
+            renderers.insert(0, ("per-cell", _render_cells))
+
+        for name, render in renderers:
+            best = None
+            for _ in range(max(1, options["repeat"])):
+                started = time.perf_counter()
+                pdf = render(rows)
+                size = len(pdf.output())
+                elapsed = time.perf_counter() - started
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, pdf.pages_count, size)
+            elapsed, pages, size = best
+            self.stdout.write(
+                f"{name:>9}: {len(rows)} rows, {pages} pages, {size // 1024} KB "
+                f"in {elapsed:.2f}s = {pages / elapsed:.0f} pages/s"
+            )
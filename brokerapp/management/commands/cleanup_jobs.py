@@ -0,0 +1,13 @@
+# brokerapp/management/commands/cleanup_jobs.py
+from django.core.management.base import BaseCommand
+
+from brokerapp.jobs import cleanup
+
+
+class Command(BaseCommand):
+    help = ("Delete background-export files older than JOB_RESULT_TTL and job rows older than "
+            "JOB_HISTORY_TTL. run_worker does this on its own every JOB_CLEANUP_INTERVAL.")
+
+    def handle(self, *args, **options):
+        files, jobs = cleanup()
+        self.stdout.write(f"Removed {files} expired file(s) and {jobs} old job(s)")
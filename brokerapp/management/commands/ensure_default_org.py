@@ -0,0 +1,12 @@
+# brokerapp/management/commands/ensure_default_org.py
+from django.core.management.base import BaseCommand
+
+from brokerapp.orgs import ensure_default_org
+
+
+class Command(BaseCommand):
+    help = "Create the shared DEFAULT_ORG_NAME organization if it does not exist (run once at startup)."
+
+    def handle(self, *args, **options):
+        org = ensure_default_org()
+        self.stdout.write(f"Default organization: {org.name} (id={org.pk})")
@@ -0,0 +1,24 @@
+# brokerapp/management/commands/rebuild_daily_balances.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from brokerapp import daybook
+from brokerapp.models import Organization
+
+
+class Command(BaseCommand):
+    help = ("Recompute the opening / closing balances stored on every daily page from its entries "
+            "(needed only after entries were changed outside the daily page screen, e.g. in admin).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", type=int, help="Only this organization id (default: all).")
+
+    def handle(self, *args, **options):
+        orgs = Organization.objects.all()
+        if options["org"]:
+            orgs = orgs.filter(pk=options["org"])
+        for org in orgs:
+            with transaction.atomic():
+                daybook.lock_balances(org)
+                changed = daybook.rebuild_balances(org)
+            self.stdout.write(f"{org}: {changed} page(s) corrected")
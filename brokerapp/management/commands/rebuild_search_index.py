@@ -0,0 +1,18 @@
+# brokerapp/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from brokerapp import globalsearch
+from brokerapp.models import Organization
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the global search documents from the invoices, daily entries and masters "
+            "(needed after installing the search, or after bulk imports that bypass model signals).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", type=int, help="Only this organization id (default: all).")
+
+    def handle(self, *args, **options):
+        org = Organization.objects.get(pk=options["org"]) if options["org"] else None
+        written = globalsearch.rebuild(org)
+        self.stdout.write(f"{written} search document(s) written")
@@ -0,0 +1,81 @@
+# brokerapp/management/commands/run_bench.py
+import json
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from brokerapp import benchdata, benchmark
+
+
+class Command(BaseCommand):
+    help = ("Time every page in brokerapp/urls.py (reports, statements, exports, forms) against seeded data "
+            "at one or more scales, in a throwaway test database, and write a JSON and markdown report "
+            "to compare across commits (--baseline: an earlier JSON report).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", default="small,medium",
+                            help=f"Comma-separated scales from {', '.join(benchdata.SCALES)} (default: small,medium).")
+        parser.add_argument("--repeat", type=int, default=5, help="Warm requests per target (default: 5).")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed of the data (default: 1).")
+        parser.add_argument("--url", action="append", help="Only these URL names (repeatable).")
+        parser.add_argument("--output", default="bench", help="Report path without extension (default: bench).")
+        parser.add_argument("--baseline", help="JSON report of an earlier run to show the median change against.")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the test database between runs.")
+
+    def handle(self, *args, **options):
+        scales = [s.strip() for s in options["scales"].split(",") if s.strip()]
+        unknown = [s for s in scales if s not in benchdata.SCALES]
+        if unknown or not scales:
+            raise CommandError(f"unknown scale(s): {', '.join(unknown) or '(none)'}")
+        baseline = None
+        if options["baseline"]:
+            baseline = json.loads(Path(options["baseline"]).read_text(encoding="utf-8"))
+
+        old_name = connection.settings_dict["NAME"]
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"], serialize=False)
+        try:
+            runs, missing = self._run(scales, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        data = benchmark.report(runs, options["repeat"], missing)
+        out = Path(options["output"])
+        out.parent.mkdir(parents=True, exist_ok=True)
+        json_path, md_path = out.with_suffix(".json"), out.with_suffix(".md")
+        json_path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+        md_path.write_text(benchmark.markdown(data, baseline), encoding="utf-8")
+        self.stdout.write(f"Wrote {json_path} and {md_path}")
+
+    def _run(self, scales, options):
+        # staff, for the ops pages
+        user, _ = User.objects.update_or_create(username="bench", defaults={"is_staff": True})
+        client = Client()
+        client.force_login(user)
+        runs, measured = {}, []
+        # the benchmark org is found through the session, as in multi-org mode
+        with override_settings(MULTI_ORG=True):
+            for name in scales:
+                scale = benchdata.SCALES[name]
+                started = time.perf_counter()
+                fixture = benchdata.seed(f"Bench {name}", scale, seed=options["seed"], code=f"B{name[0].upper()}",
+                                         owner=user)
+                seed_s = time.perf_counter() - started
+                self.stdout.write(f"{name}: seeded in {seed_s:.1f}s, timing...")
+                session = client.session
+                session["org_id"] = fixture.org.pk
+                session.save()
+
+                results = benchmark.run(client, fixture, options["repeat"], options["url"])
+                for r in results:
+                    if r["status"] >= 400:
+                        self.stderr.write(f"  {r['method']} {r['label']}: HTTP {r['status']}")
+                runs[name] = {"counts": scale._asdict(), "seed_s": round(seed_s, 2), "results": results}
+                measured += benchmark.targets(fixture)
+        return runs, benchmark.unmeasured(measured)
@@ -0,0 +1,57 @@
+# brokerapp/management/commands/run_worker.py
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from brokerapp.jobs import claim_next, cleanup, default_worker_id, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (PDF/XLSX exports). Claims jobs from the database; no broker needed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Drain the queue and exit instead of polling forever.")
+        parser.add_argument("--sleep", type=float, default=None,
+                            help="Seconds to sleep when the queue is empty (default: JOB_POLL_INTERVAL).")
+        parser.add_argument("--worker-id", default=None,
+                            help="Name recorded on claimed jobs (default: host:pid).")
+
+    def handle(self, *args, **options):
+        worker_id = options["worker_id"] or default_worker_id()
+        idle_sleep = options["sleep"] if options["sleep"] is not None else settings.JOB_POLL_INTERVAL
+        self._stop = False
+
+        def _request_stop(signum, frame):
+            # finish the current job, then exit
+            self._stop = True
+
+        signal.signal(signal.SIGTERM, _request_stop)
+        signal.signal(signal.SIGINT, _request_stop)
+
+        self.stdout.write(f"Worker {worker_id} started")
+        processed = 0
+        next_cleanup = 0.0
+        while not self._stop:
+            close_old_connections()
+            if time.monotonic() >= next_cleanup:
+                files, jobs = cleanup()
+                if files or jobs:
+                    self.stdout.write(f"Cleanup: {files} expired file(s), {jobs} old job(s) removed")
+                next_cleanup = time.monotonic() + settings.JOB_CLEANUP_INTERVAL
+
+            job = claim_next(worker_id)
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(idle_sleep)
+                continue
+
+            job = run_job(job)
+            processed += 1
+            self.stdout.write(f"Job #{job.pk} {job.kind}: {job.state}")
+
+        self.stdout.write(f"Worker {worker_id} stopped after {processed} job(s)")
@@ -0,0 +1,43 @@
+# brokerapp/management/commands/seed_bench.py
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from brokerapp import benchdata
+
+
+class Command(BaseCommand):
+    help = ("Create (or replace) a deterministic benchmark organization: parties, brokers, items, sale / "
+            "purchase invoices with lines and daily-page entries. Counts start from --scale and can be "
+            "overridden one by one.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--name", default="Bench",
+                            help='Organization name (default: "Bench"); an existing one is replaced.')
+        parser.add_argument("--scale", choices=sorted(benchdata.SCALES), default="small",
+                            help="Preset counts (default: small).")
+        for field in benchdata.Scale._fields:
+            parser.add_argument(f"--{field}", type=int, help=f"Override the preset number of {field}.")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1).")
+        parser.add_argument("--owner", help="Username to own the organization (for MULTI_ORG mode).")
+
+    def handle(self, *args, **options):
+        scale = benchdata.SCALES[options["scale"]]._replace(
+            **{f: options[f] for f in benchdata.Scale._fields if options[f] is not None})
+        if min(scale) < 0:
+            raise CommandError("counts cannot be negative")
+        owner = None
+        if options["owner"]:
+            owner = User.objects.filter(username=options["owner"]).first()
+            if owner is None:
+                raise CommandError(f"no user {options['owner']!r}")
+
+        started = time.perf_counter()
+        fixture = benchdata.seed(options["name"], scale, seed=options["seed"], owner=owner)
+        self.stdout.write(
+            f"{fixture.org.name} (id={fixture.org.pk}): {scale.parties} parties, {scale.brokers} brokers, "
+            f"{scale.items} items, {scale.sales} sales, {scale.purchases} purchases, "
+            f"{scale.days} daily pages x {scale.entries} entries, {fixture.start} to {fixture.end} "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
@@ -0,0 +1,40 @@
+# brokerapp/management/commands/wait_for_db.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+
+class Command(BaseCommand):
+    help = "Block until the database accepts connections, retrying with exponential backoff (startup)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--timeout", type=float, default=60,
+                            help="Give up after this many seconds (default: 60).")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS,
+                            help="Database alias to check (default: default).")
+
+    def handle(self, *args, **options):
+        conn = connections[options["database"]]
+        # probe with plain connections: a pool would block each attempt for its
+        # own timeout and keep reconnecting in the background (this process only)
+        conn.settings_dict.get("OPTIONS", {}).pop("pool", None)
+        deadline = time.monotonic() + options["timeout"]
+        delay = 0.25
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                break
+            except OperationalError as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(f"Database not reachable after {attempt} attempts: {exc}")
+                self.stdout.write(f"Database not ready (attempt {attempt}), retrying in {delay:.2f}s")
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 5)
+            finally:
+                conn.close()
+        self.stdout.write(f"Database ready after {attempt} attempt(s)")
@@ -0,0 +1,77 @@
+# brokerapp/masterdata.py
+"""
+Per-org cache of master-data choice lists (parties, brokers, items).
+
+Forms and report filters only need compact rows, not full model instances.
+Lists are cached under the version of the org's cachetags "masters" tag,
+which the party/broker/item model signals bump (see cachetags), so a save or
+delete from anywhere makes every cached list (and the JSON blob browsers keep
+in localStorage) stale at once.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import cachetags
+from .models import Broker, HeadItem, HeadParty
+
+# attribute names match the model fields the templates already use
+PartyChoice = namedtuple("PartyChoice", "pk partyname add1 add2 city mobile email")
+BrokerChoice = namedtuple("BrokerChoice", "pk brokername")
+ItemChoice = namedtuple("ItemChoice", "pk item_name")
+
+
+def _org_id(org):
+    return getattr(org, "pk", org)
+
+
+def get_version(org):
+    """Current master-data version of the org: its "masters" tag version."""
+    return cachetags.tag_versions(cachetags.org_tags(_org_id(org), "masters"))[0]
+
+
+def _cached_list(org, name, loader):
+    key = f"masterdata:{_org_id(org)}:{get_version(org)}:{name}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = loader()
+        cache.set(key, rows, settings.MASTERDATA_CACHE_TTL)
+    return rows
+
+
+def get_parties(org):
+    return _cached_list(org, "parties", lambda: [
+        PartyChoice(name, name, add1, add2, city, mobile, email)
+        for name, add1, add2, city, mobile, email in (
+            HeadParty.objects.filter(org=org).order_by("partyname")
+            .values_list("partyname", "add1", "add2", "city", "mobile", "email")
+        )
+    ])
+
+
+def get_brokers(org):
+    return _cached_list(org, "brokers", lambda: [
+        BrokerChoice(name, name)
+        for name in Broker.objects.filter(org=org).order_by("brokername").values_list("brokername", flat=True)
+    ])
+
+
+def get_items(org):
+    return _cached_list(org, "items", lambda: [
+        ItemChoice(name, name)
+        for name in HeadItem.objects.filter(org=org).order_by("item_name").values_list("item_name", flat=True)
+    ])
+
+
+def get_blob(org):
+    """
+    JSON-ready snapshot for the browser: names only (pk == name for all three
+    models), plus the address fields the purchase form fills in for parties.
+    """
+    return {
+        "version": get_version(org),
+        "parties": [[p.pk, p.add1, p.add2, p.city, p.mobile, p.email] for p in get_parties(org)],
+        "brokers": [b.pk for b in get_brokers(org)],
+        "items": [i.pk for i in get_items(org)],
+    }
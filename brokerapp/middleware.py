@@ -1,23 +1,148 @@
 # brokerapp/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.conf import settings
-from .models import Organization
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import timing
+from .orgs import aget_default_org, aresolve_org, get_default_org, resolve_org
+
 
 class SingleOrgMiddleware:
     """
-    Single-company mode:
-    - Always use one shared Organization record
-    - Auto-create it if not found, using DEFAULT_ORG_NAME from settings
+    Attach `request.current_org` for the whole app.
+
+    - Single-company mode (default): always the shared DEFAULT_ORG_NAME org.
+    - MULTI_ORG=True: the org chosen in the session, else the user's first
+      owned org (Organization.owner), else the shared default org.
+
+    Lookups go through the per-process cache in brokerapp.orgs, so a normal
+    request costs no query. Paths in ORG_EXEMPT_PATHS (health checks) skip
+    org resolution entirely and get `current_org = None`.
+
+    Works under WSGI and ASGI; on the async path the user and session are read
+    with auser() / aget() so the async views below it stay off worker threads.
     """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.exempt_paths = tuple(getattr(settings, "ORG_EXEMPT_PATHS", ()))
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _exempt(self, request):
+        return self.exempt_paths and request.path.startswith(self.exempt_paths)
 
     def __call__(self, request):
-        # Ensure default org exists
-        org, created = Organization.objects.get_or_create(
-            name=settings.DEFAULT_ORG_NAME
-        )
+        if self.is_async:
+            return self.__acall__(request)
 
-        # Attach to request so whole app uses same org
-        request.current_org = org
+        if self._exempt(request):
+            request.current_org = None
+        elif getattr(settings, "MULTI_ORG", False):
+            request.current_org = resolve_org(getattr(request, "user", None), getattr(request, "session", None))
+        else:
+            request.current_org = get_default_org()
 
         return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self._exempt(request):
+            request.current_org = None
+        elif getattr(settings, "MULTI_ORG", False):
+            user = await request.auser() if hasattr(request, "auser") else None
+            request.current_org = await aresolve_org(user, getattr(request, "session", None))
+        else:
+            request.current_org = await aget_default_org()
+
+        return await self.get_response(request)
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that can sit in an async middleware chain.
+
+    Stock WhiteNoise is sync-only; under ASGI Django would then run every
+    middleware and view below it through a thread. Static lookups here are a
+    dict read, and only actual file responses are built in a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
+
+
+class RequestTimingMiddleware:
+    """
+    SQL / template / document timings per request (see brokerapp.timing),
+    only when settings.REQUEST_TIMING is on.
+
+    Responses to staff users (to everyone with DEBUG) get a Server-Timing
+    header (db, tpl, doc, total), which the browser's dev tools show under the
+    request's Timing tab; it tells others too much about the server. Requests
+    taking SLOW_REQUEST_MS or longer are appended to SLOW_REQUEST_LOG with
+    their most repeated SQL statements, whoever made them. Times cover the
+    view and the middleware below this one, not the sending of a streamed body.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_TIMING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        timing.install()
+
+    @staticmethod
+    def _finish(request, response, recorder):
+        """Log a slow request and return its Server-Timing value."""
+        timing.log_slow(request, response, recorder)
+        return recorder.server_timing()
+
+    @staticmethod
+    def _shows_timing(user):
+        return settings.DEBUG or getattr(user, "is_staff", False)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timing.wrap_current_connections()
+        with timing.recording() as recorder:
+            response = self.get_response(request)
+            server_timing = self._finish(request, response, recorder)
+        if self._shows_timing(getattr(request, "user", None)):
+            response["Server-Timing"] = server_timing
+        return response
+
+    async def __acall__(self, request):
+        with timing.recording() as recorder:
+            response = await self.get_response(request)
+            server_timing = self._finish(request, response, recorder)
+        user = await request.auser() if hasattr(request, "auser") else None
+        if self._shows_timing(user):
+            response["Server-Timing"] = server_timing
+        return response
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_search_keys(apps, schema_editor):
+    def norm(text):
+        return " ".join(str(text or "").casefold().split())[:150]
+
+    for model_name, field in (("HeadParty", "partyname"), ("Broker", "brokername"), ("HeadItem", "item_name")):
+        Model = apps.get_model("brokerapp", model_name)
+        rows = list(Model.objects.only("pk", field))
+        for row in rows:
+            row.search_key = norm(getattr(row, field))
+        Model.objects.bulk_update(rows, ["search_key"], batch_size=500)
+
+
+# Substring matches on PostgreSQL are served by pg_trgm GIN indexes on
+# UPPER(col::text), the expression icontains compiles to.
+TRIGRAM_INDEXES = [
+    ("party_partyname_trgm_idx", "brokerapp_headparty", "partyname"),
+    ("party_city_trgm_idx", "brokerapp_headparty", "city"),
+    ("party_mobile_trgm_idx", "brokerapp_headparty", "mobile"),
+    ("broker_brokername_trgm_idx", "brokerapp_broker", "brokername"),
+    ("broker_mobileno_trgm_idx", "brokerapp_broker", "mobileno"),
+    ("item_item_name_trgm_idx", "brokerapp_headitem", "item_name"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _table, _column in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brokerapp', '0017_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecentChoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('party', 'Party'), ('broker', 'Broker'), ('item', 'Item')], max_length=10)),
+                ('key', models.CharField(max_length=100)),
+                ('used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='broker',
+            name='search_key',
+            field=models.CharField(blank=True, editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='headitem',
+            name='search_key',
+            field=models.CharField(blank=True, editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='headparty',
+            name='search_key',
+            field=models.CharField(blank=True, editable=False, max_length=150),
+        ),
+        migrations.AddIndex(
+            model_name='broker',
+            index=models.Index(fields=['org', 'search_key'], name='broker_org_search_key_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='headitem',
+            index=models.Index(fields=['org', 'search_key'], name='item_org_search_key_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='headparty',
+            index=models.Index(fields=['org', 'search_key'], name='party_org_search_key_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddField(
+            model_name='recentchoice',
+            name='org',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='brokerapp.organization'),
+        ),
+        migrations.AddField(
+            model_name='recentchoice',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recent_choices', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='recentchoice',
+            index=models.Index(fields=['user', 'org', 'kind', '-used_at'], name='recent_choice_lookup_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recentchoice',
+            constraint=models.UniqueConstraint(fields=('user', 'org', 'kind', 'key'), name='uniq_recent_choice'),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brokerapp', '0018_typeahead_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jamaentry',
+            index=models.Index(fields=['daily_page', 'party'], include=('amount',), name='jama_page_party_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jamaentry',
+            index=models.Index(fields=['daily_page', 'broker'], include=('amount',), name='jama_page_broker_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='naameentry',
+            index=models.Index(fields=['daily_page', 'party'], include=('amount',), name='naame_page_party_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='naameentry',
+            index=models.Index(fields=['daily_page', 'broker'], include=('amount',), name='naame_page_broker_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchasemaster',
+            index=models.Index(fields=['org', 'invdate'], name='purchase_org_invdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchasemaster',
+            index=models.Index(fields=['party', 'invdate'], include=('netamt',), name='purchase_party_invdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchasemaster',
+            index=models.Index(fields=['broker', 'invdate'], include=('netamt',), name='purchase_broker_invdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saledetails',
+            index=models.Index(fields=['salemaster', 'lotno'], name='saledetails_master_lot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salemaster',
+            index=models.Index(fields=['org', 'invdate'], name='sale_org_invdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salemaster',
+            index=models.Index(fields=['party', 'invdate'], include=('netamt',), name='sale_party_invdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salemaster',
+            index=models.Index(fields=['broker', 'invdate'], include=('netamt',), name='sale_broker_invdate_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:10
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+
+
+def fill_balances(apps, schema_editor):
+    DailyPage = apps.get_model("brokerapp", "DailyPage")
+
+    def page_total(model_name):
+        Entry = apps.get_model("brokerapp", model_name)
+        return Subquery(
+            Entry.objects.filter(daily_page=OuterRef("pk")).order_by()
+            .values("daily_page").annotate(t=Sum("amount")).values("t")
+        )
+
+    pages = DailyPage.objects.annotate(j=page_total("JamaEntry"), n=page_total("NaameEntry")).order_by("org", "date")
+    rows = []
+    org_id, balance = object(), Decimal("0")
+    for page in pages:
+        if page.org_id != org_id:
+            org_id, balance = page.org_id, Decimal("0")
+        page.opening_balance = balance
+        page.total_jama = page.j or Decimal("0")
+        page.total_naame = page.n or Decimal("0")
+        balance = page.closing_balance = balance + page.total_jama - page.total_naame
+        rows.append(page)
+    DailyPage.objects.bulk_update(
+        rows, ["opening_balance", "total_jama", "total_naame", "closing_balance"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brokerapp', '0019_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailypage',
+            name='closing_balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='dailypage',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='dailypage',
+            name='total_jama',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='dailypage',
+            name='total_naame',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.RunPython(fill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:02
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+
+# PostgreSQL: Django's icontains compiles to UPPER(col::text) LIKE UPPER('%q%'),
+# so the pg_trgm GIN indexes are built on that expression.
+TRIGRAM_INDEXES = [
+    ("saledetails_lotno_trgm_idx", "brokerapp_saledetails", "lotno"),
+    ("sale_party_trgm_idx", "brokerapp_salemaster", "party_id"),
+]
+
+# SQLite: an FTS5 trigram table (rowid = SaleDetails.id) kept in sync by triggers.
+FTS_TABLE = "brokerapp_saledetails_fts"
+
+FTS_SQL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(lotno, party, tokenize='trigram')",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON brokerapp_saledetails BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, lotno, party)
+        SELECT new.id, new.lotno, party_id FROM brokerapp_salemaster WHERE invno = new.salemaster_id;
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON brokerapp_saledetails BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF lotno, salemaster_id ON brokerapp_saledetails BEGIN
+        UPDATE {FTS_TABLE} SET lotno = new.lotno,
+            party = (SELECT party_id FROM brokerapp_salemaster WHERE invno = new.salemaster_id)
+        WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_master_au AFTER UPDATE OF party_id ON brokerapp_salemaster BEGIN
+        UPDATE {FTS_TABLE} SET party = new.party_id
+        WHERE rowid IN (SELECT id FROM brokerapp_saledetails WHERE salemaster_id = new.invno);
+    END""",
+    f"""INSERT INTO {FTS_TABLE}(rowid, lotno, party)
+        SELECT d.id, d.lotno, m.party_id
+        FROM brokerapp_saledetails d JOIN brokerapp_salemaster m ON m.invno = d.salemaster_id""",
+]
+
+FTS_TRIGGERS = ("_ai", "_ad", "_au", "_master_au")
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, table, column in TRIGRAM_INDEXES:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+            )
+    elif vendor == "sqlite":
+        try:
+            schema_editor.execute(FTS_SQL[0])
+        except OperationalError:
+            # SQLite built without FTS5 / the trigram tokenizer (< 3.34): search falls back to LIKE
+            return
+        for sql in FTS_SQL[1:]:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for name, _table, _column in TRIGRAM_INDEXES:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+    elif vendor == "sqlite":
+        for suffix in FTS_TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brokerapp', '0020_daily_page_balances'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='saledetails',
+            index=models.Index(fields=['frkwt'], name='saledetails_frkwt_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
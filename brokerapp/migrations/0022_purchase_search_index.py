@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:40
+
+from django.db import migrations
+
+
+# Substring matches of the purchase search on PostgreSQL (see 0021).
+TRIGRAM_INDEXES = [
+    ("purchasedetails_lotno_trgm_idx", "brokerapp_purchasedetails", "lotno"),
+    ("purchase_party_trgm_idx", "brokerapp_purchasemaster", "party_id"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _table, _column in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brokerapp', '0021_sale_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
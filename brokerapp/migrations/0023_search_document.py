@@ -0,0 +1,146 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:20
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+
+# The text is stored normalized (lower case), so a plain contains / LIKE is
+# what the search runs: pg_trgm GIN on PostgreSQL, an FTS5 trigram index
+# (external content: the text is not stored twice) on SQLite.
+FTS_TABLE = "brokerapp_searchdocument_fts"
+
+FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        text, content='brokerapp_searchdocument', content_rowid='id', tokenize='trigram')""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON brokerapp_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON brokerapp_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF text ON brokerapp_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+]
+
+FTS_TRIGGERS = ("_ai", "_ad", "_au")
+
+BATCH_SIZE = 500
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS search_document_text_trgm_idx "
+            "ON brokerapp_searchdocument USING gin (text gin_trgm_ops)"
+        )
+    elif vendor == "sqlite":
+        try:
+            schema_editor.execute(FTS_SQL[0])
+        except OperationalError:
+            return  # no FTS5 / trigram tokenizer: the search falls back to LIKE
+        for sql in FTS_SQL[1:]:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS search_document_text_trgm_idx")
+    elif vendor == "sqlite":
+        for suffix in FTS_TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def fill_search_documents(apps, schema_editor):
+    # Same documents as brokerapp.globalsearch builds (kept separate: historical models)
+    # for the rows that already exist; on SQLite the FTS table fills through its triggers.
+    SearchDocument = apps.get_model("brokerapp", "SearchDocument")
+    db = schema_editor.connection.alias
+
+    def normalize(*parts):
+        return " ".join(" ".join(str(p).casefold().split()) for p in parts if p not in (None, ""))
+
+    def invoices(kind, label, master_name, line_name, fk):
+        Master = apps.get_model("brokerapp", master_name)
+        lines = defaultdict(list)
+        for master_id, lotno, item_id in (apps.get_model("brokerapp", line_name).objects.using(db)
+                                          .order_by("pk").values_list(fk, "lotno", "item_id").iterator()):
+            lines[master_id] += [lotno, item_id]
+        for inv in Master.objects.using(db).order_by("pk").iterator():
+            yield SearchDocument(
+                org_id=inv.org_id, kind=kind, key=str(inv.pk), date=inv.invdate,
+                title=f"{label} #{inv.pk} — {inv.party_id}",
+                text=normalize(inv.pk, inv.awakno, inv.vehicleno, inv.remark, inv.party_id, inv.broker_id,
+                               *lines[inv.pk]),
+            )
+
+    def entries(kind, label, model_name):
+        rows = apps.get_model("brokerapp", model_name).objects.using(db).order_by("pk").values_list(
+            "entry_no", "daily_page__org_id", "daily_page__date", "party_id", "broker_id", "amount", "remark")
+        for entry_no, org_id, day, party, broker, amount, remark in rows.iterator():
+            yield SearchDocument(org_id=org_id, kind=kind, key=str(entry_no), date=day,
+                                 title=f"{label} — {party} {amount}", text=normalize(party, broker, amount, remark))
+
+    def masters():
+        for p in apps.get_model("brokerapp", "HeadParty").objects.using(db).order_by("pk").iterator():
+            yield SearchDocument(
+                org_id=p.org_id, kind="party", key=p.pk, title=p.partyname,
+                text=normalize(p.partyname, p.city, p.state, p.mobile, p.otherno, p.add1, p.add2, p.remark),
+            )
+        for b in apps.get_model("brokerapp", "Broker").objects.using(db).order_by("pk").iterator():
+            yield SearchDocument(org_id=b.org_id, kind="broker", key=b.pk, title=b.brokername,
+                                 text=normalize(b.brokername, b.mobileno, b.remark))
+        for i in apps.get_model("brokerapp", "HeadItem").objects.using(db).order_by("pk").iterator():
+            yield SearchDocument(org_id=i.org_id, kind="item", key=i.pk, title=i.item_name,
+                                 text=normalize(i.item_name))
+
+    for docs in (
+        invoices("sale", "Sale", "SaleMaster", "SaleDetails", "salemaster_id"),
+        invoices("purchase", "Purchase", "PurchaseMaster", "PurchaseDetails", "purchasemaster_id"),
+        entries("jama", "Jama", "JamaEntry"),
+        entries("naame", "Naame", "NaameEntry"),
+        masters(),
+    ):
+        batch = []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= BATCH_SIZE:
+                SearchDocument.objects.using(db).bulk_create(batch)
+                batch = []
+        SearchDocument.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brokerapp', '0022_purchase_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sale', 'Sale'), ('purchase', 'Purchase'), ('jama', 'Jama'), ('naame', 'Naame'), ('party', 'Party'), ('broker', 'Broker'), ('item', 'Item')], max_length=10)),
+                ('key', models.CharField(max_length=100)),
+                ('date', models.DateField(blank=True, null=True)),
+                ('title', models.CharField(max_length=255)),
+                ('text', models.TextField()),
+                ('org', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='brokerapp.organization')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['org', '-date'], name='search_document_org_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'key'), name='uniq_search_document')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brokerapp', '0023_search_document'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchasemaster',
+            index=models.Index(fields=['org', 'invno'], name='purchase_org_invno_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salemaster',
+            index=models.Index(fields=['org', 'invno'], name='sale_org_invno_idx'),
+        ),
+    ]
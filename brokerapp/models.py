@@ -1,7 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+def normalize_search_key(text):
+    """Lower-cased, whitespace-collapsed form used for indexed prefix lookups (typeahead)."""
+    return " ".join(str(text or "").casefold().split())[:150]
+
+
 # Create your models here.
 class HeadParty(models.Model):
     partyname = models.CharField(max_length=100, primary_key=True)
@@ -16,6 +25,21 @@ class HeadParty(models.Model):
     remark = models.TextField(blank=True)
     openingdebit = models.DecimalField(max_digits=10, decimal_places=2, default=0, blank=True, null=True)
     openingcredit = models.DecimalField(max_digits=10, decimal_places=2, default=0, blank=True, null=True)
+    # normalized partyname, kept by save(); prefix-searched by the typeahead endpoint.
+    # bulk_create() and queryset.update() skip save(): set it there with
+    # normalize_search_key() (see benchdata), or the row is missing from prefix matches
+    search_key = models.CharField(max_length=150, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['org', 'search_key'], name='party_org_search_key_idx',
+                         opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.search_key = normalize_search_key(self.partyname)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.partyname
 
@@ -27,6 +51,20 @@ class Broker(models.Model):
     openingdebit = models.DecimalField(max_digits=10, decimal_places=2, default=0, blank=True, null=True)
     openingcredit = models.DecimalField(max_digits=10, decimal_places=2, default=0, blank=True, null=True)
     remark = models.TextField(blank=True)
+    # normalized brokername, kept by save(); prefix-searched by the typeahead endpoint.
+    # bulk_create() and queryset.update() skip save(): set it there with
+    # normalize_search_key() (see benchdata), or the row is missing from prefix matches
+    search_key = models.CharField(max_length=150, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['org', 'search_key'], name='broker_org_search_key_idx',
+                         opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.search_key = normalize_search_key(self.brokername)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.brokername
@@ -34,6 +72,21 @@ class Broker(models.Model):
 class HeadItem(models.Model):
     item_name = models.CharField(max_length=100, primary_key=True)
     org = models.ForeignKey('Organization', on_delete=models.CASCADE,null=True, blank=True)
+    # normalized item_name, kept by save(); prefix-searched by the typeahead endpoint.
+    # bulk_create() and queryset.update() skip save(): set it there with
+    # normalize_search_key() (see benchdata), or the row is missing from prefix matches
+    search_key = models.CharField(max_length=150, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['org', 'search_key'], name='item_org_search_key_idx',
+                         opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.search_key = normalize_search_key(self.item_name)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.item_name
     
@@ -76,6 +129,17 @@ class SaleMaster(models.Model):
 
     # amt_in_words REMOVED (deleted from model)
 
+    class Meta:
+        # report filters: org + date range, party / broker statements by date;
+        # netamt is carried in the party/broker indexes (PostgreSQL INCLUDE) so
+        # balance sums don't touch the table
+        indexes = [
+            models.Index(fields=['org', 'invdate'], name='sale_org_invdate_idx'),
+            models.Index(fields=['org', 'invno'], name='sale_org_invno_idx'),
+            models.Index(fields=['party', 'invdate'], include=['netamt'], name='sale_party_invdate_idx'),
+            models.Index(fields=['broker', 'invdate'], include=['netamt'], name='sale_broker_invdate_idx'),
+        ]
+
     def __str__(self):
         return f"Invoice {self.invno} - {self.party}"
 
@@ -107,6 +171,12 @@ class SaleDetails(models.Model):
     # NEW Lot number after diffwt
     lotno = models.CharField(max_length=50, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['salemaster', 'lotno'], name='saledetails_master_lot_idx'),
+            models.Index(fields=['frkwt'], name='saledetails_frkwt_idx'),
+        ]
+
     def __str__(self):
         return f"{self.item} - {self.qty}"
        
@@ -143,6 +213,14 @@ class PurchaseMaster(models.Model):
 
     remark = models.CharField(max_length=255, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['org', 'invdate'], name='purchase_org_invdate_idx'),
+            models.Index(fields=['org', 'invno'], name='purchase_org_invno_idx'),
+            models.Index(fields=['party', 'invdate'], include=['netamt'], name='purchase_party_invdate_idx'),
+            models.Index(fields=['broker', 'invdate'], include=['netamt'], name='purchase_broker_invdate_idx'),
+        ]
+
     def __str__(self):
         return f"Purchase Invoice {self.invno} - {self.party}"
 
@@ -177,6 +255,11 @@ class DailyPage(models.Model):
     org = models.ForeignKey('Organization', on_delete=models.CASCADE,null=True, blank=True)
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # running cash position (jama - naame), maintained by brokerapp.daybook on every entry change
+    opening_balance = models.DecimalField(max_digits=16, decimal_places=2, default=0)  # previous page's closing
+    total_jama = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_naame = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    closing_balance = models.DecimalField(max_digits=16, decimal_places=2, default=0)  # opening + jama - naame
 
     class Meta:
         constraints = [
@@ -197,6 +280,11 @@ class JamaEntry(models.Model):
 
     class Meta:
         ordering = ['entry_no']
+        # balances sum per (page, party) and (page, broker)
+        indexes = [
+            models.Index(fields=['daily_page', 'party'], include=['amount'], name='jama_page_party_idx'),
+            models.Index(fields=['daily_page', 'broker'], include=['amount'], name='jama_page_broker_idx'),
+        ]
 
     def __str__(self):
         return f"Jama #{self.entry_no} - {self.party} - {self.broker} - {self.amount}"
@@ -213,6 +301,11 @@ class NaameEntry(models.Model):
 
     class Meta:
         ordering = ['entry_no']
+        # balances sum per (page, party) and (page, broker)
+        indexes = [
+            models.Index(fields=['daily_page', 'party'], include=['amount'], name='naame_page_party_idx'),
+            models.Index(fields=['daily_page', 'broker'], include=['amount'], name='naame_page_broker_idx'),
+        ]
 
     def __str__(self):
         return f"Naame #{self.entry_no} - {self.party} - {self.broker} - {self.amount}"
@@ -230,6 +323,126 @@ class Organization(models.Model):
         return self.name
 
 
+class Job(models.Model):
+    """
+    Deferred heavy work (PDF/XLSX renders) picked up by ``manage.py run_worker``.
+    The finished file is written under settings.JOB_RESULTS_DIR.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATE_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    org = models.ForeignKey('Organization', on_delete=models.CASCADE, null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0)   # 0..100
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    # result file (path relative to JOB_RESULTS_DIR) + name offered on download
+    result_file = models.CharField(max_length=255, blank=True)
+    result_name = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['state', 'run_after'], name='job_state_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.pk} {self.kind} ({self.state})"
+
+    @property
+    def label(self):
+        """What the job makes, for the exports pages ("Party statement PDF", ...)."""
+        return self.params.get("label") or self.kind.replace("_", " ").capitalize()
+
+    @property
+    def expires_at(self):
+        """When the result file is deleted (JOB_RESULT_TTL after finishing); None until done."""
+        if self.state != self.DONE or not self.finished_at:
+            return None
+        return self.finished_at + timedelta(seconds=settings.JOB_RESULT_TTL)
+
+    @property
+    def is_expired(self):
+        return self.state == self.DONE and (not self.result_file or self.expires_at <= timezone.now())
+
+    def set_progress(self, percent):
+        """Store progress without touching the other columns (safe from inside a handler)."""
+        self.progress = max(0, min(100, int(percent)))
+        Job.objects.filter(pk=self.pk).update(progress=self.progress)
+
+
+class RecentChoice(models.Model):
+    """Party/broker/item a user picked recently — ranked first by the typeahead endpoint."""
+    KIND_CHOICES = [("party", "Party"), ("broker", "Broker"), ("item", "Item")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="recent_choices")
+    org = models.ForeignKey('Organization', on_delete=models.CASCADE, null=True, blank=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=100)   # pk (= name) of the chosen record
+    used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'org', 'kind', 'key'], name='uniq_recent_choice'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'org', 'kind', '-used_at'], name='recent_choice_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.kind}: {self.key}"
+
+
+class SearchDocument(models.Model):
+    """
+    Denormalized searchable text of one invoice, daily entry or master record,
+    kept up to date by brokerapp.globalsearch (the global search box).
+    """
+    KIND_CHOICES = [
+        ("sale", "Sale"), ("purchase", "Purchase"), ("jama", "Jama"), ("naame", "Naame"),
+        ("party", "Party"), ("broker", "Broker"), ("item", "Item"),
+    ]
+
+    org = models.ForeignKey('Organization', on_delete=models.CASCADE, null=True, blank=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=100)   # pk of the record
+    date = models.DateField(null=True, blank=True)   # invoice / daily page date; None for masters
+    title = models.CharField(max_length=255)
+    text = models.TextField()   # normalized (normalize_search_key rules), what the search matches
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='uniq_search_document'),
+        ]
+        indexes = [
+            models.Index(fields=['org', '-date'], name='search_document_org_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.key}: {self.title}"
+
+
 # Inherit this in your business models to auto-get org + created_by
 class OrgScopedModel(models.Model):
     org = models.ForeignKey(Organization, on_delete=models.CASCADE)
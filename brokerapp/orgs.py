@@ -0,0 +1,132 @@
+# brokerapp/orgs.py
+"""
+In-process cache for Organization lookups used by SingleOrgMiddleware.
+
+Every request needs `request.current_org`; resolving it from the database each
+time costs a query (and get_or_create may attempt a write). Lookups are kept
+per process for ORG_CACHE_TTL seconds and dropped whenever an Organization is
+saved or deleted (other processes pick the change up when their TTL expires).
+
+The `a*` variants serve the async middleware path: cache hits return without
+leaving the event loop, misses run the database lookup in a worker thread.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Organization
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _cached(key, loader):
+    now = time.monotonic()
+    hit = _cache.get(key)
+    if hit is not None and hit[1] > now:
+        return hit[0]
+    value = loader()
+    with _lock:
+        _cache[key] = (value, now + settings.ORG_CACHE_TTL)
+    return value
+
+
+async def _acached(key, loader):
+    hit = _cache.get(key)
+    if hit is not None and hit[1] > time.monotonic():
+        return hit[0]
+    return await sync_to_async(_cached)(key, loader)
+
+
+def invalidate_org_cache():
+    """Forget every cached org lookup in this process."""
+    with _lock:
+        _cache.clear()
+
+
+def ensure_default_org():
+    """Create the shared DEFAULT_ORG_NAME organization if missing (startup / command)."""
+    org, _ = Organization.objects.get_or_create(name=settings.DEFAULT_ORG_NAME)
+    return org
+
+
+def _load_org(org_id):
+    return Organization.objects.filter(pk=org_id).first()
+
+
+def _load_owned_org_ids(user_id):
+    return tuple(Organization.objects.filter(owner_id=user_id).order_by("id").values_list("id", flat=True))
+
+
+def get_default_org():
+    return _cached(("default", settings.DEFAULT_ORG_NAME), ensure_default_org)
+
+
+def get_org(org_id):
+    return _cached(("id", org_id), lambda: _load_org(org_id))
+
+
+def get_owned_org_ids(user_id):
+    """Ids of organizations owned by the user, oldest first."""
+    return _cached(("owned", user_id), lambda: _load_owned_org_ids(user_id))
+
+
+async def aget_default_org():
+    return await _acached(("default", settings.DEFAULT_ORG_NAME), ensure_default_org)
+
+
+async def aget_org(org_id):
+    return await _acached(("id", org_id), lambda: _load_org(org_id))
+
+
+async def aget_owned_org_ids(user_id):
+    return await _acached(("owned", user_id), lambda: _load_owned_org_ids(user_id))
+
+
+def resolve_org(user, session):
+    """
+    Multi-org mode: session["org_id"] if the user may use it, else the user's
+    first owned org, else the shared default org.
+    """
+    if user is None or not user.is_authenticated:
+        return get_default_org()
+
+    owned = get_owned_org_ids(user.pk)
+    org_id = session.get("org_id") if session is not None else None
+    if org_id and (org_id in owned or user.is_superuser):
+        org = get_org(org_id)
+        if org is not None:
+            return org
+    if owned:
+        org = get_org(owned[0])
+        if org is not None:
+            return org
+    return get_default_org()
+
+
+async def aresolve_org(user, session):
+    """Async resolve_org(); reads the session with aget()."""
+    if user is None or not user.is_authenticated:
+        return await aget_default_org()
+
+    owned = await aget_owned_org_ids(user.pk)
+    org_id = await session.aget("org_id") if session is not None else None
+    if org_id and (org_id in owned or user.is_superuser):
+        org = await aget_org(org_id)
+        if org is not None:
+            return org
+    if owned:
+        org = await aget_org(owned[0])
+        if org is not None:
+            return org
+    return await aget_default_org()
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def _organization_changed(sender, **kwargs):
+    invalidate_org_cache()
@@ -0,0 +1,145 @@
+# brokerapp/pdffonts.py
+"""
+Unicode fonts for the PDF exports, parsed once per process.
+
+fpdf's add_font() reads the whole TTF (cmap, widths of every glyph) each time
+it is called — tens of milliseconds for a font covering Devanagari. Here each
+font file is parsed once per process; install() then gives a new document a
+light copy that shares the parsed metrics and only owns what is per document:
+the subset of glyphs it uses (all that gets embedded) and a fresh fontTools
+handle, which fpdf trims down to that subset in place when writing the file.
+
+Every document gets the family FAMILY (regular + bold). Characters the main
+font lacks are taken from PDF_FALLBACK_FONTS where one has them (none by
+default: Gujarati needs a font configured there). If the main font files are
+missing, FAMILY is the core Helvetica font (Latin-1 only).
+With PDF_TEXT_SHAPING and uharfbuzz installed, documents also get fpdf's
+text shaping, which Devanagari / Gujarati need for their vowel signs and
+conjuncts; without uharfbuzz that text is drawn glyph by glyph, unshaped.
+
+fpdf / fontTools are imported when a document is created, not with this module.
+"""
+import copy
+import functools
+import importlib.util
+import io
+import logging
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# the family name every PDF export sets (pdftable.FONT)
+FAMILY = "Sans"
+
+# style -> core font used when the TTF for that style is unavailable
+_CORE_STYLES = {"": "helvetica", "B": "helveticaB", "I": "helveticaI", "BI": "helveticaBI"}
+
+_lock = threading.Lock()
+# path -> (parsed TTFFont used as prototype, raw file bytes), or None if unreadable
+_loaded = {}
+
+
+def _resolve(name):
+    path = Path(name)
+    return path if path.is_absolute() else Path(settings.PDF_FONT_DIR) / path
+
+
+def _load(path):
+    """(prototype, data) for the font file at `path`, parsed on first use; None if unusable."""
+    try:
+        return _loaded[path]
+    except KeyError:
+        pass
+    with _lock:
+        if path not in _loaded:
+            _loaded[path] = _parse(path)
+    return _loaded[path]
+
+
+def _parse(path):
+    from fpdf import FPDF
+    from fpdf.fonts import TTFFont
+
+    try:
+        data = path.read_bytes()
+        # a scratch document only provides what TTFFont reads from its owner
+        proto = TTFFont(FPDF(), str(path), path.stem.lower(), "")
+    except Exception as exc:
+        # a main font falls back to the core fonts, a fallback font is left out
+        logger.warning("PDF font %s could not be loaded (%s)", path, exc)
+        return None
+    proto.ttfont.close()
+    proto.ttfont = None
+    return proto, data
+
+
+@functools.cache
+def _can_shape():
+    if importlib.util.find_spec("uharfbuzz") is None:
+        logger.warning("uharfbuzz is not installed; Indic text in PDFs is drawn without shaping")
+        return False
+    return True
+
+
+def _add(pdf, fontkey, style, loaded):
+    """Register a per-document copy of a loaded font under `fontkey`."""
+    # Sets the per-document attributes of fpdf's TTFFont the way its __init__
+    # does, so it depends on fpdf internals as of the fpdf2==2.8.5 pin in
+    # requirements.txt; PdfFontTests fails if an upgrade changes them.
+    from fontTools import ttLib
+    from fpdf.enums import TextEmphasis
+    from fpdf.fonts import SubsetMap
+
+    proto, data = loaded
+    font = copy.copy(proto)  # cmap, widths and glyph ids stay shared (read-only)
+    font.i = len(pdf.fonts) + 1
+    font.fontkey = fontkey
+    font.emphasis = TextEmphasis.coerce(style)
+    font.biggest_size_pt = 0
+    font.missing_glyphs = []
+    font._hbfont = None
+    font.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, fontNumber=0, lazy=True)
+    font.subset = SubsetMap(font)
+    pdf.fonts[fontkey] = font
+
+
+def install(pdf):
+    """Make FAMILY (and the fallback fonts) available on the new document `pdf`."""
+    from fpdf.fonts import CoreFont, SubsetMap
+
+    # fpdf (2.8.5) memoizes glyph lookups per SubsetMap in class-level caches, which
+    # would keep every finished document's fonts alive; entries are cheap to redo
+    SubsetMap.pick.cache_clear()
+    SubsetMap.get_glyph.cache_clear()
+
+    family = FAMILY.lower()
+    for style, name in settings.PDF_FONTS.items():
+        loaded = _load(_resolve(name))
+        if loaded is None:
+            continue
+        _add(pdf, family + style, style, loaded)
+    for style, core in _CORE_STYLES.items():
+        if family + style not in pdf.fonts:
+            pdf.fonts[family + style] = CoreFont(len(pdf.fonts) + 1, core, style)
+
+    fallbacks = []
+    for i, name in enumerate(settings.PDF_FALLBACK_FONTS):
+        loaded = _load(_resolve(name))
+        if loaded is not None:
+            fontkey = f"{family}fallback{i}"
+            _add(pdf, fontkey, "", loaded)
+            fallbacks.append(fontkey)
+    if fallbacks and not isinstance(pdf.fonts[family], CoreFont):
+        # fallbacks have one style; bold text takes the regular glyphs rather than none
+        pdf.set_fallback_fonts(fallbacks, exact_match=False)
+    if settings.PDF_TEXT_SHAPING and not isinstance(pdf.fonts[family], CoreFont) and _can_shape():
+        pdf.set_text_shaping(True)
+
+
+def preload():
+    """Parse the configured fonts now (e.g. at worker start) instead of on the first PDF."""
+    for name in (*settings.PDF_FONTS.values(), *settings.PDF_FALLBACK_FONTS):
+        _load(_resolve(name))
@@ -0,0 +1,330 @@
+# brokerapp/pdftable.py
+"""
+Table rendering shared by every PDF export (fpdf2).
+
+A table is a list of Column specs (title, width, alignment, formatter).
+Table.row() formats and fits each value once, then draws the row as one
+bordered rectangle plus column rules and plain text runs. That is much
+cheaper than one fpdf `cell()` per value, which goes through fpdf's full
+text-layout machinery every time.
+
+- Text that does not fit its column is cut with "..." using character widths
+  cached per font, so a value is measured once per font, not once per call.
+- A row that would cross the bottom margin starts a new page and repeats the
+  table header.
+- pdf_response() writes the finished document to a temporary file and
+  streams it back, instead of copying the buffer into the response.
+- Documents use the Unicode font family FONT from pdffonts (parsed once per
+  process, only the glyphs used are embedded); clean_text() only has work to
+  do when that font is unavailable and FONT falls back to core Helvetica.
+- Devanagari / Gujarati values are drawn with `cell()` when the document has
+  text shaping (pdffonts: uharfbuzz installed), since text() places glyphs
+  one by one; without it they print unshaped (vowel signs out of place, no
+  conjuncts).
+
+fpdf is imported when a document is created, not with this module.
+"""
+import re
+import tempfile
+from datetime import date, datetime
+from typing import Callable, NamedTuple, Optional
+
+from django.http import FileResponse
+
+from . import pdffonts
+
+# font family for all PDF text (see pdffonts)
+FONT = pdffonts.FAMILY
+
+# value for a cell that is left out entirely (no border, no text)
+BLANK = object()
+
+# characters the core (Latin-1) fonts cannot show, mapped to a near equivalent
+_CORE_FONT_SUBS = str.maketrans({"—": "-", "–": "-", "‘": "'", "’": "'",
+                                 "“": '"', "”": '"', "₹": "Rs."})
+
+ELLIPSIS = "..."
+
+# Indic scripts (Devanagari to Sinhala): their glyphs only come out right after shaping
+_NEEDS_SHAPING = re.compile("[\u0900-\u0dff]")
+
+# fitted-text cache entries kept per table before it is cleared
+FIT_CACHE_SIZE = 20000
+
+
+# ---------- value formatters ----------
+
+def money(value):
+    """1,234.50 (thousand separators, 2 decimals)."""
+    try:
+        return f"{float(value or 0):,.2f}"
+    except (TypeError, ValueError):
+        return "0.00"
+
+
+def amount(value):
+    """1234.50 (2 decimals)."""
+    try:
+        return f"{float(value or 0):.2f}"
+    except (TypeError, ValueError):
+        return "0.00"
+
+
+def dmy(value):
+    """dd-mm-YYYY for dates, '' for None."""
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%d-%m-%Y")
+    return "" if value is None else str(value)
+
+
+def iso(value):
+    """YYYY-mm-dd for dates, '' for None."""
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return "" if value is None else str(value)
+
+
+def text(value):
+    return "" if value is None else str(value)
+
+
+class Column(NamedTuple):
+    title: Optional[str]
+    width: float
+    align: str = "L"                    # L / C / R
+    fmt: Callable = text               # value -> str
+    header_align: str = "C"
+
+
+# ---------- documents ----------
+
+def document(title=None, subtitle=None, orientation="P", margin=10, title_size=14):
+    """New A4 FPDF (fonts installed) with one page and an optional centered title / subtitle."""
+    from fpdf import FPDF  # loaded on first export, not at worker start
+
+    pdf = FPDF(orientation=orientation, unit="mm", format="A4")
+    pdffonts.install(pdf)
+    pdf.set_auto_page_break(auto=True, margin=margin)
+    pdf.add_page()
+    if title:
+        pdf.set_font(FONT, "B", title_size)
+        pdf.cell(0, 10, clean_text(pdf, title), new_x="LMARGIN", new_y="NEXT", align="C")
+    if subtitle:
+        pdf.set_font(FONT, "", title_size - 4)
+        pdf.cell(0, 6, clean_text(pdf, subtitle), new_x="LMARGIN", new_y="NEXT", align="C")
+    if title or subtitle:
+        pdf.ln(4)
+    return pdf
+
+
+def clean_text(pdf, value):
+    """`value` as text the current font can encode (core fonts are Latin-1 only, TTFs take anything)."""
+    s = "" if value is None else str(value)
+    if _is_core_font(pdf) and not s.isascii():
+        s = s.translate(_CORE_FONT_SUBS).encode("latin-1", "replace").decode("latin-1")
+    return s
+
+
+def _is_core_font(pdf):
+    from fpdf.fonts import CoreFont
+
+    return isinstance(pdf.current_font, CoreFont)
+
+
+def pdf_response(pdf, filename, inline=False):
+    """Write `pdf` to a temporary file and stream it as the response."""
+    tmp = tempfile.TemporaryFile(suffix=".pdf")
+    try:
+        pdf.output(tmp)
+        tmp.seek(0)
+    except BaseException:
+        tmp.close()
+        raise
+    return FileResponse(tmp, as_attachment=not inline, filename=filename, content_type="application/pdf")
+
+
+# ---------- tables ----------
+
+class Table:
+    """
+    Draws rows of `columns` at x (default: left margin) on `pdf`.
+
+    header() draws the column titles (repeated after every page break once
+    drawn); row(values) draws one row — a value of BLANK leaves that cell out.
+    """
+
+    def __init__(self, pdf, columns, x=None, row_height=7, header_height=None,
+                 font=(FONT, "", 9), header_font=None, header_fill=(235, 235, 235)):
+        self.pdf = pdf
+        self.columns = list(columns)
+        self.x = pdf.l_margin if x is None else x
+        self.row_height = row_height
+        self.header_height = header_height or row_height
+        self.font = font
+        self.header_font = header_font or (font[0], "B", font[2])
+        self.header_fill = header_fill
+        self.width = sum(c.width for c in self.columns)
+        self._header_shown = False
+        self._char_widths = {}
+        self._fit_cache = {}
+
+    # --- public ---
+
+    def header(self):
+        # never leave a header alone at the bottom of a page
+        if self.pdf.will_page_break(self.header_height + self.row_height):
+            self.pdf.add_page()
+        self._header_shown = True
+        titles = [BLANK if c.title is None else c.title for c in self.columns]
+        aligns = [c.header_align for c in self.columns]
+        self._draw(titles, aligns, self.header_height, self.header_font, self.header_fill, repeat=False)
+
+    def row(self, values, style=None, fill=None, height=None):
+        """
+        Draw one row; `style` overrides the body font style ("B" for totals).
+        Values go through their column's `fmt`, except strings (drawn as given).
+        """
+        cells = [v if v is BLANK or isinstance(v, str) else c.fmt(v) for c, v in zip(self.columns, values)]
+        font = self.font if style is None else (self.font[0], style, self.font[2])
+        self._draw(cells, [c.align for c in self.columns], height or self.row_height, font, fill)
+
+    def rows(self, iterable, **kw):
+        for values in iterable:
+            self.row(values, **kw)
+
+    def ensure_room(self, height):
+        """Start a new page (repeating the header) unless `height` more fits here."""
+        if self.pdf.will_page_break(height):
+            self._new_page()
+
+    # --- drawing ---
+
+    def _new_page(self):
+        self.pdf.add_page()
+        if self._header_shown:
+            self.header()
+
+    def _draw(self, cells, aligns, h, font, fill, repeat=True):
+        pdf = self.pdf
+        if repeat and pdf.will_page_break(h):
+            self._new_page()
+        pdf.set_font(*font)
+        if fill:
+            pdf.set_fill_color(*fill)
+        y = pdf.y
+
+        # borders: one rectangle per run of non-blank cells, plus the inner rules
+        x = self.x
+        run_start = None
+        rules = []
+        for col, value in zip(self.columns, cells):
+            if value is BLANK:
+                if run_start is not None:
+                    pdf.rect(run_start, y, x - run_start, h, style="DF" if fill else "D")
+                    run_start = None
+            elif run_start is None:
+                run_start = x
+            else:
+                rules.append(x)
+            x += col.width
+        if run_start is not None:
+            pdf.rect(run_start, y, x - run_start, h, style="DF" if fill else "D")
+        for rx in rules:
+            pdf.line(rx, y, rx, y + h)
+
+        # text
+        baseline = y + 0.5 * h + 0.3 * pdf.font_size
+        margin = pdf.c_margin
+        x = self.x
+        for col, value, align in zip(self.columns, cells, aligns):
+            if value is not BLANK and value != "":
+                s, tw = self._fit(value, col.width - 2 * margin)
+                if s and pdf.text_shaping and _NEEDS_SHAPING.search(s):
+                    self._shaped(x, y, col.width, h, s, align)
+                elif s:
+                    if align == "R":
+                        tx = x + col.width - margin - tw
+                    elif align == "C":
+                        tx = x + (col.width - tw) / 2
+                    else:
+                        tx = x + margin
+                    self._text(tx, baseline, s)
+            x += col.width
+
+        pdf.set_xy(self.x, y + h)
+
+    def _shaped(self, x, y, w, h, s, align):
+        """cell() of the column box: shapes `s` and takes fallback glyphs itself."""
+        pdf = self.pdf
+        pdf.set_xy(x, y)
+        pdf.cell(w, h, s, align=align)
+
+    def _text(self, x, y, s):
+        """pdf.text(), taking characters the font lacks from the fallback fonts."""
+        pdf = self.pdf
+        if not pdf._fallback_font_ids or _is_core_font(pdf) or all(ord(ch) in pdf.current_font.cmap for ch in s):
+            pdf.text(x, y, s)
+            return
+        # split into runs per font; text() itself only ever uses the current font
+        family, style, size = pdf.font_family, pdf.font_style, pdf.font_size_pt
+        runs = []
+        for ch in s:
+            key = None if ord(ch) in pdf.current_font.cmap else pdf.get_fallback_font(ch, style)
+            if runs and runs[-1][0] == key:
+                runs[-1][1].append(ch)
+            else:
+                runs.append((key, [ch]))
+        for key, chars in runs:
+            run = "".join(chars)
+            if key is None:
+                pdf.set_font(family, style, size)
+            else:
+                pdf.set_font(pdf.fonts[key].fontkey, "", size)
+            pdf.text(x, y, run)
+            x += pdf.get_string_width(run)
+        pdf.set_font(family, style, size)
+
+    # --- text metrics ---
+
+    def _fit(self, value, avail):
+        """(text, width) of `value` cut to `avail` mm with an ellipsis, cached per font."""
+        pdf = self.pdf
+        font_key = (pdf.font_family, pdf.font_style, pdf.font_size_pt)
+        key = (font_key, avail, value)
+        hit = self._fit_cache.get(key)
+        if hit is not None:
+            return hit
+
+        metrics = self._char_widths.get(font_key)
+        if metrics is None:
+            metrics = self._char_widths[font_key] = ({}, _is_core_font(pdf))
+        widths, core = metrics
+
+        s = value
+        if core and not s.isascii():
+            s = s.translate(_CORE_FONT_SUBS).encode("latin-1", "replace").decode("latin-1")
+        try:
+            total = sum(map(widths.__getitem__, s))
+        except KeyError:
+            for ch in set(s) - widths.keys():
+                widths[ch] = pdf.get_string_width(ch)
+            total = sum(map(widths.__getitem__, s))
+
+        if total > avail:
+            for ch in set(ELLIPSIS) - widths.keys():
+                widths[ch] = pdf.get_string_width(ch)
+            ell = sum(map(widths.__getitem__, ELLIPSIS))
+            budget = avail - ell
+            used = 0.0
+            cut = 0
+            for cut, ch in enumerate(s):
+                if used + widths[ch] > budget:
+                    break
+                used += widths[ch]
+            s = s[:cut] + ELLIPSIS if budget > 0 else ""
+            total = used + ell if s else 0.0
+
+        if len(self._fit_cache) >= FIT_CACHE_SIZE:
+            self._fit_cache.clear()
+        result = self._fit_cache[key] = (s, total)
+        return result
@@ -0,0 +1,61 @@
+/* Fill <select data-masterdata="parties|brokers|items"> from the org's master-data blob.
+ *
+ * The blob is versioned by the server (data-version on this script tag). A copy is
+ * kept in localStorage, so when the version hasn't changed the form is filled
+ * synchronously without downloading thousands of options again.
+ */
+(function () {
+  var script = document.currentScript;
+  if (!script) return;
+  var url = script.dataset.url;
+  var version = String(script.dataset.version || '');
+  var storeKey = 'masterdata:' + (script.dataset.org || '');
+
+  function fillSelect(sel, rows, kind) {
+    var current = sel.value;               // selected option rendered by the server (edit mode)
+    var placeholder = sel.options.length ? sel.options[0] : null;
+    var frag = document.createDocumentFragment();
+    rows.forEach(function (r) {
+      var o = document.createElement('option');
+      if (kind === 'parties') {
+        o.value = r[0];
+        o.textContent = r[0];
+        o.dataset.add1 = r[1] || '';
+        o.dataset.add2 = r[2] || '';
+        o.dataset.city = r[3] || '';
+        o.dataset.mobileno = r[4] || '';
+        o.dataset.email = r[5] || '';
+      } else {
+        o.value = r;
+        o.textContent = r;
+      }
+      frag.appendChild(o);
+    });
+    sel.innerHTML = '';
+    if (placeholder && placeholder.value === '') sel.appendChild(placeholder);
+    sel.appendChild(frag);
+    if (current) sel.value = current;
+  }
+
+  function fill(blob) {
+    document.querySelectorAll('select[data-masterdata]').forEach(function (sel) {
+      var kind = sel.dataset.masterdata;
+      fillSelect(sel, blob[kind] || [], kind);
+    });
+  }
+
+  var cached = null;
+  try { cached = JSON.parse(localStorage.getItem(storeKey) || 'null'); } catch (e) { cached = null; }
+  if (cached && String(cached.version) === version) {
+    fill(cached);
+    return;
+  }
+
+  fetch(url + '?v=' + encodeURIComponent(version), {credentials: 'same-origin'})
+    .then(function (r) { return r.ok ? r.json() : Promise.reject(r.status); })
+    .then(function (blob) {
+      fill(blob);
+      try { localStorage.setItem(storeKey, JSON.stringify(blob)); } catch (e) { /* quota: just don't keep it */ }
+    })
+    .catch(function () { /* selects keep whatever the server rendered */ });
+})();
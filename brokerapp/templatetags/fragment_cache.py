@@ -0,0 +1,64 @@
+# brokerapp/templatetags/fragment_cache.py
+"""
+{% load fragment_cache %}
+{% cachefragment "party_list" current_org.pk tags=list_tags %} ... {% endcachefragment %}
+
+Caches the rendered block under the versions of `tags` (a tag string or a list
+of them, see brokerapp.cachetags); extra arguments are what the markup varies on.
+Blocks that render a CSRF token are never cached.
+"""
+from django import template
+
+from brokerapp import cachetags
+
+register = template.Library()
+
+
+class CacheFragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on, tags):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+        self.tags = tags
+
+    def render(self, context):
+        tags = self.tags.resolve(context) if self.tags is not None else []
+        if isinstance(tags, str):
+            tags = [tags]
+        if not tags:
+            return self.nodelist.render(context)
+        name = self.name.resolve(context)
+        parts = [v.resolve(context) for v in self.vary_on]
+
+        uncachable = []
+
+        def render_block():
+            output = self.nodelist.render(context)
+            if "csrfmiddlewaretoken" in output:
+                uncachable.append(output)
+                return None
+            return output
+
+        output = cachetags.get_or_set(f"fragment:{name}", parts, tags, render_block)
+        if output is None:
+            # a per-session token ended up inside the block; serve it uncached
+            return uncachable[0] if uncachable else self.nodelist.render(context)
+        return output
+
+
+@register.tag("cachefragment")
+def do_cachefragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires at least a fragment name.")
+    nodelist = parser.parse(("endcachefragment",))
+    parser.delete_first_token()
+
+    tags = None
+    vary_on = []
+    for bit in bits[2:]:
+        if bit.startswith("tags="):
+            tags = parser.compile_filter(bit[len("tags="):])
+        else:
+            vary_on.append(parser.compile_filter(bit))
+    return CacheFragmentNode(nodelist, parser.compile_filter(bits[1]), vary_on, tags)
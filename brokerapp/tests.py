@@ -1,3 +1,930 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.base import memcache_key_warnings
+from django.db import connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from brokerapp import (
+    artifacts, benchdata, benchmark, cachetags, daybook, exporters, globalsearch, invoices, jobs, keyset, linesearch,
+    masterdata, pdffonts, pdftable, timing,
+)
+from brokerapp.models import (
+    Broker, DailyPage, HeadItem, HeadParty, JamaEntry, Job, NaameEntry, Organization,
+    PurchaseDetails, PurchaseMaster, SaleDetails, SaleMaster,
+)
+from brokerapp.views.daily_page import _delete_daily_entry
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Tables big enough in production that a full scan is a regression.
+LARGE_TABLES = (
+    "brokerapp_salemaster", "brokerapp_saledetails", "brokerapp_purchasemaster",
+    "brokerapp_dailypage", "brokerapp_jamaentry", "brokerapp_naameentry",
+)
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN the report / statement queries on a seeded dataset and fail if one
+    of them full-scans a large table (SQLite "SCAN <table>", PostgreSQL
+    "Seq Scan on <table>"). On PostgreSQL seq scans are disabled for the test
+    so the check is "an index can serve this", not the planner's cost guess.
+    """
+
+    START = date(2025, 4, 1)
+    END = date(2025, 4, 30)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.orgs = [Organization.objects.create(name=f"Org {i}") for i in range(2)]
+        org = cls.org = cls.orgs[0]
+
+        parties, brokers = [], []
+        for o in cls.orgs:
+            parties += [HeadParty(partyname=f"{o.pk}-Party {i:03}", org=o) for i in range(40)]
+            brokers += [Broker(brokername=f"{o.pk}-Broker {i}", org=o) for i in range(5)]
+        for obj in parties + brokers:
+            obj.search_key = obj.pk.casefold()
+        HeadParty.objects.bulk_create(parties)
+        Broker.objects.bulk_create(brokers)
+        item = HeadItem.objects.create(item_name="Wheat", org=org)
+
+        day0 = date(2025, 1, 1)
+        sales, purchases = [], []
+        for i in range(2000):
+            o = cls.orgs[i % 2]
+            kw = dict(
+                org=o, invdate=day0 + timedelta(days=i % 365),
+                party_id=f"{o.pk}-Party {i % 40:03}", broker_id=f"{o.pk}-Broker {i % 5}",
+                netamt=Decimal(i),
+            )
+            sales.append(SaleMaster(**kw))
+            purchases.append(PurchaseMaster(**kw))
+        SaleMaster.objects.bulk_create(sales)
+        PurchaseMaster.objects.bulk_create(purchases)
+        SaleDetails.objects.bulk_create(
+            SaleDetails(salemaster=s, item=item, lotno=f"L{n}")
+            for s in SaleMaster.objects.all() for n in range(2)
+        )
+
+        pages = DailyPage.objects.bulk_create(
+            DailyPage(org=o, date=day0 + timedelta(days=d)) for o in cls.orgs for d in range(365)
+        )
+        entries = []
+        for i, page in enumerate(pages * 4):
+            entries.append(dict(
+                daily_page=page, party_id=f"{page.org_id}-Party {i % 40:03}",
+                broker_id=f"{page.org_id}-Broker {i % 5}", amount=Decimal(i),
+            ))
+        JamaEntry.objects.bulk_create(JamaEntry(**e) for e in entries)
+        NaameEntry.objects.bulk_create(NaameEntry(**e) for e in entries)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        cls.party = HeadParty.objects.get(partyname=f"{org.pk}-Party 007")
+        cls.broker = Broker.objects.get(brokername=f"{org.pk}-Broker 3")
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertNoFullScan(self, qs):
+        plan = qs.explain()
+        if connection.vendor == "postgresql":
+            pattern = r"Seq Scan on (\w+)"
+        else:
+            pattern = r"\bSCAN (\w+)"
+        # SQLite names subquery tables by their alias (U0, U1, ...) only
+        scanned = [t for t in re.findall(pattern, plan) if t in LARGE_TABLES or re.fullmatch(r"U\d+", t)]
+        self.assertFalse(scanned, f"full scan of {scanned}:\n{plan}")
+
+    def _pages(self, **date_filter):
+        return DailyPage.objects.filter(org=self.org, **date_filter)
+
+    # --- sale / purchase reports ---
+
+    def test_sale_report_by_org_and_date(self):
+        self.assertNoFullScan(
+            SaleMaster.objects.filter(org=self.org, invdate__gte=self.START, invdate__lte=self.END)
+        )
+
+    def test_purchase_report_by_org_and_date(self):
+        self.assertNoFullScan(
+            PurchaseMaster.objects.filter(org=self.org, invdate__gte=self.START, invdate__lte=self.END)
+        )
+
+    def test_sale_details_for_report(self):
+        sales = SaleMaster.objects.filter(org=self.org, invdate__range=(self.START, self.END))
+        self.assertNoFullScan(SaleDetails.objects.filter(salemaster__in=sales).values("tbwt", "frkwt"))
+
+    def test_sale_details_by_lot(self):
+        sale = SaleMaster.objects.filter(org=self.org).first()
+        self.assertNoFullScan(SaleDetails.objects.filter(salemaster=sale, lotno="L1"))
+
+    # --- party / broker balances ---
+
+    def test_party_balance_sums(self):
+        for model in (SaleMaster, PurchaseMaster):
+            with self.subTest(model=model.__name__):
+                self.assertNoFullScan(
+                    model.objects.filter(org=self.org, party=self.party, invdate__lt=self.START).values("netamt")
+                )
+                self.assertNoFullScan(
+                    model.objects.filter(party=self.party, invdate__range=(self.START, self.END)).values("netamt")
+                )
+
+    def test_broker_balance_sums(self):
+        for model in (SaleMaster, PurchaseMaster):
+            with self.subTest(model=model.__name__):
+                self.assertNoFullScan(
+                    model.objects.filter(broker=self.broker, invdate__range=(self.START, self.END)).values("netamt")
+                )
+
+    def test_jama_naame_sums_by_party_and_broker(self):
+        for model in (JamaEntry, NaameEntry):
+            with self.subTest(model=model.__name__):
+                self.assertNoFullScan(
+                    model.objects.filter(daily_page__in=self._pages(date__lt=self.START), party=self.party)
+                    .values("amount")
+                )
+                self.assertNoFullScan(
+                    model.objects.filter(daily_page__in=self._pages(date__range=(self.START, self.END)),
+                                         broker=self.broker)
+                    .values("amount")
+                )
+
+    # --- statements / daily page ---
+
+    def test_party_statement(self):
+        self.assertNoFullScan(SaleMaster.objects.filter(party=self.party).order_by("invdate"))
+        self.assertNoFullScan(JamaEntry.objects.filter(party=self.party).order_by("daily_page__date"))
+
+    def test_broker_statement(self):
+        self.assertNoFullScan(PurchaseMaster.objects.filter(broker=self.broker).order_by("invdate"))
+        self.assertNoFullScan(NaameEntry.objects.filter(broker=self.broker).order_by("daily_page__date"))
+
+    def test_daily_page_entries(self):
+        self.assertNoFullScan(DailyPage.objects.filter(org=self.org, date=self.START))
+        self.assertNoFullScan(
+            JamaEntry.objects.filter(daily_page__org=self.org, daily_page__date=self.START).order_by("entry_no")
+        )
+
+
+@override_settings(MULTI_ORG=True, CACHES=LOCMEM_CACHES)
+class QueryBudgetTests(TestCase):
+    """
+    Every report, account action, daily-page view and the invoice form runs
+    within a fixed number of queries, the same for a small and a ten times
+    larger org (brokerapp.benchdata), so a query per party, group or entry
+    fails here. The requests are the benchmark's (brokerapp.benchmark); a
+    failure lists the statements that were repeated.
+    """
+
+    SMALL = benchdata.Scale(parties=3, brokers=2, items=2, sales=6, purchases=4, lines=2, days=3, entries=2)
+    LARGE = benchdata.Scale(parties=30, brokers=10, items=5, sales=120, purchases=60, lines=3, days=20, entries=8)
+
+    # URL name -> most queries any of its requests may run (session, user and org lookups included)
+    BUDGETS = {
+        "sale_report": 8,
+        "bardana_report": 5,
+        "purchase_report": 5,
+        "all_party_balance": 8,
+        "all_broker_balance": 8,
+        "party_statement": 8,
+        "broker_statement": 8,
+        "daily_page": 6,
+        "daily_page_show": 6,
+        "daily_page_pdf": 6,
+        "day_book": 4,
+        "sale_form_update": 10,
+        "purchase_form_update": 8,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # PDFs rendered by earlier runs must not be served from the real artifact cache
+        artifacts = tempfile.mkdtemp(prefix="budget-artifacts-")
+        cls.addClassCleanup(shutil.rmtree, artifacts, ignore_errors=True)
+        cls.enterClassContext(override_settings(ARTIFACT_CACHE_DIR=artifacts))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("budget")
+        cls.fixtures = {
+            "small": benchdata.seed("Budget small", cls.SMALL, code="QS", owner=cls.user),
+            "large": benchdata.seed("Budget large", cls.LARGE, code="QL", owner=cls.user),
+        }
+
+    def setUp(self):
+        timing.install()
+        self.client.force_login(self.user)
+
+    def _record(self, fixture, target):
+        """The timing.Recorder of one request to `target` as a user of `fixture`'s org."""
+        session = self.client.session
+        session["org_id"] = fixture.org.pk
+        session.save()
+        # measured cold: nothing cached by an earlier request, test or run
+        cache.clear()
+        shutil.rmtree(settings.ARTIFACT_CACHE_DIR, ignore_errors=True)
+        with timing.recording() as recorder:
+            if target.method == "POST":
+                response = self.client.post(target.path, target.data)
+            else:
+                response = self.client.get(target.path, target.data)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertLess(response.status_code, 400, f"{target.method} {target.label}")
+        return recorder
+
+    def assertWithinBudget(self, recorder, budget, label):
+        if recorder.queries <= budget:
+            return
+        repeated = "\n".join(f"  {count} x {sql}" for count, _, sql in recorder.top_shapes(n=None))
+        self.fail(f"{label}: {recorder.queries} queries, budget {budget}; repeated:\n{repeated or '  (none)'}")
+
+    def test_views_within_budget(self):
+        covered = set()
+        for scale, fixture in self.fixtures.items():
+            for target in benchmark.targets(fixture):
+                budget = self.BUDGETS.get(target.name)
+                if budget is None:
+                    continue
+                covered.add(target.name)
+                with self.subTest(scale=scale, request=f"{target.method} {target.label}"):
+                    recorder = self._record(fixture, target)
+                    self.assertWithinBudget(recorder, budget, f"{scale}: {target.method} {target.label}")
+        self.assertEqual(covered, set(self.BUDGETS))
+
+
+@override_settings(MULTI_ORG=True)
+class DailyBalanceTests(TestCase):
+    """
+    The balances carried from page to page as entries are added and deleted
+    through the daily page views (daybook.apply_entry) always equal what
+    rebuild_balances() computes from the entries.
+    """
+
+    DAY1, DAY2, DAY3 = date(2025, 4, 1), date(2025, 4, 2), date(2025, 4, 3)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("daybook")
+        cls.org = Organization.objects.create(name="Daybook", owner=cls.user)
+        cls.party = HeadParty.objects.create(partyname="DB Party", org=cls.org)
+        cls.broker = Broker.objects.create(brokername="DB Broker", org=cls.org)
+        # another org's pages must not move
+        other = Organization.objects.create(name="Daybook other")
+        DailyPage.objects.create(org=other, date=cls.DAY2, opening_balance=5, total_jama=1, closing_balance=6)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        session = self.client.session
+        session["org_id"] = self.org.pk
+        session.save()
+
+    def add(self, side, day, amount):
+        response = self.client.post(reverse(f"daily_page_{side}_add"), {
+            "date": f"{day:%Y-%m-%d}", "party": self.party.pk, "broker": self.broker.pk, "amount": amount,
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()["entry"]["entry_no"]
+
+    def delete(self, side, entry_no):
+        response = self.client.post(reverse(f"daily_page_{side}_delete", args=[entry_no]))
+        self.assertEqual(response.status_code, 200)
+
+    def assertBalances(self, expected):
+        """`expected`: {date: (opening, jama, naame, closing)}; also checked against a full rebuild."""
+        pages = DailyPage.objects.filter(org=self.org).order_by("date")
+        stored = {p.date: tuple(getattr(p, f) for f in daybook.BALANCE_FIELDS) for p in pages}
+        self.assertEqual(stored, {d: tuple(Decimal(v) for v in b) for d, b in expected.items()})
+        self.assertEqual(daybook.rebuild_balances(self.org), 0)
+        other = DailyPage.objects.exclude(org=self.org).get()
+        self.assertEqual((other.opening_balance, other.closing_balance), (5, 6))
+
+    def test_backdated_add_moves_later_pages(self):
+        self.add("jama", self.DAY1, "100")
+        self.add("naame", self.DAY3, "50")
+        self.assertBalances({self.DAY1: (0, 100, 0, 100), self.DAY3: (100, 0, 50, 50)})
+        self.add("naame", self.DAY1, "30")
+        self.assertBalances({self.DAY1: (0, 100, 30, 70), self.DAY3: (70, 0, 50, 20)})
+
+    def test_page_created_between_days_opens_at_previous_closing(self):
+        self.add("jama", self.DAY1, "100")
+        self.add("naame", self.DAY3, "50")
+        self.add("jama", self.DAY2, "10.50")
+        self.assertBalances({
+            self.DAY1: (0, 100, 0, 100),
+            self.DAY2: (100, "10.50", 0, "110.50"),
+            self.DAY3: ("110.50", 0, 50, "60.50"),
+        })
+
+    def test_delete_moves_later_pages(self):
+        first = self.add("jama", self.DAY1, "100")
+        self.add("jama", self.DAY1, "20")
+        self.add("naame", self.DAY2, "50")
+        self.delete("jama", first)
+        self.assertBalances({self.DAY1: (0, 20, 0, 20), self.DAY2: (20, 0, 50, -30)})
+
+    def test_double_delete_counts_once(self):
+        entry_no = self.add("naame", self.DAY1, "40")
+        self.add("jama", self.DAY2, "10")
+        # two requests that both loaded the entry before either deleted it
+        entry = NaameEntry.objects.select_related("daily_page").get(entry_no=entry_no)
+        _delete_daily_entry(NaameEntry, self.org, entry)
+        _delete_daily_entry(NaameEntry, self.org, entry)
+        self.assertBalances({self.DAY1: (0, 0, 0, 0), self.DAY2: (0, 10, 0, 10)})
+
+    def test_rebuild_repairs_entries_written_around_the_views(self):
+        self.add("jama", self.DAY1, "100")
+        self.add("naame", self.DAY2, "30")
+        JamaEntry.objects.filter(daily_page__org=self.org).update(amount=Decimal("80"))
+        self.assertEqual(daybook.rebuild_balances(self.org), 2)
+        self.assertBalances({self.DAY1: (0, 80, 0, 80), self.DAY2: (80, 0, 30, 50)})
+
+
+@override_settings(MULTI_ORG=True)
+class KeysetCursorTests(TestCase):
+    """A tampered ?after= / ?before= is ignored (first page), not a server error."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("keyset")
+        cls.org = Organization.objects.create(name="Keyset", owner=cls.user)
+        party = HeadParty.objects.create(partyname="KS Party", org=cls.org)
+        broker = Broker.objects.create(brokername="KS Broker", org=cls.org)
+        item = HeadItem.objects.create(item_name="KS Item", org=cls.org)
+        for i in range(5):
+            kw = dict(org=cls.org, invdate=date(2025, 4, 1 + i % 2), party=party, broker=broker)
+            sale = SaleMaster.objects.create(**kw)
+            SaleDetails.objects.create(salemaster=sale, item=item, lotno=f"KS{i}")
+            if i < 3:
+                purchase = PurchaseMaster.objects.create(**kw)
+                PurchaseDetails.objects.create(purchasemaster=purchase, item=item, lotno=f"KS{i}")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        session = self.client.session
+        session["org_id"] = self.org.pk
+        session.save()
+
+    def test_tampered_cursor(self):
+        bad = [keyset.encode(["x", "y"]), keyset.encode([{"a": 1}, [2]]), keyset.encode(["x"]), "!!",
+               keyset.encode(["2025-04-01", 10 ** 30])]
+        for name, params in (("saledata", {"sort": "-invdate"}), ("purchasedata", {}),
+                             ("sale_search", {"party": "KS"}), ("purchase_search", {"party": "KS"})):
+            for cursor in bad:
+                for direction in ("after", "before"):
+                    with self.subTest(url=name, cursor=cursor, direction=direction):
+                        response = self.client.get(reverse(name), {**params, direction: cursor})
+                        self.assertEqual(response.status_code, 200)
+
+    def test_cursor_values_are_converted(self):
+        qs = SaleMaster.objects.filter(org=self.org).order_by("-invdate", "-invno")
+        first = keyset.paginate(qs, per_page=2)
+        self.assertEqual(keyset.decode(first.next_cursor, keyset._fields(qs, keyset._keys(qs))),
+                         [first.rows[-1].invdate, first.rows[-1].invno])
+        second = keyset.paginate(qs, after=first.next_cursor, per_page=2)
+        self.assertEqual([r.pk for r in first.rows + second.rows], list(qs.values_list("pk", flat=True)[:4]))
+        self.assertEqual(keyset.paginate(qs, after=keyset.encode(["x", "y"]), per_page=2).rows, first.rows)
+
+
+
+class InvoicePrintTests(TestCase):
+    """Batch invoice printing: load() in two queries, one page per invoice, amounts in words."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = Organization.objects.create(name="Invoice Print")
+        party = HeadParty.objects.create(partyname="IP Party", org=cls.org, add1="Market Yard", city="Rajkot",
+                                         state="Gujarat", mobile="9800000000")
+        broker = Broker.objects.create(brokername="IP Broker", org=cls.org)
+        item = HeadItem.objects.create(item_name="IP Item", org=cls.org)
+        for i in range(3):
+            sale = SaleMaster.objects.create(org=cls.org, invdate=date(2025, 4, 1), party=party, broker=broker,
+                                             netamt=Decimal("1050.50"))
+            for j in range(i + 1):
+                SaleDetails.objects.create(salemaster=sale, item=item, lotno=f"IP{i}{j}", bora=j + 1)
+
+    def sales(self):
+        return SaleMaster.objects.filter(org=self.org).order_by("invno")
+
+    def test_load_reads_invoices_and_lines_in_two_queries(self):
+        with self.assertNumQueries(2):
+            loaded = invoices.load(self.sales())
+        self.assertEqual([inv["invno"] for inv in loaded], list(self.sales().values_list("invno", flat=True)))
+        first = loaded[0]
+        self.assertEqual((first["org"], first["party"], first["broker"]), ("Invoice Print", "IP Party", "IP Broker"))
+        self.assertEqual(first["address"], ["Market Yard", "Rajkot, Gujarat"])
+        self.assertEqual([len(inv["items"]) for inv in loaded], [1, 2, 3])
+        self.assertEqual(loaded[2]["items"][2][:3], ("IP Item", "IP22", 3))
+
+    def test_one_page_per_invoice(self):
+        from pypdf import PdfReader
+
+        out = io.BytesIO()
+        invoices.write_pdf(invoices.load(self.sales()), out)
+        self.assertEqual(len(PdfReader(io.BytesIO(out.getvalue())).pages), 3)
+
+    def test_amount_in_words(self):
+        for value, words in (
+            ("120050.75", "Rupees One Lakh Twenty Thousand and Fifty and Paise Seventy-five Only"),
+            (Decimal("10000000"), "Rupees One Crore Only"),
+            ("1.05", "Rupees One and Paise Five Only"),
+            (None, "Rupees Zero Only"),
+            ("-50", "Minus Rupees Fifty Only"),
+        ):
+            with self.subTest(value=value):
+                self.assertEqual(invoices.amount_in_words(value), words)
+
+
+class SaleLineSearchTests(TestCase):
+    """
+    Sale line search follows inserts, updates and deletes of lines and
+    invoices: on SQLite through the FTS5 table's triggers (migration 0021).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = Organization.objects.create(name="Line search")
+        cls.alpha = HeadParty.objects.create(partyname="LS Alpha Traders", org=cls.org)
+        cls.beta = HeadParty.objects.create(partyname="LS Beta Mills", org=cls.org)
+        broker = Broker.objects.create(brokername="LS Broker", org=cls.org)
+        cls.item = HeadItem.objects.create(item_name="LS Item", org=cls.org)
+        cls.sale = SaleMaster.objects.create(org=cls.org, invdate=date(2025, 4, 1), party=cls.alpha, broker=broker)
+        cls.line = SaleDetails.objects.create(salemaster=cls.sale, item=cls.item, lotno="LOT7781")
+
+    def found(self, **params):
+        return list(linesearch.search(self.org, params).values_list("pk", flat=True))
+
+    def test_index_in_use(self):
+        self.assertEqual(linesearch.fts_available(), connection.vendor == "sqlite")
+
+    def test_follows_line_and_invoice_changes(self):
+        self.assertEqual(self.found(lotno="7781"), [self.line.pk])
+        self.assertEqual(self.found(partyname="alpha"), [self.line.pk])
+
+        SaleDetails.objects.filter(pk=self.line.pk).update(lotno="LOT9902")
+        self.assertEqual(self.found(lotno="7781"), [])
+        self.assertEqual(self.found(lotno="9902"), [self.line.pk])
+
+        SaleMaster.objects.filter(pk=self.sale.pk).update(party=self.beta)
+        self.assertEqual(self.found(partyname="alpha"), [])
+        self.assertEqual(self.found(partyname="beta mil"), [self.line.pk])
+
+        second = SaleDetails.objects.create(salemaster=self.sale, item=self.item, lotno="LOT9903")
+        self.assertEqual(sorted(self.found(lotno="LOT990")), sorted([self.line.pk, second.pk]))
+        SaleDetails.objects.filter(pk=self.line.pk).delete()
+        self.assertEqual(self.found(lotno="LOT990"), [second.pk])
+
+    def test_invoice_number_out_of_range(self):
+        self.assertEqual(self.found(invno=str(self.sale.pk)), [self.line.pk])
+        self.assertEqual(self.found(invno="9" * 30), [])
+
+
+class GlobalSearchTests(TestCase):
+    """
+    Search documents follow saves and deletes once the transaction commits;
+    on SQLite the FTS5 table follows the documents through its triggers
+    (migration 0023).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = Organization.objects.create(name="Global search")
+        cls.other = Organization.objects.create(name="Global search other")
+
+    def titles(self, q, org=None):
+        return [hit.title for hit in globalsearch.search(org or self.org, q)]
+
+    def test_index_in_use(self):
+        self.assertEqual(linesearch.fts_available(using="default", table=globalsearch.FTS_TABLE,
+                                                  triggers=globalsearch.FTS_TRIGGERS),
+                         connection.vendor == "sqlite")
+
+    def test_follows_saves_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            party = HeadParty.objects.create(partyname="GS Kesar Traders", org=self.org, city="Rajkot")
+            HeadParty.objects.create(partyname="GS Kesar Foods", org=self.other)
+        self.assertEqual(self.titles("kesar rajkot"), ["GS Kesar Traders"])
+        self.assertEqual(self.titles("kesar", self.other), ["GS Kesar Foods"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            party.city = "Surat"
+            party.save()
+        self.assertEqual(self.titles("kesar rajkot"), [])
+        self.assertEqual(self.titles("kesar surat"), ["GS Kesar Traders"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            party.delete()
+        self.assertEqual(self.titles("kesar"), [])
+
+    def test_rebuild_matches_signals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            HeadParty.objects.create(partyname="GS Moti Mills", org=self.org, mobile="9812345678")
+            Broker.objects.create(brokername="GS Moti Broker", org=self.org)
+        before = self.titles("moti")
+        globalsearch.rebuild(self.org)
+        self.assertEqual(self.titles("moti"), before)
+        self.assertEqual(self.titles("12345"), ["GS Moti Mills"])
+
+
+def failing_job(job):
+    raise RuntimeError("render failed")
+
+
+def finished_job(job):
+    return "out.txt", "text/plain", b"done"
+
+
+@override_settings(JOB_RETRY_BACKOFF=30, JOB_LOCK_TIMEOUT=900)
+class JobRetryTests(TestCase):
+    """A failed job is requeued with exponential backoff until max_attempts, then FAILED."""
+
+    def setUp(self):
+        results = tempfile.mkdtemp(prefix="job-results-")
+        self.addCleanup(shutil.rmtree, results, ignore_errors=True)
+        self.enterContext(override_settings(JOB_RESULTS_DIR=results))
+
+    def handlers(self, path):
+        return mock.patch.dict(jobs.JOB_HANDLERS, {"sale_report_pdf": path})
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        self.assertEqual([jobs.retry_delay(n) for n in (1, 2, 3)], [30, 60, 120])
+        self.assertEqual(jobs.retry_delay(20), jobs.MAX_BACKOFF)
+
+    def test_failure_requeues_with_backoff_then_fails(self):
+        job = jobs.enqueue("sale_report_pdf", max_attempts=2)
+        with self.handlers("brokerapp.tests.failing_job"), self.assertLogs("brokerapp.jobs", "ERROR"):
+            started = timezone.now()
+            job = jobs.run_job(jobs.claim_next("w1"))
+            self.assertEqual((job.state, job.attempts, job.locked_by), (Job.QUEUED, 1, ""))
+            self.assertGreaterEqual(job.run_after, started + timedelta(seconds=30))
+            self.assertIn("render failed", job.error)
+            # not due yet
+            self.assertIsNone(jobs.claim_next("w1"))
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            job = jobs.run_job(jobs.claim_next("w1"))
+            self.assertEqual((job.state, job.attempts), (Job.FAILED, 2))
+            self.assertIsNotNone(job.finished_at)
+            self.assertIsNone(jobs.claim_next("w1"))
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = jobs.enqueue("sale_report_pdf")
+        self.assertEqual(jobs.claim_next("dead").pk, job.pk)
+        self.assertIsNone(jobs.claim_next("w2"))
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=901))
+        with self.handlers("brokerapp.tests.finished_job"):
+            job = jobs.run_job(jobs.claim_next("w2"))
+        self.assertEqual((job.state, job.attempts), (Job.DONE, 2))
+        self.assertEqual(jobs.result_path(job).read_bytes(), b"done")
+
+
+@override_settings(MULTI_ORG=True)
+class SwitchOrgTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("switcher")
+        cls.org = Organization.objects.create(name="Switch", owner=cls.user)
+
+    def test_next_must_stay_on_site(self):
+        self.client.force_login(self.user)
+        for next_url, expected in (("/saledata/?page=2", "/saledata/?page=2"), ("", reverse("dashboard")),
+                                   ("https://evil.example/", reverse("dashboard")),
+                                   ("//evil.example/x", reverse("dashboard"))):
+            with self.subTest(next=next_url):
+                response = self.client.post(reverse("switch_org"), {"org_id": self.org.pk, "next": next_url})
+                self.assertRedirects(response, expected, fetch_redirect_response=False)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class CacheTagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_waits_for_commit(self):
+        tags = cachetags.org_tags(7, "sales") + [cachetags.party_tag("Shree Ram Traders")]
+        before = cachetags.tag_versions(tags)
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                cachetags.invalidate_for(7, "sales", parties=["Shree Ram Traders"])
+                self.assertEqual(cachetags.tag_versions(tags), before)
+        self.assertEqual(cachetags.tag_versions(tags), before)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(all(new > old for new, old in zip(cachetags.tag_versions(tags), before)))
+
+    def test_name_tags_are_valid_cache_keys(self):
+        for name in ("Shree Ram Traders", "શ્રી રામ ટ્રેડર્સ", "X" * 500):
+            for tag in (cachetags.party_tag(name), cachetags.broker_tag(name)):
+                with self.subTest(tag=tag):
+                    self.assertEqual(list(memcache_key_warnings(cachetags._VERSION_PREFIX + tag)), [])
+        self.assertNotEqual(cachetags.party_tag("A B"), cachetags.party_tag("A_B"))
+
+    def test_moving_an_entry_invalidates_old_and_new_heads(self):
+        org = Organization.objects.create(name="Moves")
+        old, new = (HeadParty.objects.create(partyname=name, org=org) for name in ("Moves Old", "Moves New"))
+        broker = Broker.objects.create(brokername="Moves Broker", org=org)
+        sale = SaleMaster.objects.create(org=org, invdate=date(2025, 4, 1), party=old, broker=broker)
+        page = DailyPage.objects.create(org=org, date=date(2025, 4, 1))
+        entry = JamaEntry.objects.create(daily_page=page, party=old, broker=broker, amount=10)
+        tags = [cachetags.party_tag(old), cachetags.party_tag(new)]
+        for obj in (sale, entry):
+            with self.subTest(model=type(obj).__name__):
+                obj.refresh_from_db()
+                obj.party = new
+                before = cachetags.tag_versions(tags)
+                with self.captureOnCommitCallbacks(execute=True):
+                    obj.save()
+                self.assertTrue(all(a > b for a, b in zip(cachetags.tag_versions(tags), before)))
+
+    def test_master_saves_refresh_choice_lists(self):
+        org = Organization.objects.create(name="Masterdata")
+        with self.captureOnCommitCallbacks(execute=True):
+            HeadParty.objects.create(partyname="MD One", org=org)
+        self.assertEqual([p.pk for p in masterdata.get_parties(org)], ["MD One"])
+        version = masterdata.get_version(org)
+        with self.captureOnCommitCallbacks(execute=True):
+            HeadParty.objects.create(partyname="MD Two", org=org)
+        self.assertGreater(masterdata.get_version(org), version)
+        self.assertEqual([p.pk for p in masterdata.get_parties(org)], ["MD One", "MD Two"])
+
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ArtifactCacheTests(TestCase):
+    """A rendered document is reused until one of its tags is invalidated; its key is the ETag."""
+
+    TAGS = [cachetags.party_tag("Artifact Party")]
+
+    def setUp(self):
+        cache.clear()
+        path = tempfile.mkdtemp(prefix="artifacts-")
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        self.enterContext(override_settings(ARTIFACT_CACHE_DIR=path))
+        self.render = mock.Mock(side_effect=lambda fh: fh.write(b"document"))
+
+    def serve(self, **headers):
+        request = RequestFactory().get("/statement", headers=headers)
+        return artifacts.serve(request, "party_statement_xlsx", 1, {"pk": "Artifact Party"}, self.TAGS,
+                               "statement.xlsx", exporters.XLSX_CONTENT_TYPE, self.render)
+
+    def test_second_request_is_served_from_the_cache(self):
+        first = self.serve()
+        self.assertEqual(b"".join(first.streaming_content), b"document")
+        second = self.serve()
+        self.assertEqual(b"".join(second.streaming_content), b"document")
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_if_none_match_gets_not_modified(self):
+        etag = self.serve()["ETag"]
+        self.assertEqual(self.serve(if_none_match=etag).status_code, 304)
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_invalidated_tag_renders_again(self):
+        etag = self.serve()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            cachetags.invalidate(*self.TAGS)
+        response = self.serve(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.render.call_count, 2)
+
+
+def build_test_font(path, chars):
+    """A TTF with a box outline for each of `chars` (a stand-in for a real script font)."""
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+    names = [f"uni{ord(c):04X}" for c in chars]
+    pen = TTGlyphPen(None)
+    pen.moveTo((100, 0))
+    pen.lineTo((100, 700))
+    pen.lineTo((500, 700))
+    pen.lineTo((500, 0))
+    pen.closePath()
+    box = pen.glyph()
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder([".notdef", "space"] + names)
+    fb.setupCharacterMap({32: "space", **{ord(c): name for c, name in zip(chars, names)}})
+    fb.setupGlyf({".notdef": box, "space": TTGlyphPen(None).glyph(), **{name: box for name in names}})
+    fb.setupHorizontalMetrics({name: (600, 100) for name in [".notdef", "space"] + names})
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({"familyName": "Test Gujarati", "styleName": "Regular"})
+    fb.setupOS2()
+    fb.setupPost()
+    fb.save(str(path))
+
+
+class PdfFontTests(SimpleTestCase):
+    """
+    Documents get working copies of the registry's fonts (pdffonts._add sets
+    fpdf's per-document TTFFont fields, so an fpdf2 upgrade that changes them
+    fails here) and draw the characters FiraGO lacks from PDF_FALLBACK_FONTS.
+    """
+
+    GUJARATI = "કપાસ"
+
+    def setUp(self):
+        fonts = tempfile.mkdtemp(prefix="pdf-fonts-")
+        self.addCleanup(shutil.rmtree, fonts, ignore_errors=True)
+        self.fallback = Path(fonts) / "TestGujarati.ttf"
+        build_test_font(self.fallback, self.GUJARATI)
+
+    def render(self, value):
+        """(embedded font names, extracted text) of a one-line document showing `value`."""
+        from pypdf import PdfReader
+
+        pdf = pdftable.document()
+        pdf.set_font(pdftable.FONT, "", 12)
+        pdf.cell(0, 10, value)
+        page = PdfReader(io.BytesIO(bytes(pdf.output()))).pages[0]
+        fonts = {str(font.get_object()["/BaseFont"]) for font in page["/Resources"]["/Font"].values()}
+        return fonts, "".join(c for c in page.extract_text() if c.isprintable())
+
+    def test_devanagari_with_bundled_font(self):
+        fonts, text = self.render("पार्टी Ram ₹")
+        self.assertTrue(any("FiraGO" in name for name in fonts), fonts)
+        self.assertIn("Ram", text)
+
+    def test_gujarati_from_fallback_font(self):
+        with override_settings(PDF_FALLBACK_FONTS=[str(self.fallback)]):
+            fonts, text = self.render(f"Party {self.GUJARATI}")
+        self.assertTrue(any("TestGujarati" in name for name in fonts), fonts)
+        self.assertIn(self.GUJARATI, text)
+
+    def test_default_fonts_load_without_warnings(self):
+        with mock.patch.dict(pdffonts._loaded, clear=True), self.assertNoLogs("brokerapp.pdffonts", "WARNING"):
+            pdffonts.preload()
+            self.assertTrue(pdffonts._loaded)
+            self.assertNotIn(None, pdffonts._loaded.values())
+
+
+
+
+@override_settings(MULTI_ORG=True, CACHES=LOCMEM_CACHES)
+class ExportTests(TestCase):
+    """Streamed CSV / TSV and XLSX exports of a small org read back as the rows they were built from."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("exports")
+        cls.org = Organization.objects.create(name="Exports", owner=cls.user)
+        cls.party = HeadParty.objects.create(partyname="EX Party", org=cls.org)
+        broker = Broker.objects.create(brokername="EX Broker", org=cls.org)
+        kw = dict(org=cls.org, party=cls.party, broker=broker)
+        cls.sales = [
+            SaleMaster.objects.create(invdate=date(2025, 4, 1), netamt=Decimal("100.50"), vehicleno="GJ03 1",
+                                      remark="કપાસ, 20 bora", **kw),
+            SaleMaster.objects.create(invdate=date(2025, 4, 2), netamt=Decimal("200"), vehicleno="GJ03 2", **kw),
+        ]
+        cls.purchase = PurchaseMaster.objects.create(invdate=date(2025, 4, 3), netamt=Decimal("50"), **kw)
+
+    def setUp(self):
+        artifacts = tempfile.mkdtemp(prefix="export-artifacts-")
+        self.addCleanup(shutil.rmtree, artifacts, ignore_errors=True)
+        self.enterContext(override_settings(ARTIFACT_CACHE_DIR=artifacts))
+        self.client.force_login(self.user)
+        session = self.client.session
+        session["org_id"] = self.org.pk
+        session.save()
+
+    def expected_sale_rows(self):
+        return [[str(s.invno), s.invdate.isoformat(), "EX Party", "EX Broker", s.vehicleno, f"{s.netamt:.2f}",
+                 s.remark or ""] for s in reversed(self.sales)]
+
+    def test_sale_list_csv(self):
+        response = self.client.get(reverse("saledata"), {"export": "csv"})
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        body = b"".join(response.streaming_content).decode("utf-8")
+        self.assertTrue(body.startswith("\ufeff"))
+        rows = list(csv.reader(io.StringIO(body[1:])))
+        self.assertEqual(rows[0], ["Invoice No", "Invoice Date", "Party Name", "Broker", "Vehicle No", "Amount",
+                                   "Remark"])
+        self.assertEqual(rows[1:], self.expected_sale_rows())
+
+    def test_sale_list_gzipped_tsv(self):
+        response = self.client.get(reverse("saledata"), {"export": "tsv", "gzip": "1"})
+        self.assertIn('filename="saledata_', response["Content-Disposition"])
+        self.assertTrue(response["Content-Disposition"].endswith('.tsv.gz"'))
+        body = gzip.decompress(b"".join(response.streaming_content)).decode("utf-8-sig")
+        self.assertEqual(list(csv.reader(io.StringIO(body), delimiter="\t"))[1:], self.expected_sale_rows())
+
+    def test_write_xlsx_from_a_queryset(self):
+        from openpyxl import load_workbook
+
+        rows = SaleMaster.objects.filter(org=self.org).order_by("invno").values_list("invno", "netamt") \
+            .iterator(chunk_size=1)
+        out = io.BytesIO()
+        exporters.write_xlsx(out, ["Invoice No", "Amount"], rows, title="Sales", footer=lambda: [["Total", 300.5]])
+        sheet = load_workbook(out, read_only=True)["Sales"]
+        self.assertEqual(list(sheet.values), [
+            ("Invoice No", "Amount"),
+            (self.sales[0].invno, 100.5),
+            (self.sales[1].invno, 200),
+            ("Total", 300.5),
+        ])
+
+    def test_party_statement_xlsx(self):
+        from openpyxl import load_workbook
+
+        response = self.client.post(reverse("party_statement"), {"action": "export_excel", "party": "EX Party"})
+        self.assertEqual(response["Content-Type"], exporters.XLSX_CONTENT_TYPE)
+        sheet = load_workbook(io.BytesIO(b"".join(response.streaming_content)), read_only=True).active
+        rows = [row for row in sheet.values if any(v not in (None, "") for v in row)]
+        self.assertEqual(rows[0], ("Entry No", "Date", "Debit", "Credit", "Remark", "Balance"))
+        self.assertEqual([row[:4] for row in rows[1:-1]], [
+            (self.sales[0].invno, "2025-04-01", 100.5, 0),
+            (self.sales[1].invno, "2025-04-02", 200, 0),
+            (self.purchase.invno, "2025-04-03", 0, 50),
+        ])
+        self.assertEqual([row[5] for row in rows[1:-1]], [100.5, 300.5, 250.5])
+        self.assertEqual((rows[-1][1:4], rows[-1][5]), (("Total", 300.5, 50), 250.5))
+
+
+class RequestTimingTests(TestCase):
+    """With REQUEST_TIMING, staff get the Server-Timing header; every slow request is logged."""
+
+    def setUp(self):
+        logs = tempfile.mkdtemp(prefix="slow-requests-")
+        self.addCleanup(shutil.rmtree, logs, ignore_errors=True)
+        self.enterContext(override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=0,
+                                            SLOW_REQUEST_LOG=Path(logs) / "slow.log"))
+
+    def get(self, user=None):
+        if user is not None:
+            self.client.force_login(user)
+        with self.assertLogs("brokerapp.timing.slow", "INFO") as logs:
+            response = self.client.get(reverse("healthz"))
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('"path": "/healthz/"', logs.records[0].getMessage())
+        return response
+
+    def test_staff_get_the_header(self):
+        response = self.get(User.objects.create_user("timing-staff", is_staff=True))
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries".*total;dur=[\d.]+$')
+
+    def test_others_are_only_logged(self):
+        self.assertNotIn("Server-Timing", self.get())
+        self.assertNotIn("Server-Timing", self.get(User.objects.create_user("timing-user")))
+
+
+class ImportTimeTests(SimpleTestCase):
+    """
+    Worker cold start: loading the URLconf (all views) must not pull in the
+    document libraries and must stay under IMPORT_BUDGET_MS, measured with
+    `python -X importtime` in a fresh interpreter.
+    """
+
+    # was ~390 ms when views.py imported fpdf/openpyxl/num2words at module level
+    IMPORT_BUDGET_MS = int(os.environ.get("IMPORT_BUDGET_MS", "300"))
+    HEAVY_MODULES = ("fpdf", "openpyxl", "num2words", "reportlab", "PIL")
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "broker_project.settings"))
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import django; django.setup(); import broker_project.urls"],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+        )
+        if proc.returncode != 0:
+            raise AssertionError(proc.stderr[-2000:])
+        # "import time: self [us] | cumulative | imported package"
+        cls.cumulative_us = {}
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                cls.cumulative_us[parts[2].strip()] = int(parts[1])
+
+    def test_document_libraries_not_imported(self):
+        loaded = sorted(m for m in self.cumulative_us if m.split(".")[0] in self.HEAVY_MODULES)
+        self.assertEqual(loaded, [])
+
+    def test_views_import_budget(self):
+        views_ms = self.cumulative_us["brokerapp.views"] / 1000
+        self.assertLess(views_ms, self.IMPORT_BUDGET_MS,
+                        f"brokerapp.views took {views_ms:.0f} ms to import")
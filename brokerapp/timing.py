@@ -0,0 +1,214 @@
+# brokerapp/timing.py
+"""
+Per-request timings: SQL (count, time, repeated statements), template
+rendering and document (PDF / XLSX) generation.
+
+A Recorder is bound to the current request in a context variable, so it is
+seen by the request's own thread and by the sync_to_async threads of an
+ASGI request, and by nothing else. Once install() has run:
+
+- every database connection has an execute wrapper that times each query
+  and counts it by shape (the SQL text with its placeholders; IN lists of
+  any length count as one shape);
+- Template.render is timed (outermost render only, so includes are not
+  counted twice);
+- span("doc") around a document render adds its time (queries run by the
+  render are in both db and doc).
+
+Outside a request (no Recorder) the wrappers do nothing but call through.
+brokerapp.middleware.RequestTimingMiddleware turns this on with
+REQUEST_TIMING and writes the Server-Timing header and the slow-request log.
+"""
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# statements listed per slow request
+TOP_SHAPES = 5
+
+_current = contextvars.ContextVar("brokerapp_timing", default=None)
+_install_lock = threading.Lock()
+_installed = False
+
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def shape(sql):
+    """`sql` with IN (%s, %s, ...) lists collapsed and whitespace normalized."""
+    return _SPACES.sub(" ", _IN_LIST.sub("(%s, ...)", sql)).strip()
+
+
+class Recorder:
+    """Timings of one request (milliseconds)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.shapes = Counter()        # shape -> executions
+        self.shape_ms = Counter()      # shape -> total ms
+        self.spans = Counter()         # "tpl" / "doc" -> ms
+        self.template_depth = 0
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def add_query(self, sql, ms):
+        key = shape(sql)
+        self.queries += 1
+        self.sql_ms += ms
+        self.shapes[key] += 1
+        self.shape_ms[key] += ms
+
+    def top_shapes(self, n=TOP_SHAPES):
+        """[(count, ms, sql)] of the statements run more than once, most executed first (all if n is None)."""
+        repeated = [(count, round(self.shape_ms[sql], 2), sql) for sql, count in self.shapes.items() if count > 1]
+        return sorted(repeated, key=lambda s: (-s[0], -s[1]))[:n]
+
+    def server_timing(self):
+        """Value of the Server-Timing header."""
+        parts = [f'db;dur={self.sql_ms:.1f};desc="{self.queries} queries"']
+        for name, desc in (("tpl", "templates"), ("doc", "documents")):
+            if name in self.spans:
+                parts.append(f'{name};dur={self.spans[name]:.1f};desc="{desc}"')
+        parts.append(f"total;dur={self.total_ms:.1f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def recording():
+    """Bind a new Recorder to the current context for the duration of the block."""
+    recorder = Recorder()
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block to the current request's `name` span."""
+    recorder = _current.get()
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.spans[name] += (time.perf_counter() - start) * 1000
+
+
+# ---------- hooks ----------
+
+def _execute_wrapper(execute, sql, params, many, context):
+    recorder = _current.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add_query(sql, (time.perf_counter() - start) * 1000)
+
+
+def _wrap_connection(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        recorder = _current.get()
+        if recorder is None or recorder.template_depth:
+            return render(self, context)
+        recorder.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            recorder.template_depth -= 1
+            recorder.spans["tpl"] += (time.perf_counter() - start) * 1000
+    return wrapper
+
+
+def install():
+    """
+    Hook SQL execution and template rendering (once per process). This
+    replaces django.template.base.Template.render for the whole process, not
+    just for the requests being timed; outside a recording the wrapper only
+    calls through.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from django.template.base import Template
+
+        connection_created.connect(_wrap_connection, dispatch_uid="brokerapp.timing")
+        wrap_current_connections()
+        Template.render = _timed_render(Template.render)
+        _installed = True
+
+
+def wrap_current_connections():
+    """Hook connections of this thread that were opened before install()."""
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+
+
+# ---------- slow request log ----------
+
+_slow_logger = None
+
+
+def slow_logger():
+    """Logger writing one JSON line per slow request to SLOW_REQUEST_LOG (rotated by size)."""
+    global _slow_logger
+    with _install_lock:
+        if _slow_logger is None:
+            path = Path(settings.SLOW_REQUEST_LOG)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=settings.SLOW_REQUEST_LOG_MAX_BYTES,
+                                          backupCount=settings.SLOW_REQUEST_LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger("brokerapp.timing.slow")
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            _slow_logger = logger
+    return _slow_logger
+
+
+def log_slow(request, response, recorder):
+    """Append `request` to the slow-request log if it took SLOW_REQUEST_MS or longer."""
+    total = recorder.total_ms
+    if total < settings.SLOW_REQUEST_MS:
+        return False
+    slow_logger().info(json.dumps({
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "status": response.status_code,
+        "total_ms": round(total, 1),
+        "queries": recorder.queries,
+        "sql_ms": round(recorder.sql_ms, 1),
+        "template_ms": round(recorder.spans["tpl"], 1),
+        "document_ms": round(recorder.spans["doc"], 1),
+        "repeated": [{"count": c, "ms": ms, "sql": sql} for c, ms, sql in recorder.top_shapes()],
+    }))
+    return True
@@ -0,0 +1,109 @@
+# brokerapp/typeahead.py
+"""
+Autocomplete lookups for party / broker / item pickers.
+
+1. Prefix match on the normalized `search_key` column — a range scan on the
+   (org, search_key) index on every backend. The column is filled by the
+   models' save(); rows written with bulk_create() or queryset.update() need
+   it set by the caller, or they are only found by the substring match.
+2. If that leaves room, substring match (icontains) on the name, the party's
+   city / mobile and the broker's mobile — served by pg_trgm GIN indexes on
+   PostgreSQL.
+
+Entries the user picked recently (RecentChoice) are ranked first.
+"""
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Broker, HeadItem, HeadParty, RecentChoice, normalize_search_key
+
+# kind -> (model, name field, extra fields searched by substring and returned)
+SOURCES = {
+    "party": (HeadParty, "partyname", ("city", "mobile")),
+    "broker": (Broker, "brokername", ("mobileno",)),
+    "item": (HeadItem, "item_name", ()),
+}
+
+MAX_LIMIT = 50
+RECENT_WINDOW = 50   # how many recent picks per user/kind are considered for ranking
+
+
+def _prefix_filter(key):
+    if connection.vendor == "postgresql":
+        # LIKE 'key%' uses the varchar_pattern_ops index
+        return Q(search_key__startswith=key)
+    # range scan; search_key is already lower-cased
+    return Q(search_key__gte=key, search_key__lt=key + "\uffff")
+
+
+def recent_keys(user, org, kind):
+    """{pk: rank} of the user's recent picks, most recent = 0."""
+    if user is None or not user.is_authenticated:
+        return {}
+    keys = (
+        RecentChoice.objects
+        .filter(user=user, org=org, kind=kind)
+        .order_by("-used_at")
+        .values_list("key", flat=True)[:RECENT_WINDOW]
+    )
+    return {k: i for i, k in enumerate(keys)}
+
+
+def search(org, kind, q, user=None, limit=10):
+    """Return up to `limit` dicts {id, text, <extra fields>, recent} for the picker."""
+    model, name_field, extra = SOURCES[kind]
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    fields = (name_field,) + extra
+    base = model.objects.filter(org=org)
+    recent = recent_keys(user, org, kind)
+    key = normalize_search_key(q)
+
+    if not key:
+        # empty query: just the user's recent picks, in recency order
+        wanted = sorted(recent, key=recent.get)[:limit]
+        rows = {r[0]: r for r in base.filter(pk__in=wanted).values_list(*fields)}
+        matches = [(rows[k], 0) for k in wanted if k in rows]
+    else:
+        fetch = limit * 3
+        matches = [(r, 0) for r in base.filter(_prefix_filter(key)).order_by("search_key").values_list(*fields)[:fetch]]
+        if len(matches) < fetch:
+            seen = {r[0] for r, _ in matches}
+            # UPPER(col::text) LIKE UPPER('%q%') on PostgreSQL: served by the trigram indexes of migration 0018
+            cond = Q(**{f"{name_field}__icontains": q.strip()})
+            for f in extra:
+                cond |= Q(**{f"{f}__icontains": q.strip()})
+            for r in base.filter(cond).exclude(pk__in=seen).order_by(name_field).values_list(*fields)[:fetch - len(matches)]:
+                matches.append((r, 1))
+
+    # recent picks first, then prefix before substring, then alphabetical
+    matches.sort(key=lambda m: (m[0][0] not in recent, recent.get(m[0][0], 0), m[1], m[0][0].casefold()))
+
+    results = []
+    for row, _ in matches[:limit]:
+        item = {"id": row[0], "text": row[0], "recent": row[0] in recent}
+        item.update(zip(extra, row[1:]))
+        results.append(item)
+    return results
+
+
+def note_recent(user, org, party=None, broker=None, items=()):
+    """Record the records a user just used (one upsert query)."""
+    if user is None or not user.is_authenticated:
+        return
+    now = timezone.now()
+    picks = [("party", party), ("broker", broker)] + [("item", it) for it in items]
+    objs = {}
+    for kind, obj in picks:
+        if obj is None:
+            continue
+        pk = getattr(obj, "pk", obj)
+        objs[(kind, pk)] = RecentChoice(user=user, org=org, kind=kind, key=pk, used_at=now)
+    if not objs:
+        return
+    RecentChoice.objects.bulk_create(
+        objs.values(),
+        update_conflicts=True,
+        unique_fields=["user", "org", "kind", "key"],
+        update_fields=["used_at"],
+    )
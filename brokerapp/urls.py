@@ -20,6 +20,11 @@ urlpatterns = [
     
     path('items/', views.item_view, name='item'),  
     path('items/create/', views.item_view, name='item_create'),
+
+    # Cached master-data choices (parties/brokers/items) for client-side selects
+    path('masterdata/', views.masterdata_json, name='masterdata'),
+    # Typeahead lookups: /api/typeahead/party|broker|item/?q=...
+    path('api/typeahead/<str:kind>/', views.typeahead_view, name='typeahead'),
     
     # Authentication URLs
     path("login/", auth_views.LoginView.as_view(template_name="auth/login.html"), name="login"),
@@ -32,6 +37,14 @@ urlpatterns = [
 
     # Dashboard
     path("dashboard/", views.dashboard, name='dashboard'),
+    path("org/switch/", views.switch_org, name='switch_org'),
+    # One search box: invoices, daily entries and masters
+    path("search/", views.global_search, name='global_search'),
+
+    # Health check (skips org resolution)
+    path("healthz/", views.healthz, name='healthz'),
+    path("ops/cache-stats/", views.cache_stats, name='cache_stats'),
+    path("ops/db-pool/", views.db_pool_stats, name='db_pool_stats'),
 
     path('sale/', views.sale_form, name='sale_form_new'),
     path('sale/<int:invno>/', views.sale_form, name='sale_form_update'),
@@ -42,6 +55,8 @@ urlpatterns = [
     path('sale-search/', views.sale_search_view, name='sale_search'),
     path("sale-report/", views.sale_report, name="sale_report"),
     path('reports/sales/pdf/', views.sale_report_pdf, name='sale_report_pdf'),
+    # Batch invoice print: ?date= | ?start_date=&end_date= | ?from_invno=&to_invno=
+    path('reports/sales/invoices/pdf/', views.sale_invoices_pdf, name='sale_invoices_pdf'),
 
     path("bardana-report/", views.bardana_report, name="bardana_report"),
     
@@ -53,6 +68,7 @@ urlpatterns = [
     path('purchase/delete/<int:invno>/', views.delete_purchase, name='delete_purchase'),
     path('purchasedata/', views.purchase_data_view, name='purchasedata'),
     path("purchase-report/", views.purchase_report, name="purchase_report"),
+    path('purchase-search/', views.purchase_search_view, name='purchase_search'),
     
     path('daily-page/', views.daily_page_view, name='daily_page'),
     path('daily-page/show/', views.daily_page_show, name='daily_page_show'),         # GET entries for a date (AJAX)
@@ -60,7 +76,14 @@ urlpatterns = [
     path('daily-page/naame/add/', views.daily_page_naame_add, name='daily_page_naame_add'),# POST
     path('daily-page/jama/delete/<int:entry_no>/', views.daily_page_jama_delete, name='daily_page_jama_delete'),
     path('daily-page/naame/delete/<int:entry_no>/', views.daily_page_naame_delete, name='daily_page_naame_delete'),
-    path('daily-page/pdf/', views.daily_page_pdf, name='daily_page_pdf'),
+    path('daily-page/pdf/', views.daily_page_pdf, name='daily_page_pdf'),             # ?date= or ?start_date=&end_date=
+    path('daily-page/book/', views.day_book, name='day_book'),
+
+    # Background jobs (exports rendered by `manage.py run_worker`)
+    path('jobs/', views.job_list, name='job_list'),
+    path('jobs/<int:pk>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:pk>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:pk>/download/', views.job_download, name='job_download'),
     
     # Accounts
     path("account/all-party-balance/", views.AllPartyBalanceView.as_view(), name="all_party_balance"),
@@ -0,0 +1,27 @@
+# brokerapp/views/__init__.py
+"""
+Views, split by area. urls.py keeps using `views.<name>`, so everything it
+routes to is re-exported here.
+
+PDF / Excel libraries (fpdf2, openpyxl) are imported inside the export code
+paths, not here, so a worker starts without loading them.
+"""
+from .accounts import AllBrokerBalanceView, AllPartyBalanceView, BrokerStatementView, PartyStatementView
+from .core import dashboard, global_search, healthz, masterdata_json, switch_org, typeahead_view
+from .daily_page import (
+    daily_page_jama_add, daily_page_jama_delete, daily_page_naame_add, daily_page_naame_delete,
+    daily_page_show, daily_page_view, day_book,
+)
+from .exports import (
+    daily_page_pdf, daily_page_pdf_job, sale_invoices_pdf, sale_report_pdf, sale_report_pdf_job,
+)
+from .masters import broker_delete, broker_view, item_view, party_delete, party_view
+from .ops import cache_stats, db_pool_stats, job_detail, job_download, job_list, job_status
+from .purchases import (
+    delete_purchase, purchase_data_view, purchase_form, purchase_report, purchase_search_view, save_purchase,
+    update_purchase,
+)
+from .sales import (
+    bardana_report, delete_sale, sale_data_view, sale_form, sale_report, sale_search_view, save_sale,
+    update_sale,
+)
@@ -0,0 +1,689 @@
+# brokerapp/views/accounts.py
+"""Account statements and balances (party / broker), with print / Excel / PDF actions."""
+import heapq
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import chain, groupby
+
+from django.db.models import Q, Sum
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.views.generic import TemplateView
+
+from brokerapp import artifacts, cachetags, exporters, masterdata, pdftable
+from brokerapp.models import (
+    Broker, HeadParty, JamaEntry, NaameEntry, PurchaseMaster, SaleMaster,
+)
+from .common import load_fpdf, load_openpyxl
+from .ops import _enqueue_view_export, _wants_background
+
+
+# POST actions that produce a file (and can run in the background) -> label
+EXPORT_ACTIONS = {"export_excel": "Excel", "pdf": "PDF"}
+
+ZERO = Decimal("0")
+
+# rows fetched per round trip when streaming a statement
+STATEMENT_CHUNK_SIZE = 2000
+
+STATEMENT_HEADERS = ["Entry No", "Date", "Debit", "Credit", "Remark", "Balance"]
+
+STATEMENT_PDF_COLUMNS = [
+    pdftable.Column("Entry No", 22),
+    pdftable.Column("Date", 22, fmt=pdftable.iso),
+    pdftable.Column("Debit", 28, "R", pdftable.amount),
+    pdftable.Column("Credit", 28, "R", pdftable.amount),
+    pdftable.Column("Remark", 60),
+    pdftable.Column("Balance", 30, "R", pdftable.amount),
+]
+
+# after the Party / Broker name column
+BALANCE_PDF_COLUMNS = [
+    pdftable.Column(title, width, "R", pdftable.amount)
+    for title, width in (("Op Dr", 18), ("Op Cr", 18), ("Opening", 24), ("Sale", 18), ("Purchase", 22),
+                         ("Naame", 18), ("Jama", 18), ("Balance", 22))
+]
+
+
+def _with_balance(entries):
+    """Add the running balance (debit - credit) to each entry as it streams past."""
+    bal = Decimal("0")
+    for e in entries:
+        bal += (e["debit"] or Decimal("0")) - (e["credit"] or Decimal("0"))
+        e["balance"] = bal
+        yield e
+
+
+def _day_sorted(entries, key):
+    """Sort each same-date run of a date-ordered stream by `key` (one day in memory at a time)."""
+    for _, run in groupby(entries, key=lambda e: e["date"]):
+        yield from sorted(run, key=key)
+
+
+def _statement_xlsx(request, kind, head, tags, filename, title, entries):
+    """
+    Statement `entries` streamed into an .xlsx with a totals row at the end,
+    through the artifact cache like _statement_pdf.
+    """
+    Workbook, _ = load_openpyxl()
+    if Workbook is None:
+        return HttpResponse(
+            "Required package 'openpyxl' not installed. Install with: pip install openpyxl",
+            content_type="text/plain",
+            status=500
+        )
+
+    totals = {"debit": Decimal("0"), "credit": Decimal("0"), "balance": Decimal("0")}
+
+    def rows():
+        for e in entries:
+            totals["debit"] += e["debit"]
+            totals["credit"] += e["credit"]
+            totals["balance"] = e["balance"]
+            yield [
+                e.get("entry_no"),
+                e["date"].strftime("%Y-%m-%d") if e["date"] else "",
+                float(e.get("debit") or 0),
+                float(e.get("credit") or 0),
+                e.get("remark") or "",
+                float(e.get("balance") or 0),
+            ]
+
+    def footer():
+        return [[], ["", "Total", float(totals["debit"]), float(totals["credit"]), "", float(totals["balance"])]]
+
+    def render(fh):
+        exporters.write_xlsx(fh, STATEMENT_HEADERS, rows(), title=title, footer=footer)
+
+    try:
+        return artifacts.serve(request, kind, head.org_id, {"pk": head.pk}, tags, filename,
+                               exporters.XLSX_CONTENT_TYPE, render)
+    except Exception as exc:
+        return HttpResponse(f"Excel export failed: {exc}", content_type="text/plain", status=500)
+
+
+def _statement_pdf(request, kind, head, tags, filename, title, build):
+    """
+    Statement as a PDF table with a totals row, through the artifact cache:
+    `build()` -> (entries, total_debit, total_credit, balance) only runs when
+    this statement has not been rendered since its data last changed.
+    """
+    today = date.today()
+
+    def render(fh):
+        if load_fpdf() is None:
+            raise RuntimeError("Required package 'fpdf2' not installed. Install with: pip install fpdf2")
+        entries, total_debit, total_credit, balance = build()
+        pdf = pdftable.document(title, f"Generated on: {today.strftime('%d-%m-%Y')}")
+        table = pdftable.Table(pdf, STATEMENT_PDF_COLUMNS, header_height=8)
+        table.header()
+        table.rows(
+            (e.get("entry_no"), e["date"], e.get("debit"), e.get("credit"), e.get("remark"), e.get("balance"))
+            for e in entries
+        )
+        table.row(("TOTAL", "", total_debit, total_credit, "", balance), style="B", height=8)
+        pdf.output(fh)
+
+    try:
+        # the date is part of the key: it is printed on the document
+        return artifacts.serve(request, kind, head.org_id, {"pk": head.pk, "date": today}, tags, filename,
+                               "application/pdf", render)
+    except Exception as exc:
+        return HttpResponse(f"PDF generation failed: {exc}", content_type="text/plain", status=500)
+
+
+def _sums_by(model, fk, amount, date_field, start, end, **scope):
+    """{fk value: (sum of `amount` before `start`, sum from `start` to `end`)} of `model`, in one query."""
+    rows = (
+        model.objects.filter(**scope, **{f"{date_field}__lte": end}).order_by().values(fk)
+        .annotate(before=Sum(amount, filter=Q(**{f"{date_field}__lt": start})),
+                  during=Sum(amount, filter=Q(**{f"{date_field}__gte": start})))
+    )
+    return {r[fk]: (r["before"] or ZERO, r["during"] or ZERO) for r in rows}
+
+
+def _balances(masters, fk, start, end, org_id):
+    """
+    All-party / all-broker balance rows and totals of `masters` (parties or
+    brokers; `fk` names the field pointing at them). Sales, purchases, naame
+    and jama are each summed per party / broker in one grouped query, so the
+    query count does not grow with the number of rows.
+    """
+    scope = {"org_id": org_id} if org_id else {}
+    page_scope = {"daily_page__org_id": org_id} if org_id else {}
+    sales = _sums_by(SaleMaster, fk, "netamt", "invdate", start, end, **scope)
+    purchases = _sums_by(PurchaseMaster, fk, "netamt", "invdate", start, end, **scope)
+    naames = _sums_by(NaameEntry, fk, "amount", "daily_page__date", start, end, **page_scope)
+    jamas = _sums_by(JamaEntry, fk, "amount", "daily_page__date", start, end, **page_scope)
+
+    rows = []
+    totals = {
+        "opdr": ZERO, "opcr": ZERO,
+        "sale": ZERO, "purchase": ZERO,
+        "naame": ZERO, "jama": ZERO,
+        "balance": ZERO
+    }
+    none = (ZERO, ZERO)
+    for m in masters:
+        op_dr = Decimal(m.openingdebit or 0)
+        op_cr = Decimal(m.openingcredit or 0)
+        sale_before, sale = sales.get(m.pk, none)
+        purch_before, purchase = purchases.get(m.pk, none)
+        naame_before, naame = naames.get(m.pk, none)
+        jama_before, jama = jamas.get(m.pk, none)
+
+        opening = (op_dr - op_cr) + (sale_before - purch_before + naame_before - jama_before)
+        balance = opening + sale - purchase + naame - jama
+
+        rows.append({
+            fk: m, "op_dr": op_dr, "op_cr": op_cr, "opening": opening,
+            "sale": sale, "purchase": purchase, "naame": naame,
+            "jama": jama, "balance": balance
+        })
+
+        totals["opdr"] += op_dr
+        totals["opcr"] += op_cr
+        totals["sale"] += sale
+        totals["purchase"] += purchase
+        totals["naame"] += naame
+        totals["jama"] += jama
+        totals["balance"] += balance
+
+    return {"rows": rows, "totals": totals, "start": start, "end": end}
+
+
+def _balance_export(request, kind, filename, content_type, today, render):
+    """
+    An all-party / all-broker balance export through the artifact cache. The
+    balances are as of `today`, which is part of the key.
+    """
+    org_id = request.session.get("org_id")
+    tags = cachetags.org_tags(org_id, "sales", "purchases", "daily", "masters")
+    return artifacts.serve(request, kind, org_id, {"date": today}, tags, filename, content_type, render)
+
+
+def _balance_pdf(request, kind, filename, title, label, name_attr, ctx, today):
+    """All-party / all-broker balance rows as a PDF table with a totals row."""
+    if load_fpdf() is None:
+        return HttpResponse(
+            "Required package 'fpdf2' not installed. Install with: pip install fpdf2",
+            content_type="text/plain",
+            status=500
+        )
+
+    def render(fh):
+        pdf = pdftable.document(title, f"Generated on: {today.strftime('%d-%m-%Y')}")
+        columns = [pdftable.Column(label, 50)] + BALANCE_PDF_COLUMNS
+        table = pdftable.Table(pdf, columns, header_height=8)
+        table.header()
+        key = label.lower()
+        table.rows(
+            (getattr(r[key], name_attr, str(r[key])), r["op_dr"], r["op_cr"], r["opening"], r["sale"],
+             r["purchase"], r["naame"], r["jama"], r["balance"])
+            for r in ctx["rows"]
+        )
+        # Opening total left blank since it's derived per row
+        t = ctx["totals"]
+        table.row(("TOTAL", t["opdr"], t["opcr"], "", t["sale"], t["purchase"], t["naame"], t["jama"], t["balance"]),
+                  style="B", height=8)
+        pdf.output(fh)
+
+    return _balance_export(request, kind, filename, "application/pdf", today, render)
+
+
+class AllPartyBalanceView(TemplateView):
+    """
+    Simplified AllPartyBalanceView matching compact template (no filters).
+    Supports POST actions via buttons with name="action":
+      - balance       : show table in page
+      - print         : render printable HTML (user can browser-print)
+      - export_excel  : return .xlsx (requires openpyxl)
+      - pdf           : return PDF generated with fpdf2
+    """
+    template_name = "brokerapp/account/all_party_balance.html"
+    printable_template = "brokerapp/account/all_party_balance_printable.html"
+
+    # ---------- GET ----------
+    def get(self, request, *args, **kwargs):
+        today = date.today()
+        ctx = self._build_context(start=today, end=today, party=None)
+        ctx["show_table"] = False
+        return self.render_to_response(ctx)
+
+    # ---------- POST ----------
+    def post(self, request, *args, **kwargs):
+        action = request.POST.get("action")
+        today = date.today()
+
+        if action in EXPORT_ACTIONS and _wants_background(request):
+            return _enqueue_view_export(request, f"All party balance {EXPORT_ACTIONS[action]}")
+
+        # Build rows/totals (same data used by all actions)
+        ctx = self._build_context(start=today, end=today, party=None)
+
+        # Balance -> show table in same template
+        if action == "balance" or not action:
+            ctx["show_table"] = True
+            return self.render_to_response(ctx)
+
+        # Print -> render printable HTML (no buttons)
+        if action == "print":
+            ctx["show_table"] = True
+            return render(request, self.printable_template, ctx)
+
+        # Export Excel -> stream .xlsx (requires openpyxl)
+        if action == "export_excel":
+            Workbook, _ = load_openpyxl()
+            if Workbook is None:
+                return HttpResponse(
+                    "Required package 'openpyxl' not installed. Install with: pip install openpyxl",
+                    content_type="text/plain",
+                    status=500
+                )
+            headers = ["Party", "Op Dr", "Op Cr", "Opening", "Sale", "Purchase", "Naame", "Jama", "Balance"]
+            rows = (
+                [
+                    getattr(r["party"], "partyname", str(r["party"])),
+                    float(r["op_dr"]), float(r["op_cr"]),
+                    float(r["opening"]), float(r["sale"]),
+                    float(r["purchase"]), float(r["naame"]),
+                    float(r["jama"]), float(r["balance"])
+                ]
+                for r in ctx["rows"]
+            )
+            return _balance_export(
+                request, "all_party_balance_xlsx", f"all_party_balance_{today}.xlsx", exporters.XLSX_CONTENT_TYPE,
+                today, lambda fh: exporters.write_xlsx(fh, headers, rows, title="All Party Balance"),
+            )
+
+        # PDF -> generate using fpdf2
+        if action == "pdf":
+            return _balance_pdf(request, "all_party_balance_pdf", f"all_party_balance_{today}.pdf",
+                                "All Party Balance", "Party", "partyname", ctx, today)
+
+        # Unknown action -> render without table
+        ctx["show_table"] = False
+        return self.render_to_response(ctx)
+
+    # ---------- core calculation ----------
+    @cachetags.cached(
+        "all_party_balance",
+        tags=lambda self, *a, **kw: cachetags.org_tags(
+        self.request.session.get("org_id"), "sales", "purchases", "daily", "masters"),
+        key=lambda self, start, end, party: (self.request.session.get("org_id"), start, end, party),
+    )
+    def _build_context(self, start, end, party):
+        # parties
+        parties = HeadParty.objects.all().order_by("partyname")
+        if party:
+            parties = parties.filter(partyname=party.partyname)
+
+        org_id = self.request.session.get("org_id")
+        if org_id:
+            parties = parties.filter(org_id=org_id)
+        return _balances(parties, "party", start, end, org_id)
+
+
+class PartyStatementView(TemplateView):
+    """
+    Single URL Party Statement view. Buttons POST with name="action":
+     - statement      : show table
+     - print          : render printable HTML
+     - export_excel   : return .xlsx
+     - pdf            : return PDF (fpdf)
+    """
+    template_name = "brokerapp/account/party_statement.html"
+    printable_template = "brokerapp/account/party_statement_printable.html"
+
+    def get(self, request, *args, **kwargs):
+        parties = masterdata.get_parties(request.current_org)
+        ctx = {
+            "parties": parties,
+            "selected": None,
+            "entries": [],
+            "total_debit": Decimal("0"),
+            "total_credit": Decimal("0"),
+            "balance": Decimal("0"),
+        }
+        return self.render_to_response(ctx)
+
+    def post(self, request, *args, **kwargs):
+        """
+        Process POST actions. Always returns an HttpResponse.
+        """
+        action = request.POST.get("action")
+        # handle both header POST (party in POST) or fallback to GET param
+        party_id = request.POST.get("party") or request.GET.get("party")
+        parties = masterdata.get_parties(request.current_org)
+
+        # if no party selected and action requires party -> show page with message
+        if not party_id:
+            # For actions that do not require a party, still return page (here all require a party)
+            ctx = {
+                "parties": parties,
+                "selected": None,
+                "entries": [],
+                "total_debit": Decimal("0"),
+                "total_credit": Decimal("0"),
+                "balance": Decimal("0"),
+            }
+            return self.render_to_response(ctx)
+
+        # load party and compute entries
+        head = get_object_or_404(HeadParty, pk=party_id)
+
+        if action in EXPORT_ACTIONS and _wants_background(request):
+            return _enqueue_view_export(request, f"Party statement {head.pk} {EXPORT_ACTIONS[action]}")
+
+        # ---------- excel (streamed, never loads the whole statement) ----------
+        if action == "export_excel":
+            safe_name = "".join(ch if ord(ch) < 128 else "?" for ch in head.partyname)[:40]
+            return _statement_xlsx(request, "party_statement_xlsx", head, [cachetags.party_tag(head)],
+                                   f"party_statement_{safe_name}.xlsx", "Party Statement", self._iter_entries(head))
+
+        # pdf (cached render; the statement is only built when the data changed)
+        if action == "pdf":
+            safe_name = "".join(ch if ord(ch) < 128 else "?" for ch in head.partyname)[:40]
+            return _statement_pdf(request, "party_statement_pdf", head, [cachetags.party_tag(head)],
+                                  f"party_statement_{safe_name}.pdf", f"Party Statement - {head.partyname}",
+                                  lambda: self._build_entries(head))
+
+        entries, total_debit, total_credit, balance = self._build_entries(head)
+
+        ctx = {
+            "parties": parties,
+            "selected": head,
+            "entries": entries,
+            "total_debit": total_debit,
+            "total_credit": total_credit,
+            "balance": balance,
+            "today": date.today(),
+        }
+
+        # ---------- show statement ----------
+        if action in (None, "statement"):
+            return self.render_to_response(ctx)
+
+        # ---------- printable ----------
+        if action == "print":
+            return render(request, self.printable_template, ctx)
+
+        # fallback: ensure a response always returned
+        return self.render_to_response(ctx)
+
+    # ---------- helper ----------
+    @cachetags.cached("party_statement", tags=lambda self, head: [cachetags.party_tag(head)],
+                      key=lambda self, head: (head.pk,))
+    def _build_entries(self, head):
+        entries = list(self._iter_entries(head))
+        total_debit = sum(e["debit"] for e in entries)
+        total_credit = sum(e["credit"] for e in entries)
+        balance = total_debit - total_credit
+        return entries, total_debit, total_credit, balance
+
+    def _iter_entries(self, head):
+        """
+        Statement lines in date order with running balance, streamed: each
+        source is read with .iterator() in date order and merged, so a long
+        statement never sits in memory. The opening line (no date) comes last.
+        """
+        sales = (
+            {"entry_no": no, "date": d, "debit": amt, "credit": Decimal("0"),
+             "remark": remark or f"Sale Inv#{no}"}
+            for no, d, amt, remark in SaleMaster.objects.filter(party=head)
+            .order_by("invdate", "invno").values_list("invno", "invdate", "netamt", "remark")
+            .iterator(chunk_size=STATEMENT_CHUNK_SIZE)
+        )
+        purchases = (
+            {"entry_no": no, "date": d, "debit": Decimal("0"), "credit": amt,
+             "remark": remark or f"Purchase Inv#{no}"}
+            for no, d, amt, remark in PurchaseMaster.objects.filter(party=head)
+            .order_by("invdate", "invno").values_list("invno", "invdate", "netamt", "remark")
+            .iterator(chunk_size=STATEMENT_CHUNK_SIZE)
+        )
+        naame = (
+            {"entry_no": no, "date": d, "debit": amt, "credit": Decimal("0"), "remark": remark or "Naame"}
+            for no, d, amt, remark in NaameEntry.objects.filter(party=head)
+            .order_by("daily_page__date", "entry_no")
+            .values_list("entry_no", "daily_page__date", "amount", "remark")
+            .iterator(chunk_size=STATEMENT_CHUNK_SIZE)
+        )
+        jama = (
+            {"entry_no": no, "date": d, "debit": Decimal("0"), "credit": amt, "remark": remark or "Jama"}
+            for no, d, amt, remark in JamaEntry.objects.filter(party=head)
+            .order_by("daily_page__date", "entry_no")
+            .values_list("entry_no", "daily_page__date", "amount", "remark")
+            .iterator(chunk_size=STATEMENT_CHUNK_SIZE)
+        )
+
+        opening = []
+        if getattr(head, "openingdebit", None) and head.openingdebit != Decimal("0"):
+            opening.append({"entry_no": "OPEN", "date": None,
+                            "debit": head.openingdebit, "credit": Decimal("0"),
+                            "remark": "Opening (Dr)"})
+        elif getattr(head, "openingcredit", None) and head.openingcredit != Decimal("0"):
+            opening.append({"entry_no": "OPEN", "date": None,
+                            "debit": Decimal("0"), "credit": head.openingcredit,
+                            "remark": "Opening (Cr)"})
+
+        # heapq.merge keeps source order for equal dates (sale, purchase, naame, jama)
+        merged = heapq.merge(sales, purchases, naame, jama, key=lambda e: e["date"])
+        return _with_balance(chain(merged, opening))
+
+
+class BrokerStatementView(TemplateView):
+    """
+    Single-URL Broker Statement view. POST name="action":
+      - statement
+      - print
+      - export_excel
+      - pdf
+    """
+    template_name = "brokerapp/account/broker_statement.html"
+    printable_template = "brokerapp/account/broker_statement_printable.html"
+
+    def get(self, request, *args, **kwargs):
+        brokers = masterdata.get_brokers(request.current_org)
+        ctx = {
+            "brokers": brokers,
+            "selected": None,
+            "entries": [],
+            "total_debit": Decimal("0"),
+            "total_credit": Decimal("0"),
+            "balance": Decimal("0"),
+        }
+        return self.render_to_response(ctx)
+
+    def post(self, request, *args, **kwargs):
+        action = request.POST.get("action")
+        broker_id = request.POST.get("broker") or request.GET.get("broker")
+        brokers = masterdata.get_brokers(request.current_org)
+
+        if not broker_id:
+            ctx = {
+                "brokers": brokers,
+                "selected": None,
+                "entries": [],
+                "total_debit": Decimal("0"),
+                "total_credit": Decimal("0"),
+                "balance": Decimal("0"),
+            }
+            return self.render_to_response(ctx)
+
+        selected = get_object_or_404(Broker, pk=broker_id)
+
+        if action in EXPORT_ACTIONS and _wants_background(request):
+            return _enqueue_view_export(request, f"Broker statement {selected.pk} {EXPORT_ACTIONS[action]}")
+
+        # excel export (streamed, never loads the whole statement)
+        if action == "export_excel":
+            safe_name = "".join(ch if ord(ch) < 128 else "?" for ch in selected.brokername)[:40]
+            return _statement_xlsx(request, "broker_statement_xlsx", selected, [cachetags.broker_tag(selected)],
+                                   f"broker_statement_{safe_name}.xlsx", "Broker Statement", self._iter_entries(selected))
+
+        # pdf (cached render; the statement is only built when the data changed)
+        if action == "pdf":
+            safe_name = "".join(ch if ord(ch) < 128 else "?" for ch in selected.brokername)[:40]
+            return _statement_pdf(request, "broker_statement_pdf", selected, [cachetags.broker_tag(selected)],
+                                  f"broker_statement_{safe_name}.pdf", f"Broker Statement - {selected.brokername}",
+                                  lambda: self._build_entries(selected))
+
+        entries, total_debit, total_credit, balance = self._build_entries(selected)
+
+        ctx = {
+            "brokers": brokers,
+            "selected": selected,
+            "entries": entries,
+            "total_debit": total_debit,
+            "total_credit": total_credit,
+            "balance": balance,
+            "today": date.today(),
+        }
+
+        # show statement in page
+        if action in (None, "statement"):
+            return self.render_to_response(ctx)
+
+        # printable HTML
+        if action == "print":
+            return render(request, self.printable_template, ctx)
+
+        # fallback
+        return self.render_to_response(ctx)
+
+    @cachetags.cached("broker_statement", tags=lambda self, selected: [cachetags.broker_tag(selected)],
+                      key=lambda self, selected: (selected.pk,))
+    def _build_entries(self, selected):
+        entries = list(self._iter_entries(selected))
+        total_debit = sum(e["debit"] for e in entries) if entries else Decimal("0")
+        total_credit = sum(e["credit"] for e in entries) if entries else Decimal("0")
+        balance = entries[-1]["balance"] if entries else Decimal("0")
+        return entries, total_debit, total_credit, balance
+
+    def _iter_entries(self, selected):
+        """
+        Statement lines ordered by (date, entry_no) with running balance,
+        streamed from .iterator() querysets and merged (see PartyStatementView).
+        Jama / naame are dated by created_at, sales / purchases use dramt.
+        """
+        def entry_key(e):
+            return (e["date"] is None, e["date"] or date.max, e.get("entry_no", ""))
+
+        def stream(qs, fields, prefix, side, label):
+            rows = (
+                {
+                    "entry_no": f"{prefix}-{no}",
+                    "date": d.date() if isinstance(d, datetime) else d,
+                    "debit": Decimal(str(amt or 0)) if side == "debit" else Decimal("0"),
+                    "credit": Decimal(str(amt or 0)) if side == "credit" else Decimal("0"),
+                    "remark": (remark or "") + f" ({label})",
+                }
+                for no, d, amt, remark in qs.values_list(*fields).iterator(chunk_size=STATEMENT_CHUNK_SIZE)
+            )
+            # the query orders by date only; entry_no order is settled day by day
+            return _day_sorted(rows, entry_key)
+
+        jama = stream(JamaEntry.objects.filter(broker=selected).order_by("created_at"),
+                      ("entry_no", "created_at", "amount", "remark"), "J", "credit", "Jama")
+        naame = stream(NaameEntry.objects.filter(broker=selected).order_by("created_at"),
+                       ("entry_no", "created_at", "amount", "remark"), "N", "debit", "Naame")
+        sales = stream(SaleMaster.objects.filter(broker=selected).order_by("invdate"),
+                       ("invno", "invdate", "dramt", "remark"), "S", "debit", "Sale")
+        purchases = stream(PurchaseMaster.objects.filter(broker=selected).order_by("invdate"),
+                           ("invno", "invdate", "dramt", "remark"), "P", "credit", "Purchase")
+
+        return _with_balance(heapq.merge(jama, naame, sales, purchases, key=entry_key))
+
+
+# --- AllBrokerBalanceView ---
+class AllBrokerBalanceView(TemplateView):
+    """
+    Broker version of All Party Balance.
+    Supports POST actions via buttons with name="action":
+      - balance       : show table in page
+      - print         : render printable HTML (user can browser-print)
+      - export_excel  : return .xlsx (requires openpyxl)
+      - pdf           : return PDF generated with fpdf2 (if installed)
+    """
+    template_name = "brokerapp/account/all_broker_balance.html"
+    printable_template = "brokerapp/account/all_broker_balance_printable.html"
+
+    # ---------- GET ----------
+    def get(self, request, *args, **kwargs):
+        today = date.today()
+        ctx = self._build_context(start=today, end=today, broker=None)
+        ctx["show_table"] = False
+        return self.render_to_response(ctx)
+
+    # ---------- POST ----------
+    def post(self, request, *args, **kwargs):
+        action = request.POST.get("action")
+        today = date.today()
+
+        if action in EXPORT_ACTIONS and _wants_background(request):
+            return _enqueue_view_export(request, f"All broker balance {EXPORT_ACTIONS[action]}")
+
+        # Build rows/totals (same data used by all actions)
+        ctx = self._build_context(start=today, end=today, broker=None)
+
+        # Balance -> show table in same template
+        if action == "balance" or not action:
+            ctx["show_table"] = True
+            return self.render_to_response(ctx)
+
+        # Print -> render printable HTML (no buttons)
+        if action == "print":
+            ctx["show_table"] = True
+            return render(request, self.printable_template, ctx)
+
+        # Export Excel -> stream .xlsx (requires openpyxl)
+        if action == "export_excel":
+            Workbook, _ = load_openpyxl()
+            if Workbook is None:
+                return HttpResponse(
+                    "Required package 'openpyxl' not installed. Install with: pip install openpyxl",
+                    content_type="text/plain",
+                    status=500
+                )
+            headers = ["Broker", "Op Dr", "Op Cr", "Opening", "Sale", "Purchase", "Naame", "Jama", "Balance"]
+            rows = (
+                [
+                    getattr(r["broker"], "brokername", str(r["broker"])),
+                    float(r["op_dr"]), float(r["op_cr"]),
+                    float(r["opening"]), float(r["sale"]),
+                    float(r["purchase"]), float(r["naame"]),
+                    float(r["jama"]), float(r["balance"])
+                ]
+                for r in ctx["rows"]
+            )
+            return _balance_export(
+                request, "all_broker_balance_xlsx", f"all_broker_balance_{today}.xlsx", exporters.XLSX_CONTENT_TYPE,
+                today, lambda fh: exporters.write_xlsx(fh, headers, rows, title="All Broker Balance"),
+            )
+
+        # PDF -> generate using fpdf2
+        if action == "pdf":
+            return _balance_pdf(request, "all_broker_balance_pdf", f"all_broker_balance_{today}.pdf",
+                                "All Broker Balance", "Broker", "brokername", ctx, today)
+
+        # Unknown action -> render without table
+        ctx["show_table"] = False
+        return self.render_to_response(ctx)
+
+    # ---------- core calculation ----------
+    @cachetags.cached(
+        "all_broker_balance",
+        tags=lambda self, *a, **kw: cachetags.org_tags(
+        self.request.session.get("org_id"), "sales", "purchases", "daily", "masters"),
+        key=lambda self, start, end, broker: (self.request.session.get("org_id"), start, end, broker),
+    )
+    def _build_context(self, start, end, broker):
+        # brokers
+        brokers = Broker.objects.all().order_by("brokername")
+        if broker:
+            brokers = brokers.filter(brokername=broker.brokername)
+
+        org_id = self.request.session.get("org_id")
+        if org_id:
+            brokers = brokers.filter(org_id=org_id)
+        return _balances(brokers, "broker", start, end, org_id)
@@ -0,0 +1,68 @@
+# brokerapp/views/common.py
+"""Shared view helpers and lazy loaders for the document libraries."""
+from decimal import Decimal, InvalidOperation
+from itertools import groupby
+
+
+def load_fpdf():
+    """fpdf2's FPDF class, imported on first use (None if fpdf2 is not installed)."""
+    try:
+        from fpdf import FPDF
+    except ImportError:
+        return None
+    return FPDF
+
+
+def load_openpyxl():
+    """(Workbook, get_column_letter) from openpyxl, imported on first use; (None, None) if missing."""
+    try:
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
+    except ImportError:
+        return None, None
+    return Workbook, get_column_letter
+
+
+
+def to_decimal(val, default=Decimal('0')):
+    """Safe conversion to Decimal."""
+    try:
+        return Decimal(str(val))
+    except (InvalidOperation, TypeError, ValueError):
+        return default
+
+
+# invoice header amounts summed per report group (as total_<field>)
+REPORT_TOTAL_FIELDS = ("totalamt", "batavamt", "dramt", "other", "total", "advance", "netamt")
+
+
+def group_invoices(invoices, report_type):
+    """
+    Sale / purchase report groups of date-ordered `invoices`: by "date" or by
+    "broker" (date + broker); [] for other report types. Each group is
+    {"group": label, "items": its invoices, "totals": ...}, the totals holding
+    the group's invdate (and broker__brokername) and total_<field> for each
+    REPORT_TOTAL_FIELDS — summed over the rows already read, not queried per group.
+    """
+    if report_type == "date":
+        def key(inv):
+            return (inv.invdate,)
+    elif report_type == "broker":
+        invoices = sorted(invoices, key=lambda inv: (inv.invdate, inv.broker_id))
+
+        def key(inv):
+            return (inv.invdate, inv.broker_id)
+    else:
+        return []
+
+    groups = []
+    for values, rows in groupby(invoices, key=key):
+        rows = list(rows)
+        totals = {"invdate": values[0]}
+        if report_type == "broker":
+            totals["broker__brokername"] = values[1]
+        for field in REPORT_TOTAL_FIELDS:
+            totals[f"total_{field}"] = sum((getattr(inv, field) for inv in rows), Decimal("0"))
+        label = values[0] if report_type == "date" else f"{values[0]} - {values[1] or 'No Broker'}"
+        groups.append({"group": label, "items": rows, "totals": totals})
+    return groups
@@ -0,0 +1,96 @@
+# brokerapp/views/core.py
+"""Dashboard, health check, org switch, global search and the JSON lookups used by the entry forms."""
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.shortcuts import redirect, render
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_GET, require_POST
+
+from brokerapp import globalsearch, masterdata, typeahead
+from brokerapp.orgs import get_org, get_owned_org_ids
+
+
+@login_required
+def dashboard(request):
+    return render(request, 'brokerapp/dashboard.html')
+
+
+@login_required
+@require_GET
+def global_search(request):
+    """?q= across invoices, daily entries and masters of the current org (see brokerapp.globalsearch)."""
+    q = request.GET.get('q', '').strip()
+    hits = globalsearch.search(request.current_org, q) if q else []
+    return render(request, 'brokerapp/global_search.html', {
+        'q': q,
+        'hits': hits,
+        'max_results': globalsearch.MAX_RESULTS,
+    })
+
+
+@require_GET
+def healthz(request):
+    """Liveness probe: no org lookup (see ORG_EXEMPT_PATHS), no database access."""
+    return JsonResponse({'status': 'ok'})
+
+
+@login_required
+@require_POST
+def switch_org(request):
+    """Multi-org mode: remember the chosen org (must be owned, or superuser) in the session."""
+    org_id = request.POST.get('org_id')
+    try:
+        org_id = int(org_id)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Invalid org'}, status=400)
+
+    if not (request.user.is_superuser or org_id in get_owned_org_ids(request.user.pk)) or get_org(org_id) is None:
+        return JsonResponse({'error': 'Organization not available'}, status=403)
+
+    request.session['org_id'] = org_id
+    next_url = request.POST.get('next')
+    if not url_has_allowed_host_and_scheme(next_url, {request.get_host()}, request.is_secure()):
+        next_url = 'dashboard'  # missing or off-site
+    return redirect(next_url)
+
+
+@login_required
+@require_GET
+def masterdata_json(request):
+    """
+    Versioned party/broker/item blob for the browser (see static/js/masterdata.js).
+    ?v=<current version> is immutable and may be cached by the browser for good;
+    otherwise the ETag lets it revalidate cheaply.
+    """
+    org = request.current_org
+    version = masterdata.get_version(org)
+    etag = f'"md-{org.pk}-{version}"'
+    if request.headers.get('If-None-Match') == etag:
+        resp = HttpResponseNotModified()
+    else:
+        resp = JsonResponse(masterdata.get_blob(org))
+    resp['ETag'] = etag
+    if request.GET.get('v') == str(version):
+        resp['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        resp['Cache-Control'] = 'private, no-cache'
+    return resp
+
+
+@login_required
+@require_GET
+def typeahead_view(request, kind):
+    """
+    JSON autocomplete: ?q=<text>&limit=<n> for kind = party | broker | item.
+    Prefix + substring match on name (and city/mobile for parties); the user's
+    recent picks rank first. Empty q returns just the recent picks.
+    """
+    if kind not in typeahead.SOURCES:
+        raise Http404("Unknown lookup")
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        limit = 10
+    results = typeahead.search(request.current_org, kind, request.GET.get('q', ''),
+                               user=request.user, limit=limit)
+    return JsonResponse({'results': results})
@@ -0,0 +1,267 @@
+# brokerapp/views/daily_page.py
+"""Daily page (jama / naame) screen and its JSON endpoints."""
+from datetime import datetime
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404, render
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+
+from brokerapp import daybook, masterdata, typeahead
+from brokerapp.models import Broker, DailyPage, HeadParty, JamaEntry, NaameEntry
+
+
+@require_GET
+
+def daily_page_view(request):
+    """
+    Show daily page for selected date (via ?date=YYYY-MM-DD) scoped to current org.
+    If no date provided, default to today.
+    """
+    date_str = request.GET.get('date', '').strip()
+    if date_str:
+        try:
+            selected_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            selected_date = timezone.localdate()
+    else:
+        selected_date = timezone.localdate()
+
+    # DailyPage for current org + selected date
+    daily_page = DailyPage.objects.filter(
+        org=request.current_org,
+        date=selected_date
+    ).first()
+
+    def serialize_entry(e):
+        broker_name = getattr(e.broker, 'brokername', '') if getattr(e, 'broker', None) else ''
+        party_name = getattr(e.party, 'partyname', '') if getattr(e, 'party', None) else ''
+        return {
+            'entry_no': e.entry_no,
+            'party_name': party_name,
+            'broker_name': broker_name,
+            'amount': e.amount,
+            'remark': e.remark,
+        }
+
+    jama_entries = []
+    naame_entries = []
+
+    if daily_page:
+        jama_entries = [serialize_entry(j) for j in daily_page.jama_entries.select_related('party', 'broker')]
+        naame_entries = [serialize_entry(n) for n in daily_page.naame_entries.select_related('party', 'broker')]
+
+    no_entries = not (jama_entries or naame_entries)
+    # stored running position; a day without a page opens at the last page's closing
+    opening = daily_page.opening_balance if daily_page else daybook.balance_before(request.current_org, selected_date)
+
+    context = {
+        'selected_date': selected_date,
+        'opening_balance': opening,
+        # party/broker options are filled client-side from the cached master-data blob
+        'masterdata_version': masterdata.get_version(request.current_org),
+        'jama_entries': jama_entries,
+        'naame_entries': naame_entries,
+        'no_entries': no_entries,
+    }
+    return render(request, 'brokerapp/daily_page.html', context)
+
+
+@require_GET
+def day_book(request):
+    """
+    Daily pages of a date range (?start_date=&end_date=, default: this month
+    so far), day after day with the difference carried forward.
+    """
+    today = timezone.localdate()
+    try:
+        start = datetime.strptime(request.GET.get('start_date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        start = today.replace(day=1)
+    try:
+        end = datetime.strptime(request.GET.get('end_date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        end = today
+    start, end = daybook.clamp_range(start, end)
+
+    days = daybook.load(request.current_org, start, end)
+    if days:
+        opening, closing = days[0].opening, days[-1].closing
+    else:
+        opening = closing = daybook.balance_before(request.current_org, start)
+
+    context = {
+        'start_date': start,
+        'end_date': end,
+        'days': days,
+        'opening': opening,
+        'closing': closing,
+        'total_jama': sum(d.total_jama for d in days),
+        'total_naame': sum(d.total_naame for d in days),
+        'max_days': daybook.MAX_DAYS,
+    }
+    return render(request, 'brokerapp/day_book.html', context)
+
+
+def _serialize_daily_entry(entry):
+    broker_name = getattr(entry.broker, 'brokername', '') if getattr(entry, 'broker', None) else ''
+    party_name = getattr(entry.party, 'partyname', '') if getattr(entry, 'party', None) else ''
+    return {
+        'entry_no': entry.entry_no,
+        'party_name': party_name,
+        'broker_name': broker_name,
+        'amount': float(entry.amount or 0),
+        'remark': entry.remark or '',
+        'created_at': entry.created_at.isoformat() if entry.created_at else None,
+    }
+
+
+@require_GET
+async def daily_page_show(request):
+    """
+    JSON endpoint: ?date=YYYY-MM-DD (optional; if missing -> today)
+    Response: { "date": "...", "jama": [...], "naame": [...], "opening_balance": ..., "closing_balance": ... }
+    """
+    d = request.GET.get('date', '').strip()
+
+    # default to today if missing or invalid
+    if not d:
+        date_obj = timezone.localdate()
+    else:
+        try:
+            date_obj = datetime.strptime(d, '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({'error': 'invalid date format, expected YYYY-MM-DD'}, status=400)
+
+    # ⬇️ scope to current org
+    daily_page = await DailyPage.objects.filter(org=request.current_org, date=date_obj).afirst()
+
+    jama = []
+    naame = []
+    if daily_page:
+        opening = daily_page.opening_balance
+    else:
+        opening = await sync_to_async(daybook.balance_before)(request.current_org, date_obj)
+    balances = {
+        'opening_balance': float(opening),
+        'closing_balance': float(daily_page.closing_balance if daily_page else opening),
+    }
+
+    if daily_page:
+        # party/broker joined in: lazy FK loads are not allowed in async code
+        jama = [_serialize_daily_entry(j) async for j in daily_page.jama_entries.select_related('party', 'broker')]
+        naame = [_serialize_daily_entry(n) async for n in daily_page.naame_entries.select_related('party', 'broker')]
+
+    if not jama and not naame:
+        return JsonResponse({
+            'date': date_obj.strftime('%Y-%m-%d'),
+            'message': 'No entry on that day',
+            'jama': [],
+            'naame': [],
+            **balances,
+        })
+
+    return JsonResponse({
+        'date': date_obj.strftime('%Y-%m-%d'),
+        'jama': jama,
+        'naame': naame,
+        **balances,
+    })
+
+
+# entry model -> apply_entry() argument
+_SIDES = {JamaEntry: 'jama', NaameEntry: 'naame'}
+
+
+def _create_daily_entry(model, org, user, date_obj, party, broker, amount, remark):
+    with transaction.atomic():
+        daybook.lock_balances(org)
+        # ⬇️ DailyPage is per (org, date)
+        daily_page = daybook.get_or_create_page(org, date_obj)
+        entry = model.objects.create(
+            daily_page=daily_page,
+            party=party,
+            broker=broker,
+            amount=amount,
+            remark=remark
+        )
+        daybook.apply_entry(daily_page, **{_SIDES[model]: amount})
+        typeahead.note_recent(user, org, party=party, broker=broker)
+    return entry
+
+
+async def _daily_entry_add(request, model):
+    # expects: date, party (pk), broker (pk), amount, remark (optional)
+    date_str = request.POST.get('date')
+    party_id = request.POST.get('party')
+    broker_id = request.POST.get('broker')
+    amount = request.POST.get('amount')
+    remark = (request.POST.get('remark') or '').strip()
+
+    if not (date_str and party_id and broker_id and amount):
+        return JsonResponse({'error': 'Missing fields'}, status=400)
+
+    try:
+        date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+        amt = Decimal(amount).quantize(Decimal('0.01'))
+        if not amt.is_finite():
+            raise ValueError(amount)
+    except Exception:
+        return JsonResponse({'error': 'Invalid input'}, status=400)
+
+    # ⬇️ Party/Broker must belong to current org
+    party = await aget_object_or_404(HeadParty, pk=party_id, org=request.current_org)
+    broker = await aget_object_or_404(Broker, pk=broker_id, org=request.current_org)
+    user = await request.auser()
+
+    entry = await sync_to_async(_create_daily_entry)(
+        model, request.current_org, user, date_obj, party, broker, amt, remark
+    )
+
+    data = {
+        'entry_no': entry.entry_no,
+        'party_name': party.partyname,
+        'broker_name': broker.brokername,
+        'amount': f"{entry.amount:.2f}",
+        'remark': entry.remark,
+    }
+    return JsonResponse({'success': True, 'entry': data})
+
+
+@require_POST
+async def daily_page_jama_add(request):
+    return await _daily_entry_add(request, JamaEntry)
+
+
+@require_POST
+async def daily_page_naame_add(request):
+    return await _daily_entry_add(request, NaameEntry)
+
+
+def _delete_daily_entry(model, org, entry):
+    with transaction.atomic():
+        daybook.lock_balances(org)
+        # the row may be gone already (double click): only a real delete moves the balances
+        if model.objects.filter(pk=entry.pk).delete()[0]:
+            daybook.apply_entry(entry.daily_page, **{_SIDES[model]: -entry.amount})
+
+
+async def _daily_entry_delete(request, model, entry_no):
+    entry = await aget_object_or_404(
+        model.objects.select_related('daily_page'), entry_no=entry_no, daily_page__org=request.current_org
+    )
+    await sync_to_async(_delete_daily_entry)(model, request.current_org, entry)
+    return JsonResponse({'success': True, 'entry_no': entry_no})
+
+
+@require_POST
+async def daily_page_jama_delete(request, entry_no):
+    return await _daily_entry_delete(request, JamaEntry, entry_no)
+
+
+@require_POST
+async def daily_page_naame_delete(request, entry_no):
+    return await _daily_entry_delete(request, NaameEntry, entry_no)
@@ -0,0 +1,436 @@
+# brokerapp/views/exports.py
+"""
+PDF exports (sale report, daily page / day book, batch invoice print), inline or via the
+background worker. Renders go through the artifact cache, so repeats with
+unchanged data reuse the file.
+"""
+from datetime import date
+from itertools import zip_longest
+
+from django.conf import settings
+from django.db.models import Prefetch, Sum
+from django.http import HttpResponse
+from django.utils.dateparse import parse_date
+
+from brokerapp import artifacts, cachetags, daybook, invoices, pdftable
+from brokerapp.models import DailyPage, JamaEntry, NaameEntry, SaleDetails, SaleMaster
+from .ops import _enqueue_export, _enqueue_view_export, _wants_background
+from .sales import _sale_report_queryset
+
+
+# ===================== PDF (FPDF) =====================
+def sale_report_pdf(request):
+    """
+    Generate Sale Report PDF (FPDF) using current filters.
+    With ?background=1 the render is queued for `manage.py run_worker` instead.
+    """
+    params = {
+        "start_date": request.GET.get("start_date") or date.today().strftime("%Y-%m-%d"),
+        "end_date": request.GET.get("end_date") or date.today().strftime("%Y-%m-%d"),
+        "broker_id": request.GET.get("broker"),
+        "report_type": request.GET.get("report_type", "date"),
+    }
+    if _wants_background(request):
+        return _enqueue_export(request, "sale_report_pdf", params)
+
+    org = request.current_org
+    today = date.today()
+    # the date is part of the key: it is printed on the document
+    return artifacts.serve(
+        request, "sale_report_pdf", org, {**params, "date": today}, _sale_report_tags(org),
+        f"sale_report_{params['start_date']}_{params['end_date']}.pdf", "application/pdf",
+        lambda fh: _render_sale_report_pdf(org, generated=today, **params).output(fh), inline=True,
+    )
+
+
+def sale_report_pdf_job(job):
+    """Job handler (see brokerapp.jobs.JOB_HANDLERS)."""
+    p = job.params
+    today = date.today()
+    _, path = artifacts.get_or_render(
+        "sale_report_pdf", job.org, {**p, "date": today}, _sale_report_tags(job.org), ".pdf",
+        lambda fh: _render_sale_report_pdf(job.org, generated=today, progress=job.set_progress, **p).output(fh),
+    )
+    return f"sale_report_{p['start_date']}_{p['end_date']}.pdf", "application/pdf", artifacts.copier(path)
+
+
+def _sale_report_tags(org):
+    return cachetags.org_tags(org, "sales", "masters")
+
+
+SALE_INVOICE_COLUMNS = [
+    pdftable.Column("Inv No", 20, "C"),
+    pdftable.Column("Date", 22, "C", pdftable.dmy),
+    pdftable.Column("Broker", 40),
+    pdftable.Column("Total", 22, "R", pdftable.money),
+    pdftable.Column("Batav", 22, "R", pdftable.money),
+    pdftable.Column("DR", 18, "R", pdftable.money),
+    pdftable.Column("Other", 18, "R", pdftable.money),
+    pdftable.Column("Adv", 18, "R", pdftable.money),
+    pdftable.Column("Net", 22, "R", pdftable.money),
+]
+
+SALE_DETAIL_COLUMNS = [
+    pdftable.Column("Item", 40),
+    pdftable.Column("Bora", 14, "R", pdftable.money),
+    pdftable.Column("TBWt", 14, "R", pdftable.money),
+    pdftable.Column("Qty", 12, "R", pdftable.money),
+    pdftable.Column("Rate", 14, "R", pdftable.money),
+    pdftable.Column("Amount", 20, "R", pdftable.money),
+    pdftable.Column("PWt", 14, "R", pdftable.money),
+    pdftable.Column("MWt", 14, "R", pdftable.money),
+    pdftable.Column("FrkWt", 12, "R", pdftable.money),
+    pdftable.Column("DWt", 12, "R", pdftable.money),
+    pdftable.Column("Lot", 12, "C"),
+]
+
+
+def _render_sale_report_pdf(org, start_date, end_date, broker_id=None, report_type="date", progress=None,
+                            generated=None):
+    """
+    Build the Sale Report PDF (an fpdf2 document).
+    Includes per-invoice detail rows with TBWt and FrkWt.
+    Numbers are right-aligned with thousand separators.
+    `progress`, if given, is called with a 0..100 percentage while rendering.
+    `generated` is the date printed as the generation date (default today).
+    """
+    generated = generated or date.today()
+    sales = (
+        _sale_report_queryset(org, start_date, end_date, broker_id)
+        .select_related("broker")
+        .prefetch_related(Prefetch("details", queryset=SaleDetails.objects.select_related("item")))
+        .order_by("invdate", "invno")
+    )
+
+    # group-key helpers (just for headings)
+    if report_type == "date":
+        def group_key(s): return (s.invdate,)
+    else:
+        def group_key(s): return (s.invdate, s.broker.brokername if s.broker else "")
+
+    pdf = pdftable.document(
+        "Sale Report",
+        f"From {start_date} To {end_date} | Generated on: {generated.strftime('%d-%m-%Y')}",
+        margin=12, title_size=12,
+    )
+    invoices = pdftable.Table(pdf, SALE_INVOICE_COLUMNS, header_fill=(230, 240, 255))
+    details = pdftable.Table(pdf, SALE_DETAIL_COLUMNS, row_height=6, font=(pdftable.FONT, "", 8),
+                             header_fill=(245, 245, 245))
+
+    current_group = None
+    invoices.header()
+
+    total_sales = sales.count() if progress else 0
+    for idx, s in enumerate(sales, start=1):
+        if progress and total_sales and idx % 50 == 0:
+            progress(idx * 95 // total_sales)
+        key = group_key(s)
+        if current_group is None or key != current_group:
+            # group band
+            if report_type == "date":
+                grp_txt = f"Group: {key[0].strftime('%d-%m-%Y')}"
+            else:
+                grp_txt = f"Group: {key[0].strftime('%d-%m-%Y')} - {key[1] or 'No Broker'}"
+            pdf.ln(2)
+            invoices.ensure_room(6 + 7 + 6 + 6)
+            pdf.set_font(pdftable.FONT, "B", 9)
+            pdf.set_fill_color(235, 235, 235)
+            pdf.cell(0, 6, pdftable.clean_text(pdf, grp_txt), new_x="LMARGIN", new_y="NEXT", fill=True)
+            current_group = key
+
+        # invoice row + its detail table (kept together with at least one line)
+        invoices.ensure_room(7 + 6 + 6)
+        invoices.row((str(s.invno), s.invdate, s.broker.brokername if s.broker else "",
+                      s.totalamt, s.batavamt, s.dramt, s.other, s.advance, s.netamt))
+        details.header()
+        details.rows(
+            (d.item.item_name or "", d.bora, d.tbwt, d.qty, d.rate, d.amount,
+             d.partywt, d.millwt, d.frkwt, d.diffwt, d.lotno or "")
+            for d in s.details.all()
+        )
+
+    # overall totals
+    overall = sales.aggregate(
+        total_totalamt=Sum("totalamt"),
+        total_batavamt=Sum("batavamt"),
+        total_dramt=Sum("dramt"),
+        total_other=Sum("other"),
+        total_advance=Sum("advance"),
+        total_netamt=Sum("netamt"),
+    )
+    overall_details = SaleDetails.objects.filter(salemaster__in=sales.order_by()).aggregate(
+        total_tbwt=Sum("tbwt"), total_frkwt=Sum("frkwt"),
+    )
+
+    fmt2 = pdftable.money
+    pdf.ln(2)
+    pdf.set_font(pdftable.FONT, "B", 10)
+    pdf.cell(0, 7, "Overall Totals", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font(pdftable.FONT, "", 9)
+    lines = [
+        f"Total Amt: {fmt2(overall['total_totalamt'])}",
+        f"Batav Amt: {fmt2(overall['total_batavamt'])}",
+        f"DR Amt: {fmt2(overall['total_dramt'])}",
+        f"Other: {fmt2(overall['total_other'])}",
+        f"Advance: {fmt2(overall['total_advance'])}",
+        f"Total TBWt: {fmt2(overall_details['total_tbwt'])}",
+        f"Total FrkWt: {fmt2(overall_details['total_frkwt'])}",
+        f"Net Amt: {fmt2(overall['total_netamt'])}",
+    ]
+    for line in lines:
+        pdf.cell(0, 6, line, new_x="LMARGIN", new_y="NEXT")
+
+    pdf.alias_nb_pages()
+    return pdf
+
+
+def sale_invoices_pdf(request):
+    """
+    Batch print: every sale invoice of ?date=, ?start_date=&end_date= or
+    ?from_invno=&to_invno= (optionally one ?broker=) as printable pages in one PDF.
+    """
+    try:
+        params = _invoice_print_params(request.GET)
+    except ValueError as exc:
+        return HttpResponse(str(exc), status=400)
+    if not params.keys() - {"broker"}:
+        return HttpResponse("Give a date, a date range or an invoice number range.", status=400)
+    if _wants_background(request):
+        return _enqueue_view_export(request, "Sale invoices PDF")
+
+    org = request.current_org
+    sales = _invoice_print_queryset(org, params)
+    if not sales.exists():
+        return HttpResponse("No invoices match.", status=404)
+
+    span = [params.get(k) for k in ("date", "start_date", "end_date", "from_invno", "to_invno") if params.get(k)]
+    return artifacts.serve(
+        request, "sale_invoices_pdf", org, params, _sale_report_tags(org),
+        f"sale_invoices_{'_'.join(span)}.pdf", "application/pdf",
+        lambda fh: invoices.write_pdf(invoices.load(sales), fh, workers=settings.INVOICE_PRINT_WORKERS),
+        inline=True,
+    )
+
+
+def _invoice_print_params(query):
+    """Validated selection of sale_invoices_pdf (strings, empty values dropped); ValueError if malformed."""
+    params = {}
+    for key in ("date", "start_date", "end_date"):
+        if query.get(key):
+            if parse_date(query[key]) is None:
+                raise ValueError(f"{key} must be a date (YYYY-MM-DD).")
+            params[key] = query[key]
+    for key in ("from_invno", "to_invno"):
+        if query.get(key):
+            if not query[key].isdigit():
+                raise ValueError(f"{key} must be an invoice number.")
+            params[key] = query[key]
+    if query.get("broker") and query["broker"] != "all":
+        params["broker"] = query["broker"]
+    return params
+
+
+def _invoice_print_queryset(org, params):
+    sales = SaleMaster.objects.filter(org=org)
+    if "date" in params:
+        sales = sales.filter(invdate=params["date"])
+    if "start_date" in params:
+        sales = sales.filter(invdate__gte=params["start_date"])
+    if "end_date" in params:
+        sales = sales.filter(invdate__lte=params["end_date"])
+    if "from_invno" in params:
+        sales = sales.filter(invno__gte=int(params["from_invno"]))
+    if "to_invno" in params:
+        sales = sales.filter(invno__lte=int(params["to_invno"]))
+    if "broker" in params:
+        sales = sales.filter(broker_id=params["broker"])
+    return sales.order_by("invno")
+
+
+def daily_page_pdf(request):
+    """One daily page (?date=) or a day book (?start_date=&end_date=) as PDF."""
+    try:
+        params = _daily_pdf_params(request.GET)
+    except ValueError as exc:
+        return HttpResponse(str(exc), status=400)
+    if not params:
+        return HttpResponse("Date not provided", status=400)
+    if _wants_background(request):
+        return _enqueue_export(request, "daily_page_pdf", params)
+
+    org = request.current_org
+    return artifacts.serve(
+        request, "daily_page_pdf", org, params, _daily_page_tags(org),
+        _daily_pdf_filename(params), "application/pdf",
+        lambda fh: _render_daily_pdf(org, params).output(fh),
+    )
+
+
+def daily_page_pdf_job(job):
+    """Job handler (see brokerapp.jobs.JOB_HANDLERS)."""
+    params = job.params
+    _, path = artifacts.get_or_render(
+        "daily_page_pdf", job.org, params, _daily_page_tags(job.org), ".pdf",
+        lambda fh: _render_daily_pdf(job.org, params).output(fh),
+    )
+    return _daily_pdf_filename(params), "application/pdf", artifacts.copier(path)
+
+
+def _daily_pdf_params(query):
+    """{"date"} or {"start_date", "end_date"} (clamped to daybook.MAX_DAYS); {} if none given."""
+    if query.get("date"):
+        if parse_date(query["date"]) is None:
+            raise ValueError("date must be a date (YYYY-MM-DD).")
+        return {"date": query["date"]}
+    if query.get("start_date") or query.get("end_date"):
+        start = parse_date(query.get("start_date") or "")
+        end = parse_date(query.get("end_date") or "")
+        if start is None or end is None:
+            raise ValueError("start_date and end_date must both be dates (YYYY-MM-DD).")
+        start, end = daybook.clamp_range(start, end)
+        return {"start_date": start.isoformat(), "end_date": end.isoformat()}
+    return {}
+
+
+def _daily_pdf_filename(params):
+    if "date" in params:
+        return f"DailyReport_{params['date']}.pdf"
+    return f"DayBook_{params['start_date']}_{params['end_date']}.pdf"
+
+
+def _render_daily_pdf(org, params):
+    if "date" in params:
+        return _render_daily_page_pdf(org, params["date"])
+    return _render_day_book_pdf(org, parse_date(params["start_date"]), parse_date(params["end_date"]))
+
+
+def _daily_page_tags(org):
+    return cachetags.org_tags(org, "daily", "masters")
+
+
+DAILY_PANEL_COLUMNS = [
+    pdftable.Column("No", 10),
+    pdftable.Column("Party", 48, header_align="L"),
+    pdftable.Column("Broker", 38, header_align="L"),
+    pdftable.Column("Amount", 22, "R", pdftable.amount, header_align="R"),
+    pdftable.Column("Remark", 19, header_align="L"),
+]
+DAILY_PANEL_WIDTH = sum(c.width for c in DAILY_PANEL_COLUMNS)
+DAILY_PANEL_GAP = 8
+
+
+def _render_daily_page_pdf(org, date):
+    """
+    Build the two-panel (Jama / Naame) daily PDF for one date (an fpdf2
+    document). Both panels are one table, so they break pages together and
+    repeat their headers.
+    """
+    fields = ("entry_no", "party_id", "broker_id", "amount", "remark")
+    jama_entries = list(JamaEntry.objects.filter(daily_page__org=org, daily_page__date=date)
+                        .order_by('entry_no').values_list(*fields))
+    naame_entries = list(NaameEntry.objects.filter(daily_page__org=org, daily_page__date=date)
+                         .order_by('entry_no').values_list(*fields))
+
+    total_jama = sum(float(e[3] or 0) for e in jama_entries)
+    total_naame = sum(float(e[3] or 0) for e in naame_entries)
+    diff = total_jama - total_naame
+    # running position stored on the page (see daybook)
+    balances = (DailyPage.objects.filter(org=org, date=date)
+                .values_list("opening_balance", "closing_balance").first())
+    opening, closing = balances or (daybook.balance_before(org, date),) * 2
+
+    # --- PDF setup (landscape A4) ---
+    pdf = pdftable.document(f"Daily Report - {date}", orientation="L", margin=12)
+    left_x = 12
+    right_x = left_x + DAILY_PANEL_WIDTH + DAILY_PANEL_GAP
+
+    gap = [pdftable.Column(None, DAILY_PANEL_GAP)]
+    table = pdftable.Table(pdf, DAILY_PANEL_COLUMNS + gap + DAILY_PANEL_COLUMNS, x=left_x,
+                           row_height=8, font=(pdftable.FONT, "", 10), header_fill=None)
+
+    # panel titles
+    pdf.set_font(pdftable.FONT, "B", 12)
+    y = pdf.get_y()
+    pdf.set_xy(left_x, y)
+    pdf.cell(DAILY_PANEL_WIDTH, 6, "Jama")
+    pdf.set_xy(right_x, y)
+    pdf.cell(DAILY_PANEL_WIDTH, 6, "Naame")
+    pdf.set_xy(left_x, y + 6)
+
+    table.header()
+    empty = (pdftable.BLANK,) * len(DAILY_PANEL_COLUMNS)
+    for left, right in zip_longest(jama_entries, naame_entries):
+        table.row((left or empty) + (pdftable.BLANK,) + (right or empty))
+    table.row(("", "Total", "", total_jama, "", pdftable.BLANK, "", "Total", "", total_naame, ""), style="B")
+    pdf.ln(4)
+
+    # Summary line (below panels)
+    pdf.set_font(pdftable.FONT, "B", 12)
+    y = pdf.get_y()
+    pdf.set_xy(left_x, y)
+    pdf.cell(120, 8, f"Jama Total: {total_jama:.2f}")
+    pdf.set_xy(right_x, y)
+    pdf.cell(120, 8, f"Naame Total: {total_naame:.2f}")
+    pdf.ln(10)
+    y = pdf.get_y()
+    pdf.set_xy(left_x, y)
+    pdf.cell(120, 8, f"Opening: {opening:.2f}")
+    # Difference and closing, right-aligned to the page margin
+    diff_text = f"Difference (Jama - Naame): {diff:.2f}    Closing: {closing:.2f}"
+    text_width = pdf.get_string_width(diff_text) + 2
+    pdf.set_xy(pdf.w - 12 - text_width, y)
+    pdf.cell(text_width, 8, diff_text, align='R', new_x="LMARGIN", new_y="NEXT")
+    return pdf
+
+
+def _render_day_book_pdf(org, start, end):
+    """
+    The daily pages from `start` to `end` as one continuous document: per day
+    the brought-forward difference, the Jama / Naame panels with totals and
+    the difference carried forward to the next day.
+    """
+    days = daybook.load(org, start, end)
+    pdf = pdftable.document(f"Day Book - {pdftable.dmy(start)} to {pdftable.dmy(end)}",
+                            orientation="L", margin=12)
+    left_x = 12
+    right_x = left_x + DAILY_PANEL_WIDTH + DAILY_PANEL_GAP
+    page_right = pdf.w - 12
+
+    gap = [pdftable.Column(None, DAILY_PANEL_GAP)]
+    table = pdftable.Table(pdf, DAILY_PANEL_COLUMNS + gap + DAILY_PANEL_COLUMNS, x=left_x,
+                           row_height=7, font=(pdftable.FONT, "", 9), header_fill=None)
+    empty = (pdftable.BLANK,) * len(DAILY_PANEL_COLUMNS)
+
+    def line(left_text, right_text):
+        y = pdf.get_y()
+        pdf.set_xy(left_x, y)
+        pdf.cell(right_x - left_x, 7, left_text)
+        pdf.set_xy(right_x, y)
+        pdf.cell(page_right - right_x, 7, right_text, align="R", new_x="LMARGIN", new_y="NEXT")
+
+    for day in days:
+        # day heading + column titles + one row stay together
+        if pdf.will_page_break(7 + 2 * table.row_height):
+            pdf.add_page()
+        pdf.set_font(pdftable.FONT, "B", 11)
+        line(pdftable.dmy(day.date), f"Brought forward: {pdftable.money(day.opening)}")
+        table.header()
+        for left, right in zip_longest(day.jama, day.naame):
+            table.row((left or empty) + (pdftable.BLANK,) + (right or empty))
+        table.row(("", "Total", "", day.total_jama, "", pdftable.BLANK, "", "Total", "", day.total_naame, ""),
+                  style="B")
+        pdf.set_font(pdftable.FONT, "B", 10)
+        line(f"Difference: {pdftable.money(day.difference)}",
+             f"Carried forward: {pdftable.money(day.closing)}")
+        pdf.ln(3)
+
+    pdf.set_font(pdftable.FONT, "B", 11)
+    if not days:
+        pdf.cell(0, 8, "No entries in this period.", new_x="LMARGIN", new_y="NEXT")
+        return pdf
+    if pdf.will_page_break(16):
+        pdf.add_page()
+    line(f"Period Jama: {pdftable.money(sum(d.total_jama for d in days))}   "
+         f"Naame: {pdftable.money(sum(d.total_naame for d in days))}",
+         f"Opening: {pdftable.money(days[0].opening)}   Closing: {pdftable.money(days[-1].closing)}")
+    return pdf
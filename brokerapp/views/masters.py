@@ -0,0 +1,220 @@
+# brokerapp/views/masters.py
+"""Party / broker / item masters."""
+from urllib.parse import quote
+
+from django.contrib import messages
+from django.db.models import ProtectedError
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+
+from brokerapp import cachetags
+from brokerapp.forms import BrokerForm, ItemForm, PartyForm
+from brokerapp.models import Broker, HeadItem, HeadParty
+
+
+def party_view(request, pk=None):
+    # Only fetch inside current org
+    assert getattr(request, "current_org", None) is not None, "current_org missing"
+    instance = None
+    if pk:
+        instance = get_object_or_404(HeadParty, pk=pk, org=request.current_org)
+
+    if request.method == 'POST':
+        # ⬇️ current_org पास करें
+        form = PartyForm(request.POST, instance=instance, current_org=request.current_org)
+
+        if form.is_valid():
+            obj = form.save(commit=False)
+
+            # Ensure party always belongs to selected org
+            obj.org = request.current_org
+            obj.save()
+
+            if pk:
+                messages.success(request, '✅ Party updated successfully!')
+            else:
+                messages.success(request, '✅ Party added successfully!')
+
+            # ✅ Redirect logic simplified for Sale return
+            next_page = request.GET.get('next')
+            if next_page == 'sale':
+                # user came from Sale page → go back to Sale after saving
+                return redirect(reverse('sale_form_new'))
+            elif next_page == 'purchase':
+                return redirect(reverse('purchase_form_new'))
+            elif next_page == 'daily':
+                return redirect(reverse('daily_page'))
+
+            # Default: stay on Party list (existing behavior)
+            return redirect(f"{reverse('party')}?created_id={obj.pk}&created_name={quote(obj.partyname)}")
+
+    else:
+        # ⬇️ current_org पास करें
+        form = PartyForm(instance=instance, current_org=request.current_org)
+
+    # Show only current org parties
+    parties = HeadParty.objects.filter(org=request.current_org)
+
+    return render(request, 'brokerapp/party.html', {
+        'form': form,
+        'parties': parties,
+        'editing': pk is not None,
+        'editing_id': pk,
+        # list table is fragment-cached until the next party/broker/item write
+        'list_tags': cachetags.org_tags(request.current_org, "masters"),
+    })
+
+
+def party_delete(request, pk):
+    """Safely delete a Party — show message if linked to transactions."""
+    party = get_object_or_404(HeadParty, pk=pk)
+    party_name = party.partyname  # ✅ Save name before deleting
+    try:
+        party.delete()
+        messages.success(request, f"✅ Party '{party_name}' deleted successfully!")
+    except ProtectedError:
+        messages.error(
+            request,
+            f"⚠️ Cannot delete '{party_name}' — it is linked to existing Jama or other entries."
+        )
+    return redirect('party')
+
+
+def broker_view(request, pk=None):
+    # Only fetch inside current org (same as party_view)
+    assert getattr(request, "current_org", None) is not None, "current_org missing"
+    instance = None
+    if pk:
+        instance = get_object_or_404(Broker, pk=pk, org=request.current_org)
+
+    if request.method == 'POST':
+        # ⬇️ pass current_org into form
+        form = BrokerForm(request.POST, instance=instance, current_org=request.current_org)
+
+        if form.is_valid():
+            obj = form.save(commit=False)
+
+            # Ensure broker always belongs to selected org
+            obj.org = request.current_org
+            obj.save()
+
+            if pk:
+                messages.success(request, '✅ Broker updated successfully!')
+            else:
+                messages.success(request, '✅ Broker added successfully!')
+
+            # ✅ Redirect logic simplified for Sale return
+            next_page = request.GET.get('next')
+            if next_page == 'sale':
+                # user came from Sale page → go back to Sale after saving
+                return redirect(reverse('sale_form_new'))
+            elif next_page == 'purchase':
+                return redirect(reverse('purchase_form_new'))
+            elif next_page == 'daily':
+                return redirect(reverse('daily_page'))
+
+            # Default: stay on Broker list (existing behavior)
+            return redirect(f"{reverse('broker')}?created_id={obj.pk}&created_name={quote(obj.brokername)}")
+
+    else:
+        # ⬇️ pass current_org into form
+        form = BrokerForm(instance=instance, current_org=request.current_org)
+
+    # Show only current org brokers
+    brokers = Broker.objects.filter(org=request.current_org)
+
+    return render(request, 'brokerapp/broker.html', {
+        'form': form,
+        'brokers': brokers,
+        'editing': pk is not None,
+        'editing_id': pk
+    })
+
+
+# Delete Broker
+def broker_delete(request, pk):
+    """Safely delete a Broker — show warning if linked to transactions."""
+    broker = get_object_or_404(Broker, pk=pk)
+    broker_name = broker.brokername  # ✅ store name before delete
+
+    try:
+        broker.delete()
+        messages.success(request, f"✅ Broker '{broker_name}' deleted successfully!")
+    except ProtectedError:
+        messages.error(
+            request,
+            f"⚠️ Cannot delete '{broker_name}' — it is linked to existing Jama or Naame entries."
+        )
+
+    return redirect('broker')
+
+
+def item_view(request, pk=None):
+    # Only fetch inside current org (same as party_view / broker_view)
+    assert getattr(request, "current_org", None) is not None, "current_org missing"
+    instance = None
+    if pk:
+        instance = get_object_or_404(HeadItem, pk=pk, org=request.current_org)
+
+    if request.method == 'POST':
+        action = request.POST.get('action')
+
+        # ---- DELETE action ----
+        if action == 'delete':
+            # item_pk may be item_name (string PK) or provided via URL pk
+            item_pk = request.POST.get('item_pk') or pk
+            if not item_pk:
+                messages.error(request, '❌ No item selected to delete.')
+                return redirect(reverse('item'))
+
+            try:
+                obj_to_delete = get_object_or_404(HeadItem, pk=item_pk, org=request.current_org)
+                obj_to_delete.delete()
+                messages.success(request, '✅ Item deleted successfully!')
+            except Exception as e:
+                # catch FK/constraint errors or unexpected issues
+                messages.error(request, f'❌ Could not delete item: {e}')
+            return redirect(reverse('item'))
+
+        # ---- SAVE / CREATE / UPDATE ----
+        form = ItemForm(request.POST, instance=instance, current_org=request.current_org)
+
+        if form.is_valid():
+            obj = form.save(commit=False)
+            # Ensure item always belongs to selected org
+            obj.org = request.current_org
+            obj.save()
+
+            if pk:
+                messages.success(request, '✅ Item updated successfully!')
+            else:
+                messages.success(request, '✅ Item added successfully!')
+
+            # Redirect back to Sale if requested
+            next_page = request.GET.get('next')
+            if next_page == 'sale':
+                return redirect(reverse('sale_form_new'))
+            elif next_page == 'purchase':
+                return redirect(reverse('purchase_form_new'))
+            elif next_page == 'daily':
+                return redirect(reverse('daily_page'))
+
+            # Default: stay on Item list and pass created id/name for JS
+            return redirect(f"{reverse('item')}?created_id={obj.pk}&created_name={quote(obj.item_name)}")
+        else:
+            messages.error(request, f"❌ Could not save item:\n{form.errors.as_text()}")
+    else:
+        # pass current_org into form on GET as well
+        form = ItemForm(instance=instance, current_org=request.current_org)
+
+    # Show only current org items
+    items = HeadItem.objects.filter(org=request.current_org)
+
+    return render(request, 'brokerapp/item.html', {
+        'form': form,
+        'items': items,
+        'editing': pk is not None,
+        'editing_id': pk,
+        # list table is fragment-cached until the next party/broker/item write
+        'list_tags': cachetags.org_tags(request.current_org, "masters"),
+    })
@@ -0,0 +1,206 @@
+# brokerapp/views/ops.py
+"""Background exports (queueing, status pages, downloads) and staff-only runtime stats."""
+import os
+import re
+from urllib.parse import unquote
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.base import SessionBase
+from django.db import connections
+from django.http import FileResponse, Http404, HttpRequest, JsonResponse, QueryDict
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import resolve, reverse
+from django.views.decorators.http import require_GET
+
+from brokerapp import cachetags
+from brokerapp.jobs import enqueue, result_path
+from brokerapp.models import Job
+
+# request fields that must not be replayed by the worker
+_NOT_REPLAYED = ("background", "csrfmiddlewaretoken")
+
+# jobs shown on the exports page
+JOB_LIST_LIMIT = 50
+
+
+def _wants_background(request):
+    """True when an export was asked for with background=1 (query string or form)."""
+    value = request.POST.get("background") or request.GET.get("background")
+    return value in ("1", "true", "on", "yes")
+
+
+def _wants_json(request):
+    return (request.headers.get("x-requested-with") == "XMLHttpRequest"
+            or "application/json" in request.headers.get("accept", ""))
+
+
+def _enqueue_export(request, kind, params):
+    """
+    Queue a document render for the background worker. Scripts (XHR / Accept:
+    application/json) get 202 JSON with where to poll; browsers are sent to
+    the job's status page.
+    """
+    job = enqueue(kind, org=request.current_org, user=request.user, params=params)
+    if not _wants_json(request):
+        return redirect('job_detail', pk=job.pk)
+    return JsonResponse({
+        'job_id': job.pk,
+        'state': job.state,
+        'status_url': reverse('job_status', args=[job.pk]),
+        'download_url': reverse('job_download', args=[job.pk]),
+    }, status=202)
+
+
+def _querystring(querydict):
+    data = querydict.copy()
+    for name in _NOT_REPLAYED:
+        data.pop(name, None)
+    return data.urlencode()
+
+
+def _enqueue_view_export(request, label):
+    """
+    Queue the current request (an export action of a view) for the worker,
+    which calls the same view again and stores the file it returns
+    (see view_export_job). `label` names the job on the exports pages.
+    """
+    params = {
+        "label": label,
+        "path": request.path_info,
+        "method": request.method,
+        "query": _querystring(request.GET),
+        "data": _querystring(request.POST),
+        "session_org_id": request.session.get("org_id"),
+    }
+    return _enqueue_export(request, "view_export", params)
+
+
+def _response_filename(response):
+    disposition = response.get("Content-Disposition", "")
+    match = re.search(r"filename\*=utf-8''([^;]+)", disposition, re.I)
+    if match:
+        return unquote(match.group(1))
+    match = re.search(r'filename="([^"]+)"', disposition)
+    return match.group(1) if match else None
+
+
+def view_export_job(job):
+    """
+    Job handler (see brokerapp.jobs.JOB_HANDLERS): replay an export request
+    queued by _enqueue_view_export as the user who asked for it, and write the
+    file the view returns straight to the result file.
+    """
+    p = job.params
+    request = HttpRequest()
+    request.method = p["method"]
+    request.path = request.path_info = p["path"]
+    request.META["QUERY_STRING"] = p["query"]
+    request.GET = QueryDict(p["query"])
+    request.POST = QueryDict(p["data"])
+    request.user = job.created_by or AnonymousUser()
+    request.session = SessionBase()
+    if p.get("session_org_id"):
+        request.session["org_id"] = p["session_org_id"]
+    request.current_org = job.org
+
+    match = resolve(request.path_info)
+    response = match.func(request, *match.args, **match.kwargs)
+    filename = _response_filename(response)
+    if response.status_code != 200 or not filename:
+        response.close()
+        raise RuntimeError(f"{request.path} returned {response.status_code} "
+                           f"({response.get('Content-Type')}) instead of a file")
+
+    def write(fh):
+        try:
+            if response.streaming:
+                for chunk in response.streaming_content:
+                    fh.write(chunk)
+            else:
+                fh.write(response.content)
+        finally:
+            response.close()
+
+    return filename, response["Content-Type"], write
+
+
+@login_required
+@require_GET
+def job_list(request):
+    """The current org's recent background exports, newest first."""
+    jobs = Job.objects.filter(org=request.current_org).order_by('-id')[:JOB_LIST_LIMIT]
+    return render(request, 'brokerapp/jobs/job_list.html', {'jobs': jobs})
+
+
+@login_required
+@require_GET
+def job_detail(request, pk):
+    """Status page of one export; polls job_status until the file is ready."""
+    job = get_object_or_404(Job, pk=pk, org=request.current_org)
+    return render(request, 'brokerapp/jobs/job_detail.html', {'job': job})
+
+
+@login_required
+@require_GET
+def job_status(request, pk):
+    """JSON: state/progress of a queued export (scoped to current org)."""
+    job = get_object_or_404(Job, pk=pk, org=request.current_org)
+    data = {
+        'job_id': job.pk,
+        'kind': job.kind,
+        'label': job.label,
+        'state': job.state,
+        'progress': job.progress,
+        'attempts': job.attempts,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.state == Job.DONE:
+        data['expired'] = job.is_expired
+        data['expires_at'] = job.expires_at.isoformat()
+        if not job.is_expired:
+            data['download_url'] = reverse('job_download', args=[job.pk])
+            data['filename'] = job.result_name
+    elif job.state == Job.FAILED:
+        # last line of the traceback is enough for the UI
+        data['error'] = (job.error.strip().splitlines() or [''])[-1]
+    return JsonResponse(data)
+
+
+@login_required
+@require_GET
+def job_download(request, pk):
+    """Serve the finished file of a job."""
+    job = get_object_or_404(Job, pk=pk, org=request.current_org, state=Job.DONE)
+    path = result_path(job)
+    if path is None or job.is_expired or not path.exists():
+        raise Http404("Result file is no longer available.")
+    return FileResponse(open(path, 'rb'), as_attachment=True,
+                        filename=job.result_name, content_type=job.content_type)
+
+
+@staff_member_required
+@require_GET
+def cache_stats(request):
+    """Hit/miss counts per cache tag (brokerapp.cachetags), summed over all workers."""
+    return JsonResponse({"tags": cachetags.stats()})
+
+
+@staff_member_required
+@require_GET
+def db_pool_stats(request):
+    """
+    Connection pool counters of the worker process that served this request
+    (psycopg_pool get_stats(): pool_size, pool_available, requests_waiting ...).
+    """
+    databases = {}
+    for conn in connections.all():
+        pool = getattr(conn, "pool", None)  # only the PostgreSQL backend pools
+        databases[conn.alias] = {
+            "vendor": conn.vendor,
+            "pooled": pool is not None,
+            "stats": pool.get_stats() if pool is not None else None,
+        }
+    return JsonResponse({"pid": os.getpid(), "databases": databases})
@@ -0,0 +1,396 @@
+# brokerapp/views/purchases.py
+"""Purchase entry, list and report."""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.contrib import messages
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.dateparse import parse_date
+
+from brokerapp import exporters, invoicelist, keyset, linesearch, masterdata, typeahead
+from brokerapp.models import Broker, HeadItem, HeadParty, PurchaseDetails, PurchaseMaster
+from .common import REPORT_TOTAL_FIELDS, group_invoices, to_decimal
+from .ops import _enqueue_view_export, _wants_background
+
+
+def purchase_form(request, invno=None):
+    """
+    Render purchase form. If invno provided, load purchase + details (scoped to current org).
+    """
+    assert getattr(request, "current_org", None) is not None, "current_org missing"
+    purchase = None
+    purchase_items_json = "[]"
+    today_date = date.today().strftime("%Y-%m-%d")
+
+    if invno:
+        # must belong to current org
+        purchase = get_object_or_404(PurchaseMaster, invno=invno, org=request.current_org)
+        details = PurchaseDetails.objects.filter(purchasemaster=purchase)
+        items_data = []
+        for d in details:
+            items_data.append({
+                "item_id": d.item_id,
+                "item_name": d.item_id,  # item names are the primary key
+                "bora": float(d.bora),
+                "bn": float(d.bn),
+                "bnwt": float(d.bnwt),
+                "bo": float(d.bo),
+                "bowt": float(d.bowt),
+                "totalbora": float(d.bn*d.bnwt + d.bo*d.bowt),
+                "qty": float(d.qty),
+                "rate": float(d.rate),
+                "amt": float(d.amount),
+                "partywt": float(d.partywt),
+                "millwt": float(d.millwt),
+                "diffwt": float(d.diffwt),
+                "lotno": d.lotno or "",
+            })
+        purchase_items_json = json.dumps(items_data)
+
+    # next invoice number — per ORG
+    next_invno = PurchaseMaster.objects.filter(org=request.current_org).aggregate(Max("invno"))['invno__max']
+    next_invno = (next_invno + 1) if next_invno else 1
+
+    context = {
+        "purchase": purchase,
+        "purchase_items_json": purchase_items_json,
+        "next_invno": next_invno,
+        "today_date": today_date,
+        # party/broker/item options are filled client-side from the cached master-data blob
+        "masterdata_version": masterdata.get_version(request.current_org),
+    }
+    return render(request, "brokerapp/purchase.html", context)
+
+
+@transaction.atomic
+def save_purchase(request):
+    """
+    Save a new PurchaseMaster and its PurchaseDetails — scoped to current org.
+    """
+    assert getattr(request, "current_org", None) is not None, "current_org missing"
+    if request.method != "POST":
+        return redirect('purchase_form_new')
+
+    try:
+        # Header
+        invdate_str = request.POST.get("invdate")
+        invdate = datetime.strptime(invdate_str, "%Y-%m-%d").date() if invdate_str else date.today()
+        awakno = request.POST.get("awakno", "").strip()
+        extra = request.POST.get("extra", "").strip()
+        party_pk = request.POST.get("party")
+        broker_pk = request.POST.get("broker")
+        vehicleno = request.POST.get("vehicleno", "").strip()
+
+        # Items
+        items_json = request.POST.get("items_json") or "[]"
+        items = json.loads(items_json)
+        if not items:
+            messages.error(request, "Add at least one item before saving.")
+            return redirect("purchase_form_new")
+
+        # Totals
+        total_amt = Decimal('0')
+        for it in items:
+            total_amt += to_decimal(it.get("amt", 0))
+
+        batavpercent = to_decimal(request.POST.get("batavpercent", 0))
+        batavamt = (total_amt * batavpercent / Decimal('100')).quantize(Decimal('0.01'))
+
+        dr = to_decimal(request.POST.get("dr", 0))
+        dramt = (total_amt * dr / Decimal('100')).quantize(Decimal('0.01'))
+
+        qi = to_decimal(request.POST.get("qi", 0))
+        other = to_decimal(request.POST.get("other", 0))
+        advance = to_decimal(request.POST.get("advance", 0))
+        total = (total_amt - batavamt - dramt - qi - other).quantize(Decimal('0.01'))
+        netamt = (total - advance).quantize(Decimal('0.01'))
+
+        # Resolve FKs within same org
+        party = get_object_or_404(HeadParty, pk=party_pk, org=request.current_org)
+        broker = get_object_or_404(Broker, pk=broker_pk, org=request.current_org)
+
+        # Create master (bind org + created_by)
+        purchase = PurchaseMaster.objects.create(
+            org=request.current_org,
+            created_by=request.user,
+            invdate=invdate,
+            awakno=awakno,
+            party=party,
+            broker=broker,
+            vehicleno=vehicleno,
+            extra=extra,
+            totalamt=total_amt.quantize(Decimal('0.01')),
+            batavpercent=batavpercent,
+            batavamt=batavamt,
+            dr=dr,
+            dramt=dramt,
+            qi=qi,
+            other=other,
+            total=total,
+            advance=advance,
+            netamt=netamt,
+            remark=request.POST.get("remark", "").strip(),
+        )
+
+        # Create details (items only from same org)
+        for it in items:
+            item_id = it.get("item_id")
+            item_obj = get_object_or_404(HeadItem, pk=item_id, org=request.current_org)
+            PurchaseDetails.objects.create(
+                purchasemaster=purchase,
+                item=item_obj,
+                bora=to_decimal(it.get("bora", 0)),
+                bn=to_decimal(it.get("bn", 0)),
+                bnwt=to_decimal(it.get("bnwt", 0)),
+                bo=to_decimal(it.get("bo", 0)),
+                bowt=to_decimal(it.get("bowt", 0)),
+                qty=to_decimal(it.get("qty", 0)),
+                rate=to_decimal(it.get("rate", 0)),
+                amount=to_decimal(it.get("amt", 0)),
+                partywt=to_decimal(it.get("partywt", 0)),
+                millwt=to_decimal(it.get("millwt", 0)),
+                diffwt=to_decimal(it.get("diffwt", 0)),
+                lotno=it.get("lotno", "").strip(),
+            )
+
+        typeahead.note_recent(request.user, request.current_org, party=party, broker=broker,
+                              items=[it.get("item_id") for it in items])
+        messages.success(request, "Purchase entry saved successfully!")
+        return redirect("purchasedata")
+
+    except Exception as e:
+        messages.error(request, f"Error saving purchase: {e}")
+        return redirect("purchase_form_new")
+
+
+@transaction.atomic
+def update_purchase(request, invno):
+    """
+    Update existing PurchaseMaster (scoped to current org).
+    """
+    assert getattr(request, "current_org", None) is not None, "current_org missing"
+    purchase = get_object_or_404(PurchaseMaster, invno=invno, org=request.current_org)
+
+    if request.method != "POST":
+        return redirect('purchase_form_update', invno=invno)
+
+    try:
+        # Header
+        invdate_str = request.POST.get("invdate")
+        invdate = datetime.strptime(invdate_str, "%Y-%m-%d").date() if invdate_str else purchase.invdate
+        awakno = request.POST.get("awakno", "").strip()
+        extra = request.POST.get("extra", "").strip()
+        party_pk = request.POST.get("party")
+        broker_pk = request.POST.get("broker")
+        vehicleno = request.POST.get("vehicleno", "").strip()
+
+        # Items
+        items_json = request.POST.get("items_json") or "[]"
+        items = json.loads(items_json)
+        if not items:
+            messages.error(request, "Add at least one item before saving.")
+            return redirect("purchase_form_update", invno=invno)
+
+        # Totals
+        total_amt = Decimal('0')
+        for it in items:
+            total_amt += to_decimal(it.get("amt", 0))
+
+        batavpercent = to_decimal(request.POST.get("batavpercent", 0))
+        batavamt = (total_amt * batavpercent / Decimal('100')).quantize(Decimal('0.01'))
+
+        dr = to_decimal(request.POST.get("dr", 0))
+        dramt = (total_amt * dr / Decimal('100')).quantize(Decimal('0.01'))
+
+        qi = to_decimal(request.POST.get("qi", 0))
+        other = to_decimal(request.POST.get("other", 0))
+        advance = to_decimal(request.POST.get("advance", 0))
+        total = (total_amt - batavamt - dramt - qi - other).quantize(Decimal('0.01'))
+        netamt = (total - advance).quantize(Decimal('0.01'))
+
+        # Resolve FKs in same org
+        party = get_object_or_404(HeadParty, pk=party_pk, org=request.current_org)
+        broker = get_object_or_404(Broker, pk=broker_pk, org=request.current_org)
+
+        # Update master
+        purchase.invdate = invdate
+        purchase.awakno = awakno
+        purchase.extra = extra
+        purchase.party = party
+        purchase.broker = broker
+        purchase.vehicleno = vehicleno
+        purchase.totalamt = total_amt.quantize(Decimal('0.01'))
+        purchase.batavpercent = batavpercent
+        purchase.batavamt = batavamt
+        purchase.dr = dr
+        purchase.dramt = dramt
+        purchase.qi = qi
+        purchase.other = other
+        purchase.total = total
+        purchase.advance = advance
+        purchase.netamt = netamt
+        purchase.remark = request.POST.get("remark", "").strip()
+        purchase.save()
+
+        # Replace details
+        PurchaseDetails.objects.filter(purchasemaster=purchase).delete()
+        for it in items:
+            item_id = it.get("item_id")
+            item_obj = get_object_or_404(HeadItem, pk=item_id, org=request.current_org)
+            PurchaseDetails.objects.create(
+                purchasemaster=purchase,
+                item=item_obj,
+                bora=to_decimal(it.get("bora", 0)),
+                bn=to_decimal(it.get("bn", 0)),
+                bnwt=to_decimal(it.get("bnwt", 0)),
+                bo=to_decimal(it.get("bo", 0)),
+                bowt=to_decimal(it.get("bowt", 0)),
+                qty=to_decimal(it.get("qty", 0)),
+                rate=to_decimal(it.get("rate", 0)),
+                amount=to_decimal(it.get("amt", 0)),
+                partywt=to_decimal(it.get("partywt", 0)),
+                millwt=to_decimal(it.get("millwt", 0)),
+                diffwt=to_decimal(it.get("diffwt", 0)),
+                lotno=it.get("lotno", "").strip(),
+            )
+
+        typeahead.note_recent(request.user, request.current_org, party=party, broker=broker,
+                              items=[it.get("item_id") for it in items])
+        messages.success(request, "Purchase entry updated successfully!")
+        return redirect("purchasedata")
+
+    except Exception as e:
+        messages.error(request, f"Error updating purchase: {e}")
+        return redirect("purchase_form_update", invno=invno)
+
+
+def purchase_data_view(request):
+    """
+    Purchase list of the current org: filters (start_date, end_date, party,
+    broker, vehicle), ?sort= (see invoicelist.SORTS) and keyset pages
+    (?after= / ?before=). ?export=csv|tsv streams every filtered purchase.
+    """
+    assert getattr(request, "current_org", None) is not None, "current_org missing"
+    purchases, filters, sort = invoicelist.listing(PurchaseMaster, request.current_org, request.GET)
+    if exporters.requested_format(request):
+        if _wants_background(request):
+            return _enqueue_view_export(request, f"Purchase data {exporters.requested_format(request).upper()}")
+        rows = purchases.values_list("invno", "invdate", "party_id", "broker_id", "vehicleno", "netamt", "remark") \
+            .iterator(chunk_size=exporters.EXPORT_CHUNK_SIZE)
+        return exporters.table_response(
+            request, f"purchasedata_{date.today()}",
+            ["Invoice No", "Invoice Date", "Party Name", "Broker", "Vehicle No", "Amount", "Remark"], rows,
+        )
+    context = invoicelist.page_context(purchases, request.GET)
+    return render(request, "brokerapp/purchasedata.html", {
+        "purchases": context["page"].rows,
+        "filters": filters,
+        "sort": sort,
+        "today_date": date.today(),
+        **context,
+        # the party / broker filter options come from the browser's master-data copy
+        "masterdata_version": masterdata.get_version(request.current_org),
+    })
+
+
+def delete_purchase(request, invno):
+    assert getattr(request, "current_org", None) is not None, "current_org missing"
+    purchase = get_object_or_404(PurchaseMaster, invno=invno, org=request.current_org)
+    purchase.delete()
+    messages.success(request, "Purchase entry deleted successfully!")
+    return redirect("purchasedata")
+
+
+def purchase_search_view(request):
+    """
+    PurchaseDetails search within the current org (see brokerapp.linesearch).
+    GET params: lotno, partyname, invno (exact). Ranked, newest first, in
+    keyset pages like the sale search; ?export=csv|tsv streams every match.
+    """
+    qs = linesearch.search(request.current_org, request.GET, "purchase")
+
+    if exporters.requested_format(request):
+        if _wants_background(request):
+            return _enqueue_view_export(request, f"Purchase search {exporters.requested_format(request).upper()}")
+        rows = (
+            qs.order_by(*linesearch.ordering("purchase"))
+            .values_list("lotno", "item_id", "qty", "purchasemaster__party_id", "purchasemaster__invno",
+                         "purchasemaster__invdate")
+            .iterator(chunk_size=exporters.EXPORT_CHUNK_SIZE)
+        )
+        return exporters.table_response(request, f"purchase_search_{date.today()}",
+                                        ["LotNo", "Item", "Qty", "Party", "Inv No", "Date"], rows)
+
+    page = keyset.paginate(qs.select_related("purchasemaster"), request.GET.get("after"), request.GET.get("before"))
+
+    return render(request, "brokerapp/purchase_search.html", {
+        "purchases": page.rows,
+        "page": page,
+        "count": keyset.count(qs),
+    })
+
+
+PURCHASE_REPORT_EXPORT_COLUMNS = [
+    ("Invoice No", "invno"), ("Invoice Date", "invdate"), ("Party", "party_id"), ("Broker", "broker_id"),
+    ("Total Amt", "totalamt"), ("Batav Amt", "batavamt"), ("DR Amt", "dramt"), ("Other", "other"),
+    ("Total", "total"), ("Advance", "advance"), ("Net Amt", "netamt"),
+]
+
+
+def _purchase_report_queryset(org, start_date, end_date, broker_id):
+    """Purchases in the report's filter (ORG SCOPED), by date."""
+    purchases = PurchaseMaster.objects.filter(org=org)
+    if start_date:
+        purchases = purchases.filter(invdate__gte=parse_date(start_date))
+    if end_date:
+        purchases = purchases.filter(invdate__lte=parse_date(end_date))
+    if broker_id and broker_id != "all":
+        purchases = purchases.filter(broker__brokername=broker_id)
+
+    return purchases.order_by("invdate")
+
+
+def purchase_report(request):
+    start_date = request.GET.get("start_date")
+    end_date = request.GET.get("end_date")
+    broker_id = request.GET.get("broker")
+    report_type = request.GET.get("report_type", "date")
+
+    # Default date = today
+    if not start_date:
+        start_date = date.today().strftime("%Y-%m-%d")
+    if not end_date:
+        end_date = date.today().strftime("%Y-%m-%d")
+
+    purchases = _purchase_report_queryset(request.current_org, start_date, end_date, broker_id)
+
+    if exporters.requested_format(request):
+        if _wants_background(request):
+            return _enqueue_view_export(request, f"Purchase report {exporters.requested_format(request).upper()}")
+        headers, fields = zip(*PURCHASE_REPORT_EXPORT_COLUMNS)
+        rows = (
+            purchases.order_by("invdate", "invno")
+            .values_list(*fields)
+            .iterator(chunk_size=exporters.EXPORT_CHUNK_SIZE)
+        )
+        return exporters.table_response(request, f"purchase_report_{start_date}_{end_date}", headers, rows)
+
+    report_data = group_invoices(purchases, report_type)
+    overall_totals = purchases.aggregate(**{f"total_{f}": Sum(f) for f in REPORT_TOTAL_FIELDS})
+
+    brokers = masterdata.get_brokers(request.current_org)
+
+    context = {
+        "report_data": report_data,
+        "overall_totals": overall_totals,
+        "start_date": start_date,
+        "end_date": end_date,
+        "brokers": brokers,
+        "selected_broker": broker_id if broker_id != "all" else None,
+        "report_type": report_type,
+    }
+
+    return render(request, "brokerapp/purchase_report.html", context)
@@ -0,0 +1,531 @@
+# brokerapp/views/sales.py
+"""Sale entry, list, report, search and bardana report."""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import groupby
+from operator import attrgetter
+
+from django.contrib import messages
+from django.db import transaction
+from django.db.models import Max, Prefetch, Sum
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.dateparse import parse_date
+
+from brokerapp import cachetags, exporters, invoicelist, keyset, linesearch, masterdata, typeahead
+from brokerapp.models import Broker, HeadItem, HeadParty, SaleDetails, SaleMaster
+from .common import REPORT_TOTAL_FIELDS, group_invoices, to_decimal
+from .ops import _enqueue_view_export, _wants_background
+
+
+def sale_form(request, invno=None):
+    """
+    Render sale form. If invno provided, load sale and its details (scoped to current org).
+    """
+    sale = None
+    sale_items_json = "[]"
+    today_date = date.today().strftime("%Y-%m-%d")
+
+    if invno:
+        # sale must belong to current org
+        sale = get_object_or_404(SaleMaster, invno=invno, org=request.current_org)
+        details = SaleDetails.objects.filter(salemaster=sale)
+        items_data = []
+        for d in details:
+            items_data.append({
+                "item_id": d.item_id,
+                "item_name": d.item_id,  # item names are the primary key
+                "bora": float(d.bora),
+                "bn": float(d.bn),
+                "bnwt": float(d.bnwt),
+                "bo": float(d.bo),
+                "bowt": float(d.bowt),
+                "tbwt": float(getattr(d, "tbwt", 0)),
+                "totalbora": float(d.bn*d.bnwt + d.bo*d.bowt),
+                "qty": float(d.qty),
+                "rate": float(d.rate),
+                "amt": float(d.amount),
+                "partywt": float(d.partywt),
+                "millwt": float(d.millwt),
+                "diffwt": float(d.diffwt),
+                "frkwt": float(getattr(d, "frkwt", 0)),
+                "lotno": d.lotno or "",
+            })
+        sale_items_json = json.dumps(items_data)
+
+    # next invoice number — per ORG
+    next_invno = SaleMaster.objects.filter(org=request.current_org).aggregate(Max("invno"))['invno__max']
+    next_invno = (next_invno + 1) if next_invno else 1
+
+    context = {
+        "sale": sale,
+        "sale_items_json": sale_items_json,
+        "next_invno": next_invno,
+        "today_date": today_date,
+        # party/broker/item options are filled client-side from the cached master-data blob
+        "masterdata_version": masterdata.get_version(request.current_org),
+    }
+    return render(request, "brokerapp/sale.html", context)
+
+
+@transaction.atomic
+def save_sale(request):
+    """
+    Save a new SaleMaster and its SaleDetails — scoped to current org.
+    """
+    if request.method != "POST":
+        return redirect('sale_form_new')
+
+    try:
+        invdate_str = request.POST.get("invdate")
+        invdate = datetime.strptime(invdate_str, "%Y-%m-%d").date() if invdate_str else date.today()
+        awakno = request.POST.get("awakno", "").strip()
+        extra = request.POST.get("extra", "").strip()
+        party_pk = request.POST.get("party")
+        broker_pk = request.POST.get("broker")
+        vehicleno = request.POST.get("vehicleno", "").strip()
+
+        items_json = request.POST.get("items_json") or "[]"
+        items = json.loads(items_json)
+        if not items:
+            messages.error(request, "Add at least one item before saving.")
+            return redirect("sale_form_new")
+
+        total_amt = Decimal('0')
+        for it in items:
+            total_amt += to_decimal(it.get("amt", 0))
+
+        batavpercent = to_decimal(request.POST.get("batavpercent", 0))
+        batavamt = (total_amt * batavpercent / Decimal('100')).quantize(Decimal('0.01'))
+
+        dr = to_decimal(request.POST.get("dr", 0))
+        dramt = (total_amt * dr / Decimal('100')).quantize(Decimal('0.01'))
+
+        qi = to_decimal(request.POST.get("qi", 0))
+        other = to_decimal(request.POST.get("other", 0))
+        advance = to_decimal(request.POST.get("advance", 0))
+        total = (total_amt - batavamt - dramt - qi - other).quantize(Decimal('0.01'))
+        netamt = (total - advance).quantize(Decimal('0.01'))
+
+        # Resolve FKs inside same org
+        party = get_object_or_404(HeadParty, pk=party_pk, org=request.current_org)
+        broker = get_object_or_404(Broker, pk=broker_pk, org=request.current_org)
+
+        # Create SaleMaster with org + created_by
+        sale = SaleMaster.objects.create(
+            org=request.current_org,
+            created_by=request.user,
+            invdate=invdate,
+            awakno=awakno,
+            party=party,
+            broker=broker,
+            vehicleno=vehicleno,
+            extra=extra,
+            totalamt=total_amt.quantize(Decimal('0.01')),
+            batavpercent=batavpercent,
+            batavamt=batavamt,
+            dr=dr,
+            dramt=dramt,
+            qi=qi,
+            other=other,
+            total=total,
+            advance=advance,
+            netamt=netamt,
+            remark=request.POST.get("remark", "").strip(),
+        )
+
+        # Create SaleDetails (items limited to same org)
+        for it in items:
+            item_id = it.get("item_id")
+            item_obj = get_object_or_404(HeadItem, pk=item_id, org=request.current_org)
+            SaleDetails.objects.create(
+                salemaster=sale,
+                item=item_obj,
+                bora=to_decimal(it.get("bora", 0)),
+                bn=to_decimal(it.get("bn", 0)),
+                bnwt=to_decimal(it.get("bnwt", 0)),
+                bo=to_decimal(it.get("bo", 0)),
+                bowt=to_decimal(it.get("bowt", 0)),
+                tbwt=to_decimal(it.get("tbwt", 0)),
+                qty=to_decimal(it.get("qty", 0)),
+                rate=to_decimal(it.get("rate", 0)),
+                amount=to_decimal(it.get("amt", 0)),
+                partywt=to_decimal(it.get("partywt", 0)),
+                millwt=to_decimal(it.get("millwt", 0)),
+                frkwt=to_decimal(it.get("frkwt", 0)),
+                diffwt=to_decimal(it.get("diffwt", 0)),
+                lotno=it.get("lotno", "").strip(),
+            )
+
+        typeahead.note_recent(request.user, request.current_org, party=party, broker=broker,
+                              items=[it.get("item_id") for it in items])
+        messages.success(request, "Sale entry saved successfully!")
+        return redirect("saledata")
+
+    except Exception as e:
+        messages.error(request, f"Error saving sale: {e}")
+        return redirect("sale_form_new")
+
+
+@transaction.atomic
+def update_sale(request, invno):
+    """
+    Update existing SaleMaster identified by invno (scoped to current org).
+    """
+    sale = get_object_or_404(SaleMaster, invno=invno, org=request.current_org)
+
+    if request.method != "POST":
+        return redirect('sale_form_update', invno=invno)
+
+    try:
+        invdate_str = request.POST.get("invdate")
+        invdate = datetime.strptime(invdate_str, "%Y-%m-%d").date() if invdate_str else sale.invdate
+        awakno = request.POST.get("awakno", "").strip()
+        party_pk = request.POST.get("party")
+        broker_pk = request.POST.get("broker")
+        vehicleno = request.POST.get("vehicleno", "").strip()
+        extra = request.POST.get("extra", "").strip()
+
+        items_json = request.POST.get("items_json") or "[]"
+        items = json.loads(items_json)
+        if not items:
+            messages.error(request, "Add at least one item before saving.")
+            return redirect("sale_form_update", invno=invno)
+
+        total_amt = Decimal('0')
+        for it in items:
+            total_amt += to_decimal(it.get("amt", 0))
+
+        batavpercent = to_decimal(request.POST.get("batavpercent", 0))
+        batavamt = (total_amt * batavpercent / Decimal('100')).quantize(Decimal('0.01'))
+
+        dr = to_decimal(request.POST.get("dr", 0))
+        dramt = (total_amt * dr / Decimal('100')).quantize(Decimal('0.01'))
+
+        qi = to_decimal(request.POST.get("qi", 0))
+        other = to_decimal(request.POST.get("other", 0))
+        advance = to_decimal(request.POST.get("advance", 0))
+        total = (total_amt - batavamt - dramt - qi - other).quantize(Decimal('0.01'))
+        netamt = (total - advance).quantize(Decimal('0.01'))
+
+        # Resolve FKs inside same org
+        party = get_object_or_404(HeadParty, pk=party_pk, org=request.current_org)
+        broker = get_object_or_404(Broker, pk=broker_pk, org=request.current_org)
+
+        # Update header
+        sale.invdate = invdate
+        sale.awakno = awakno
+        sale.party = party
+        sale.broker = broker
+        sale.vehicleno = vehicleno
+        sale.extra = extra
+        sale.totalamt = total_amt.quantize(Decimal('0.01'))
+        sale.batavpercent = batavpercent
+        sale.batavamt = batavamt
+        sale.dr = dr
+        sale.dramt = dramt
+        sale.qi = qi
+        sale.other = other
+        sale.advance = advance
+        sale.total = total
+        sale.netamt = netamt
+        sale.remark = request.POST.get("remark", "").strip()
+        sale.save()
+
+        # Replace details
+        SaleDetails.objects.filter(salemaster=sale).delete()
+        for it in items:
+            item_id = it.get("item_id")
+            item_obj = get_object_or_404(HeadItem, pk=item_id, org=request.current_org)
+            SaleDetails.objects.create(
+                salemaster=sale,
+                item=item_obj,
+                bora=to_decimal(it.get("bora", 0)),
+                bn=to_decimal(it.get("bn", 0)),
+                bnwt=to_decimal(it.get("bnwt", 0)),
+                bo=to_decimal(it.get("bo", 0)),
+                bowt=to_decimal(it.get("bowt", 0)),
+                tbwt=to_decimal(it.get("tbwt", 0)),
+                qty=to_decimal(it.get("qty", 0)),
+                rate=to_decimal(it.get("rate", 0)),
+                amount=to_decimal(it.get("amt", 0)),
+                partywt=to_decimal(it.get("partywt", 0)),
+                millwt=to_decimal(it.get("millwt", 0)),
+                frkwt=to_decimal(it.get("frkwt", 0)),
+                diffwt=to_decimal(it.get("diffwt", 0)),
+                lotno=it.get("lotno", "").strip(),
+            )
+
+        typeahead.note_recent(request.user, request.current_org, party=party, broker=broker,
+                              items=[it.get("item_id") for it in items])
+        messages.success(request, "Sale entry updated successfully!")
+        return redirect("saledata")
+
+    except Exception as e:
+        messages.error(request, f"Error updating sale: {e}")
+        return redirect("sale_form_update", invno=invno)
+
+
+def sale_data_view(request):
+    """
+    Sale list of the current org: filters (start_date, end_date, party,
+    broker, vehicle), ?sort= (see invoicelist.SORTS) and keyset pages
+    (?after= / ?before=). ?export=csv|tsv streams every filtered sale.
+    """
+    sales, filters, sort = invoicelist.listing(SaleMaster, request.current_org, request.GET)
+    if exporters.requested_format(request):
+        if _wants_background(request):
+            return _enqueue_view_export(request, f"Sale data {exporters.requested_format(request).upper()}")
+        rows = sales.values_list("invno", "invdate", "party_id", "broker_id", "vehicleno", "netamt", "remark") \
+            .iterator(chunk_size=exporters.EXPORT_CHUNK_SIZE)
+        return exporters.table_response(
+            request, f"saledata_{date.today()}",
+            ["Invoice No", "Invoice Date", "Party Name", "Broker", "Vehicle No", "Amount", "Remark"], rows,
+        )
+    context = invoicelist.page_context(sales, request.GET)
+    return render(request, "brokerapp/saledata.html", {
+        "sales": context["page"].rows,
+        "filters": filters,
+        "sort": sort,
+        "today_date": date.today(),
+        **context,
+        # the party / broker filter options come from the browser's master-data copy
+        "masterdata_version": masterdata.get_version(request.current_org),
+    })
+
+
+def delete_sale(request, invno):
+    sale = get_object_or_404(SaleMaster, invno=invno, org=request.current_org)
+    sale.delete()
+    messages.success(request, "Sale entry deleted successfully!")
+    return redirect("saledata")
+
+
+def sale_report(request):
+    start_date = request.GET.get("start_date")
+    end_date = request.GET.get("end_date")
+    broker_id = request.GET.get("broker")
+    report_type = request.GET.get("report_type", "date")
+
+    # Default date = today
+    if not start_date:
+        start_date = date.today().strftime("%Y-%m-%d")
+    if not end_date:
+        end_date = date.today().strftime("%Y-%m-%d")
+
+    if exporters.requested_format(request):
+        if _wants_background(request):
+            return _enqueue_view_export(request, f"Sale report {exporters.requested_format(request).upper()}")
+        return _sale_report_export(request, start_date, end_date, broker_id)
+
+    report_data, overall_totals = _sale_report_data(request.current_org, start_date, end_date, broker_id, report_type)
+
+    # Dropdowns also ORG SCOPED (cached choice rows)
+    brokers = masterdata.get_brokers(request.current_org)
+
+    context = {
+        "report_data": report_data,
+        "overall_totals": overall_totals,
+        "start_date": start_date,
+        "end_date": end_date,
+        "brokers": brokers,
+        "selected_broker": broker_id if broker_id != "all" else None,
+        "report_type": report_type,
+    }
+    return render(request, "brokerapp/sale_report.html", context)
+
+
+def _sale_report_queryset(org, start_date, end_date, broker_id):
+    """Sales in the report's filter (ORG SCOPED), by date."""
+    sales = SaleMaster.objects.filter(org=org)
+
+    if start_date:
+        sales = sales.filter(invdate__gte=parse_date(start_date))
+    if end_date:
+        sales = sales.filter(invdate__lte=parse_date(end_date))
+
+    # Broker filter: allow pk or name, but scoped to org
+    if broker_id and broker_id != "all":
+        # try as primary key
+        if sales.filter(broker__pk=broker_id).exists():
+            sales = sales.filter(broker__pk=broker_id)
+        else:
+            sales = sales.filter(broker__brokername=broker_id)
+
+    return sales.order_by("invdate")
+
+
+SALE_REPORT_EXPORT_COLUMNS = [
+    ("Invoice No", "invno"), ("Invoice Date", "invdate"), ("Party", "party_id"), ("Broker", "broker_id"),
+    ("Total Amt", "totalamt"), ("Batav Amt", "batavamt"), ("DR Amt", "dramt"), ("Other", "other"),
+    ("Total", "total"), ("Advance", "advance"), ("Net Amt", "netamt"),
+    ("Item", "details__item_id"), ("Bora", "details__bora"), ("TBWt", "details__tbwt"),
+    ("Qty", "details__qty"), ("Rate", "details__rate"), ("Amount", "details__amount"),
+    ("PartyWt", "details__partywt"), ("MillWt", "details__millwt"), ("FrkWt", "details__frkwt"),
+    ("DiffWt", "details__diffwt"), ("Lot No", "details__lotno"),
+]
+
+
+def _sale_report_export(request, start_date, end_date, broker_id):
+    """Raw sale report: one row per item line (invoice columns repeated), streamed."""
+    headers, fields = zip(*SALE_REPORT_EXPORT_COLUMNS)
+    rows = (
+        _sale_report_queryset(request.current_org, start_date, end_date, broker_id)
+        .order_by("invdate", "invno", "details__pk")
+        .values_list(*fields)
+        .iterator(chunk_size=exporters.EXPORT_CHUNK_SIZE)
+    )
+    return exporters.table_response(request, f"sale_report_{start_date}_{end_date}", headers, rows)
+
+
+@cachetags.cached("sale_report", tags=lambda org, *args: cachetags.org_tags(org, "sales", "masters"))
+def _sale_report_data(org, start_date, end_date, broker_id, report_type):
+    """Grouped rows + overall totals for sale_report (groups hold evaluated lists so they can be cached)."""
+    # prefetch details (with item) for the template
+    sales = (
+        _sale_report_queryset(org, start_date, end_date, broker_id)
+        .select_related("broker")
+        .prefetch_related(Prefetch("details", queryset=SaleDetails.objects.select_related("item")))
+    )
+
+    report_data = group_invoices(sales, report_type)
+    for group in report_data:
+        lines = [d for s in group["items"] for d in s.details.all()]
+        group["totals"]["total_tbwt"] = sum((d.tbwt for d in lines), Decimal("0"))
+        group["totals"]["total_frkwt"] = sum((d.frkwt for d in lines), Decimal("0"))
+
+    # Overall Totals (header-level) + TBWt + FrkWt across all details in the filtered set
+    overall_totals = sales.aggregate(**{f"total_{f}": Sum(f) for f in REPORT_TOTAL_FIELDS})
+    line_totals = SaleDetails.objects.filter(salemaster__in=sales).aggregate(total_tbwt=Sum("tbwt"),
+                                                                             total_frkwt=Sum("frkwt"))
+    overall_totals["total_tbwt"] = line_totals["total_tbwt"] or 0
+    overall_totals["total_frkwt"] = line_totals["total_frkwt"] or 0
+    return report_data, overall_totals
+
+
+def sale_search_view(request):
+    """
+    SaleDetails search within the current org (see brokerapp.linesearch).
+    GET params supported:
+      - frkwt (exact)
+      - frkwt_min, frkwt_max (optional range)
+      - lotno
+      - partyname (matches SaleMaster.party)
+      - invno (exact SaleMaster.invno)
+    Ranked (exact, prefix, substring match), newest first, in pages of
+    keyset.PER_PAGE (?after= / ?before= cursors); ?export=csv|tsv streams
+    every match, newest first.
+    """
+    qs = linesearch.search(request.current_org, request.GET, "sale")
+
+    if exporters.requested_format(request):
+        if _wants_background(request):
+            return _enqueue_view_export(request, f"Sale search {exporters.requested_format(request).upper()}")
+        rows = (
+            qs.order_by(*linesearch.ordering("sale"))
+            .values_list('lotno', 'frkwt', 'salemaster__party_id', 'salemaster__invno', 'salemaster__invdate')
+            .iterator(chunk_size=exporters.EXPORT_CHUNK_SIZE)
+        )
+        return exporters.table_response(request, f"sale_search_{date.today()}",
+                                        ["LotNo", "FrkWt", "Party", "Inv No", "Date"], rows)
+
+    page = keyset.paginate(qs.select_related('salemaster'), request.GET.get('after'), request.GET.get('before'))
+
+    return render(request, 'brokerapp/sale_search.html', {
+        'sales': page.rows,
+        'page': page,
+        'count': keyset.count(qs),
+    })
+
+
+# bardana report_type -> (group field, group label)
+BARDANA_GROUPS = {
+    "date": ("salemaster__invdate", lambda g: g.strftime("%d-%m-%Y")),
+    "party": ("salemaster__party_id", lambda g: g),
+    "broker": ("salemaster__broker_id", lambda g: g or "No Broker"),
+}
+
+
+def bardana_report(request):
+    start_date = request.GET.get("start_date")
+    end_date = request.GET.get("end_date")
+    party_id = request.GET.get("party")
+    broker_id = request.GET.get("broker")
+    report_type = request.GET.get("report_type", "date")  # date / party / broker
+
+    # Default date = today
+    if not start_date:
+        start_date = date.today().strftime("%Y-%m-%d")
+    if not end_date:
+        end_date = date.today().strftime("%Y-%m-%d")
+
+    details = _bardana_queryset(request.current_org, start_date, end_date, party_id, broker_id)
+
+    if exporters.requested_format(request):
+        if _wants_background(request):
+            return _enqueue_view_export(request, f"Bardana report {exporters.requested_format(request).upper()}")
+        rows = (
+            details.order_by('salemaster__invdate', 'salemaster__invno', 'pk')
+            .values_list('salemaster__invdate', 'salemaster__invno', 'salemaster__party_id',
+                         'salemaster__broker_id', 'item_id', 'bn', 'bo')
+            .iterator(chunk_size=exporters.EXPORT_CHUNK_SIZE)
+        )
+        return exporters.table_response(request, f"bardana_report_{start_date}_{end_date}",
+                                        ["Date", "Inv No", "Party", "Broker", "Item", "BN", "BO"], rows)
+
+    details = details.select_related('salemaster', 'item', 'salemaster__party', 'salemaster__broker')
+
+    # Prepare grouped data: one ordered read, grouped as it streams past
+    report_data = []
+    if report_type in BARDANA_GROUPS:
+        field, label = BARDANA_GROUPS[report_type]
+        key = attrgetter(field.replace("__", "."))
+        rows = details.order_by(field, 'salemaster__invdate', 'salemaster__invno', 'pk')
+        for g, group_details in groupby(rows, key=key):
+            group_details = list(group_details)
+            report_data.append({
+                "group": label(g),
+                "items": group_details,
+                "total_bn": sum(d.bn for d in group_details),
+                "total_bo": sum(d.bo for d in group_details),
+            })
+
+    # ORG-scoped dropdown lists (cached choice rows)
+    parties = masterdata.get_parties(request.current_org)
+    brokers = masterdata.get_brokers(request.current_org)
+
+    context = {
+        "report_data": report_data,
+        "parties": parties,
+        "brokers": brokers,
+        "start_date": start_date,
+        "end_date": end_date,
+        "selected_party": party_id if party_id != "all" else None,
+        "selected_broker": broker_id if broker_id != "all" else None,
+        "report_type": report_type,
+    }
+    return render(request, "brokerapp/bardana_report.html", context)
+
+
+def _bardana_queryset(org, start_date, end_date, party_id, broker_id):
+    """SaleDetails in the bardana report's filter (ORG SCOPED via salemaster__org), by date."""
+    details = (
+        SaleDetails.objects
+        .filter(
+            salemaster__org=org,
+            salemaster__invdate__gte=parse_date(start_date),
+            salemaster__invdate__lte=parse_date(end_date)
+        )
+        .order_by('salemaster__invdate')
+    )
+
+    # Party / Broker filters (within org)
+    if party_id and party_id != "all":
+        details = details.filter(salemaster__party__pk=party_id)
+    if broker_id and broker_id != "all":
+        # allow pk or name
+        if details.filter(salemaster__broker__pk=broker_id).exists():
+            details = details.filter(salemaster__broker__pk=broker_id)
+        else:
+            details = details.filter(salemaster__broker__brokername=broker_id)
+    return details
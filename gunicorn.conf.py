@@ -0,0 +1,45 @@
+# gunicorn.conf.py — production server profile (loaded by broker_project/start.sh)
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# ASGI=1 serves broker_project.asgi with uvicorn workers (async daily-page
+# endpoints); start.sh picks the matching application module.
+ASGI = os.environ.get("ASGI", "0") == "1"
+
+# Threaded workers: report/PDF requests mostly wait on Postgres, so threads keep
+# a worker useful while one request blocks. Keep in step with the DB pool size
+# in settings.py (same env vars). Uvicorn workers ignore `threads`; their
+# requests in flight are capped by ASGI_CONCURRENCY in broker_project.asgi.
+worker_class = "uvicorn_worker.UvicornWorker" if ASGI else "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+# Recycle workers now and then (slow leaks from big exports); jitter keeps them
+# from all restarting at the same moment.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Import Django once in the master; workers fork with the code already loaded.
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def pre_fork(server, worker):
+    """
+    Nothing opened in the master may leak into the workers: with preload_app a
+    connection (or connection pool) created during startup would otherwise be
+    shared by every forked process.
+    """
+    from django.db import connections
+
+    for conn in connections.all(initialized_only=True):
+        conn.close()
+        if hasattr(conn, "close_pool"):
+            conn.close_pool()